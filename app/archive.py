@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Message archive
+
+`messages` only needs recent and unread mail: unread counts, badges, probes
+and the first page of every conversation read from it. `archive()` moves read,
+live messages older than ARCHIVE_AFTER_DAYS into `messages_archive`, a compact
+table keyed by the original id and indexed by conversation pair. It walks
+`messages` in primary-key batches of ARCHIVE_BATCH, one short transaction
+each, so the write lock is never held for long, and stops at the first batch
+that is entirely newer than the cutoff. Unread and soft-deleted messages stay
+where they are.
+
+`conversation_page()` pages newest first through the hot table. It reads the
+archive only when the page reaches back past the pair's newest archived id,
+i.e. when a client has scrolled that far back.
+
+Usage:
+    python -m app.archive                       # archive read messages older than 90 days
+    python -m app.archive --older-than-days 30
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+from sqlalchemy import select, insert, delete, func, and_, or_
+
+from app.db import engine
+from app.models import Message, ArchivedMessage
+from app.migrations import migrate
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("GLOBRIDGE_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH = 2000
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _between(a, b):
+    return or_(and_(Message.sender_id == a, Message.receiver_id == b),
+               and_(Message.sender_id == b, Message.receiver_id == a))
+
+
+def _archived_between(a, b, before_id=None):
+    low, high = _pair(a, b)
+    criteria = [ArchivedMessage.user_low_id == low, ArchivedMessage.user_high_id == high]
+    if before_id:
+        criteria.append(ArchivedMessage.id < before_id)
+    return criteria
+
+
+def conversation_page(db, user_id, partner_id, before_id=None, limit=PAGE_SIZE):
+    """Up to `limit` live messages older than before_id, oldest first, and whether older ones exist"""
+    q = select(Message).where(_between(user_id, partner_id), Message.is_deleted == 0)
+    if before_id:
+        q = q.where(Message.id < before_id)
+    rows = db.execute(q.order_by(Message.id.desc()).limit(limit + 1)).scalars().all()
+
+    # Old unread messages stay hot, so the archive can hold ids newer than the hot page's oldest
+    newest_archived = db.execute(
+        select(func.max(ArchivedMessage.id)).where(*_archived_between(user_id, partner_id, before_id))
+    ).scalar()
+    if newest_archived is not None and (len(rows) <= limit or newest_archived > rows[limit - 1].id):
+        rows += db.execute(
+            select(ArchivedMessage).where(*_archived_between(user_id, partner_id, before_id))
+            .order_by(ArchivedMessage.id.desc()).limit(limit + 1)
+        ).scalars().all()
+        rows.sort(key=lambda m: m.id, reverse=True)
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def full_history(db, user_id, partner_id):
+    """Every message between two users, deleted ones included, oldest first"""
+    hot = db.execute(select(Message).where(_between(user_id, partner_id))).scalars().all()
+    cold = db.execute(select(ArchivedMessage).where(*_archived_between(user_id, partner_id))).scalars().all()
+    return sorted(hot + cold, key=lambda m: m.id)
+
+
+def latest_by_partner(db, user_id):
+    """{partner id: newest archived message} for every archived conversation the user is in"""
+    newest = []
+    for mine, theirs in ((ArchivedMessage.user_low_id, ArchivedMessage.user_high_id),
+                         (ArchivedMessage.user_high_id, ArchivedMessage.user_low_id)):
+        newest += db.execute(
+            select(func.max(ArchivedMessage.id)).where(mine == user_id).group_by(theirs)
+        ).scalars().all()
+    if not newest:
+        return {}
+    rows = db.execute(select(ArchivedMessage).where(ArchivedMessage.id.in_(newest))).scalars()
+    return {(m.receiver_id if m.sender_id == user_id else m.sender_id): m for m in rows}
+
+
+def find_for_user(db, message_id, user_id):
+    """An archived message the user sent or received, or None"""
+    m = db.get(ArchivedMessage, message_id)
+    if m is None or user_id not in (m.user_low_id, m.user_high_id):
+        return None
+    return m
+
+
+# ---------- Archival job ----------
+
+def _move(conn, ids):
+    columns = ["id", "user_low_id", "user_high_id", "sender_id", "body", "message_type", "attachment_url",
+               "attachment_name", "attachment_size", "read_at", "reply_to_id", "created_at"]
+    conn.execute(insert(ArchivedMessage).from_select(columns, select(
+        Message.id, func.min(Message.sender_id, Message.receiver_id),
+        func.max(Message.sender_id, Message.receiver_id), Message.sender_id, Message.body,
+        Message.message_type, Message.attachment_url, Message.attachment_name, Message.attachment_size,
+        Message.read_at, Message.reply_to_id, func.coalesce(Message.created_at, func.current_timestamp()),
+    ).where(Message.id.in_(ids))))
+    conn.execute(delete(Message).where(Message.id.in_(ids)))
+
+
+def archive(bind=None, older_than_days=ARCHIVE_AFTER_DAYS, batch=ARCHIVE_BATCH, deadline=None):
+    """Move read, live messages older than the cutoff into the archive; returns the number moved
+
+    With a deadline (a time.monotonic() value) the walk stops once it passes; the next run resumes it.
+    """
+    bind = bind or engine
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    moved, after_id = 0, 0
+    while deadline is None or time.monotonic() < deadline:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(Message.id, Message.created_at, Message.is_read, Message.is_deleted)
+                .where(Message.id > after_id).order_by(Message.id).limit(batch)
+            ).all()
+            ids = [r.id for r in rows
+                   if r.created_at is not None and r.created_at < cutoff and r.is_read and not r.is_deleted]
+            if ids:
+                _move(conn, ids)
+                moved += len(ids)
+        # Ids grow with created_at, so once a whole batch is too new, so is everything after it
+        if len(rows) < batch or all(r.created_at is not None and r.created_at >= cutoff for r in rows):
+            return moved
+        after_id = rows[-1].id
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old read messages into the archive table")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    migrate()
+    t0 = time.perf_counter()
+    n = archive(older_than_days=args.older_than_days)
+    print(f"Archived {n} messages older than {args.older_than_days} days in {time.perf_counter() - t0:.1f}s")
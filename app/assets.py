@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Static asset build
+Minifies static/app.js and static/styles.css, fingerprints every asset with a
+content hash, and writes gzip (and, when the `brotli` package is installed,
+brotli) siblings into static/dist/. References to other assets inside the CSS
+and JS are rewritten to their fingerprinted URLs. static/dist/manifest.json
+maps each source name to its built file. Templates resolve URLs through
+`url()`, and `AssetFiles` serves the built files with `immutable` caching and
+the precompressed variant the client accepts.
+
+The manifest records a digest of the sources, so startup rebuilds only when a
+source changed.
+
+Usage:
+    python -m app.assets            # build if any source changed
+    python -m app.assets --force    # rebuild unconditionally
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+
+from app.db import BASE_DIR
+
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+URL_PREFIX = "/static/"
+# Referenced assets come first so the files that mention them can be rewritten
+SOURCES = ("logo.png", "styles.css", "app.js")
+COMPRESSIBLE = (".css", ".js", ".svg", ".json")
+IMMUTABLE = "public, max-age=31536000, immutable"
+HASH_LENGTH = 12
+
+
+# ---------- Minifiers ----------
+
+def minify_css(text):
+    out = []
+    for quoted, comment, code in re.findall(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|([^"\'/]+|/)',
+                                             text, re.S):
+        if quoted:
+            out.append(quoted)
+        elif code:
+            code = re.sub(r"\s+", " ", code)
+            code = re.sub(r"\s*([{};,>])\s*", r"\1", code)
+            out.append(code)
+    return re.sub(r";}", "}", "".join(out)).strip()
+
+
+_IDENT = re.compile(r"[\w$]")
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                   "instanceof", "yield", "await"}
+
+
+def _skip_string(src, i):
+    quote = src[i]
+    i += 1
+    while src[i] != quote:
+        i += 2 if src[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(src, i):
+    # From an opening backtick to just past its closing one, including nested ${ ... } code
+    i += 1
+    while src[i] != "`":
+        if src[i] == "\\":
+            i += 2
+        elif src.startswith("${", i):
+            i = _skip_braces(src, i + 1)
+        else:
+            i += 1
+    return i + 1
+
+
+def _skip_braces(src, i):
+    depth = 0
+    while True:
+        c = src[i]
+        if c in "'\"":
+            i = _skip_string(src, i)
+            continue
+        if c == "`":
+            i = _skip_template(src, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+
+
+def _skip_regex(src, i):
+    i += 1
+    in_class = False
+    while in_class or src[i] != "/":
+        if src[i] == "\\":
+            i += 1
+        elif src[i] == "[":
+            in_class = True
+        elif src[i] == "]":
+            in_class = False
+        i += 1
+    i += 1
+    while i < len(src) and _IDENT.match(src[i]):
+        i += 1
+    return i
+
+
+def _keep_space(prev, nxt):
+    if _IDENT.match(prev) and _IDENT.match(nxt):
+        return True
+    return prev in "+-" and nxt in "+-"
+
+
+def minify_js(src):
+    """Drop comments and collapse whitespace; strings, template literals and regex literals are copied
+    verbatim. Line breaks are kept (one per run) so automatic semicolon insertion is unaffected."""
+    out = []
+    last = ""  # last significant character written
+    word = ""  # last identifier written, for regex-after-keyword detection
+    pending = ""  # collapsed whitespace waiting for the next token
+    i, n = 0, len(src)
+    while i < n:
+        c = src[i]
+        if c.isspace():
+            j = i
+            while j < n and src[j].isspace():
+                j += 1
+            pending = "\n" if "\n" in src[i:j] or pending == "\n" else " "
+            i = j
+            continue
+        if src.startswith("//", i):
+            i = src.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        if src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            pending = pending or " "
+            continue
+        if c in "'\"`":
+            end = _skip_template(src, i) if c == "`" else _skip_string(src, i)
+        elif c == "/" and (not last or last in _REGEX_AFTER or word in _REGEX_KEYWORDS):
+            end = _skip_regex(src, i)
+        elif _IDENT.match(c):
+            end = i
+            while end < n and _IDENT.match(src[end]):
+                end += 1
+        else:
+            end = i + 1
+        token = src[i:end]
+        if pending and last:
+            if pending == "\n":
+                out.append("\n")
+            elif _keep_space(last, token[0]):
+                out.append(" ")
+        pending = ""
+        out.append(token)
+        last = token[-1]
+        word = token if _IDENT.match(token[0]) else ""
+        i = end
+    return "".join(out) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ---------- Build ----------
+
+def _source_digest():
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(path, data):
+    written = []
+    _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(path + ".gz")
+    try:
+        import brotli
+    except ImportError:
+        return written
+    _write(path + ".br", brotli.compress(data, quality=11))
+    written.append(path + ".br")
+    return written
+
+
+def build():
+    """Build every source into static/dist and write the manifest; returns the manifest"""
+    os.makedirs(DIST_DIR, exist_ok=True)
+    files = {}
+    keep = {os.path.basename(MANIFEST_PATH)}
+    for name in SOURCES:
+        stem, ext = os.path.splitext(name)
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            data = f.read()
+        if ext in MINIFIERS:
+            text = data.decode("utf-8")
+            for ref, built in files.items():
+                text = text.replace(URL_PREFIX + ref, URL_PREFIX + built)
+            data = MINIFIERS[ext](text).encode("utf-8")
+        built = f"dist/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+        path = os.path.join(STATIC_DIR, built)
+        if not os.path.exists(path):
+            _write(path, data)
+        keep.add(os.path.basename(path))
+        if ext in COMPRESSIBLE:
+            keep.update(os.path.basename(p) for p in _compress(path, data))
+        files[name] = built
+
+    # Keep the previous build's files too, so pages rendered before a redeploy still load
+    previous = _read_manifest()
+    for built in (previous or {}).get("files", {}).values():
+        keep.update({os.path.basename(built), os.path.basename(built) + ".gz", os.path.basename(built) + ".br"})
+    for entry in os.listdir(DIST_DIR):
+        if entry not in keep and not entry.endswith(".tmp"):
+            os.remove(os.path.join(DIST_DIR, entry))
+
+    result = {"source_digest": _source_digest(), "files": files}
+    _write(MANIFEST_PATH, json.dumps(result, indent=2, sort_keys=True).encode())
+    return result
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_built(force=False):
+    """Rebuild when the sources no longer match the manifest (or with force); returns True if it built"""
+    current = _read_manifest()
+    if not force and current and current.get("source_digest") == _source_digest() and all(
+            os.path.exists(os.path.join(STATIC_DIR, built)) for built in current.get("files", {}).values()):
+        return False
+    build()
+    return True
+
+
+# ---------- Lookup ----------
+
+_cache = {"mtime": None, "files": {}}
+
+
+def manifest():
+    """{source name: built path under static/}, re-read whenever manifest.json changes"""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    if mtime != _cache["mtime"]:
+        _cache["files"] = (_read_manifest() or {}).get("files", {})
+        _cache["mtime"] = mtime
+    return _cache["files"]
+
+
+def url(name):
+    """Fingerprinted URL for a static asset, or its plain URL when no build exists"""
+    return URL_PREFIX + manifest().get(name, name)
+
+
+# ---------- Serving ----------
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles that serves fingerprinted dist/ files as immutable, precompressed when the client allows"""
+
+    async def get_response(self, path, scope):
+        if not path.startswith("dist/") or path.endswith(".json"):
+            return await super().get_response(path, scope)
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        response = None
+        if path.endswith(COMPRESSIBLE):
+            for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None:
+                    response = FileResponse(full_path, stat_result=stat_result,
+                                            media_type=mimetypes.guess_type(path)[0])
+                    response.headers["content-encoding"] = encoding
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE
+            if path.endswith(COMPRESSIBLE):
+                response.headers["vary"] = "Accept-Encoding"
+        if response.status_code == 200 and "content-encoding" in response.headers \
+                and self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, minified and precompressed static assets")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    built = ensure_built(force=args.force)
+    files = manifest()
+    for name in SOURCES:
+        print(f"{name:<12} -> {files.get(name, '?')}")
+    print(f"{'Built' if built else 'Up to date'} in {time.perf_counter() - t0:.2f}s")
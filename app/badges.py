@@ -0,0 +1,81 @@
+"""
+Notification badge counters
+
+Unread messages and pending incoming connection requests are kept in one
+`user_badge_counters` row per user. The endpoints that change them call
+`adjust()` before committing, so the counters move in the same transaction as
+the data. A user's row is computed from the source tables the first time it
+is read. New feed items are the live posts newer than the last feed page the
+user loaded, counted through the post index up to FEED_BADGE_CAP.
+"""
+
+from sqlalchemy import select, update, insert, func, literal
+
+from app.models import UserBadgeCounter, Message, Connection, Post
+from app.probe import post_hwm
+
+FEED_BADGE_CAP = 99
+
+
+def _count_unread(user_id):
+    return select(func.count()).select_from(Message).where(
+        Message.receiver_id == user_id, Message.is_read == 0, Message.is_deleted == 0).scalar_subquery()
+
+
+def _count_pending(user_id):
+    return select(func.count()).select_from(Connection).where(
+        Connection.receiver_id == user_id, Connection.status == "pending").scalar_subquery()
+
+
+def _ensure_row(db, user_id):
+    row = db.get(UserBadgeCounter, user_id)
+    if row is None:
+        # Counted inside the INSERT, so a write landing between count and insert cannot leave stale counts
+        counts = select(literal(user_id), _count_unread(user_id), _count_pending(user_id), literal(post_hwm.get(db)))
+        db.execute(insert(UserBadgeCounter).prefix_with("OR IGNORE").from_select(
+            ["user_id", "unread_messages", "pending_requests", "feed_seen_post_id"], counts,
+        ))
+        db.commit()
+        row = db.get(UserBadgeCounter, user_id)
+    return row
+
+
+def adjust(db, user_id, unread=0, pending=0):
+    """Shift a user's counters by the given deltas (caller commits); no-op until the row exists"""
+    values = {}
+    if unread:
+        values["unread_messages"] = func.max(UserBadgeCounter.unread_messages + unread, 0)
+    if pending:
+        values["pending_requests"] = func.max(UserBadgeCounter.pending_requests + pending, 0)
+    if values:
+        db.execute(update(UserBadgeCounter).where(UserBadgeCounter.user_id == user_id).values(**values))
+
+
+def feed_seen_behind(db, user_id, post_id):
+    """Whether the user's seen marker exists and is older than post_id; a read, so polls never write"""
+    seen = db.execute(select(UserBadgeCounter.feed_seen_post_id).where(UserBadgeCounter.user_id == user_id)).scalar()
+    return seen is not None and seen < post_id
+
+
+def mark_feed_seen(db, user_id, post_id):
+    """Record the newest post the user has been shown (caller commits)"""
+    db.execute(update(UserBadgeCounter).where(
+        UserBadgeCounter.user_id == user_id, UserBadgeCounter.feed_seen_post_id < post_id,
+    ).values(feed_seen_post_id=post_id))
+
+
+def get_badges(db, user_id):
+    row = _ensure_row(db, user_id)
+    new_posts = 0
+    if post_hwm.get(db) > row.feed_seen_post_id:
+        newer = select(Post.id).where(Post.is_deleted == 0, Post.id > row.feed_seen_post_id).limit(FEED_BADGE_CAP)
+        new_posts = db.execute(select(func.count()).select_from(newer.subquery())).scalar()
+    return {
+        "unread_messages": row.unread_messages,
+        "pending_connection_requests": row.pending_requests,
+        "new_feed_items": new_posts,
+    }
+
+
+def badges_etag(badges):
+    return 'W/"b{unread_messages}.{pending_connection_requests}.{new_feed_items}"'.format(**badges)
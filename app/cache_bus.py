@@ -0,0 +1,175 @@
+"""
+Cross-worker cache invalidation
+
+Each uvicorn worker keeps its own feed pages, facet counts, graph adjacency
+and post high-water mark, and invalidates them after its own writes. For the
+other workers to follow, a write also calls `publish(db, topic, key)` before it
+commits. That appends a row to `cache_events` in the same transaction, so an
+event exists exactly when its write does.
+
+Every worker runs one poller thread. Each POLL_INTERVAL it reads `PRAGMA
+data_version` on its own connection. SQLite bumps that counter when any other
+connection commits, and reading it touches no table. Only when the counter has
+moved does the poller read the events after the last id it has seen. It skips
+the ones this worker published and passes the rest to the handlers subscribed
+to each topic, one call per topic with the set of keys. Other workers' caches
+therefore lag a write by at most about one poll interval, with no broker.
+
+Events are pruned to the newest KEEP_EVENTS. A worker that falls further behind
+than that sees a gap in the ids, and its handlers get keys=None, meaning
+"drop everything for this topic". GLOBRIDGE_CACHE_BUS=0 turns publishing and
+polling off for single-worker deployments.
+"""
+
+import datetime
+import os
+import secrets
+import threading
+import time
+
+from sqlalchemy import select, insert, delete, func
+
+from app.db import engine as default_engine, ReadSessionLocal
+from app.models import CacheEvent
+
+ENABLED = os.getenv("GLOBRIDGE_CACHE_BUS", "1") != "0"
+POLL_INTERVAL = float(os.getenv("GLOBRIDGE_CACHE_BUS_INTERVAL", "0.5"))
+KEEP_EVENTS = int(os.getenv("GLOBRIDGE_CACHE_BUS_KEEP", "10000"))
+PRUNE_INTERVAL = 60.0
+READ_BATCH = 1000
+
+# Unique per process; a pid alone can be reused by a restarted worker
+WORKER_ID = f"{os.getpid()}-{secrets.token_hex(4)}"
+
+_handlers = {}  # topic -> [handler(db, keys or None)]
+
+
+def subscribe(topic, handler):
+    """Run handler(db, keys) on the poller thread for other workers' events; keys=None means resync"""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def publish(db, topic, key):
+    """Record an invalidation in the caller's transaction (caller commits)"""
+    if ENABLED:
+        db.execute(insert(CacheEvent).values(
+            topic=topic, key=str(key), origin=WORKER_ID, created_at=datetime.datetime.utcnow(),
+        ))
+
+
+class Poller:
+    def __init__(self, engine=default_engine, interval=POLL_INTERVAL, keep=KEEP_EVENTS):
+        self.engine = engine
+        self.interval = interval
+        self.keep = keep
+        self.last_id = None
+        self._data_version = None
+        self._pruned_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = self.reads = self.events = self.applied = self.resyncs = self.errors = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        # One long-lived connection (it holds a pool slot): data_version only compares on the same connection
+        failing = False
+        with self.engine.connect() as conn:
+            while not self._stop.is_set():
+                try:
+                    self.poll(conn)
+                    failing = False
+                except Exception as e:  # a locked or not yet migrated database must not kill the poller
+                    self.errors += 1
+                    if not failing:
+                        print(f"cache bus poll failed: {e}")
+                    failing = True
+                conn.rollback()
+                self._stop.wait(self.interval)
+
+    def poll(self, conn):
+        self.polls += 1
+        if self.last_id is None:
+            # Caches start empty, so only events after startup matter
+            self.last_id = conn.execute(select(func.max(CacheEvent.id))).scalar() or 0
+        if conn.dialect.name == "sqlite":
+            version = conn.exec_driver_sql("PRAGMA data_version").scalar()
+            if version == self._data_version:
+                return
+            self._data_version = version
+        self.reads += 1
+        while True:
+            rows = conn.execute(
+                select(CacheEvent.id, CacheEvent.topic, CacheEvent.key, CacheEvent.origin)
+                .where(CacheEvent.id > self.last_id).order_by(CacheEvent.id).limit(READ_BATCH)
+            ).all()
+            if not rows:
+                break
+            resync = rows[0].id != self.last_id + 1 and self.last_id > 0
+            self.last_id = rows[-1].id
+            self.events += len(rows)
+            self._apply(rows, resync)
+            if len(rows) < READ_BATCH:
+                break
+        now = time.monotonic()
+        if now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            conn.execute(delete(CacheEvent).where(CacheEvent.id <= self.last_id - self.keep))
+            conn.commit()
+
+    def _apply(self, rows, resync):
+        if resync:
+            # Pruned past our position: events were lost, so every topic starts over
+            self.resyncs += 1
+            keys_by_topic = {topic: None for topic in _handlers}
+        else:
+            keys_by_topic = {}
+            for row in rows:
+                if row.origin != WORKER_ID:
+                    keys_by_topic.setdefault(row.topic, set()).add(row.key)
+        if not keys_by_topic:
+            return
+        db = ReadSessionLocal.session_factory()  # handlers only reload
+        try:
+            for topic, keys in keys_by_topic.items():
+                for handler in _handlers.get(topic, ()):
+                    handler(db, keys)
+                    self.applied += 1
+        finally:
+            db.close()
+
+    def stats(self):
+        return {
+            "enabled": ENABLED,
+            "worker": WORKER_ID,
+            "last_event_id": self.last_id,
+            "polls": self.polls,
+            "reads": self.reads,
+            "events": self.events,
+            "applied": self.applied,
+            "resyncs": self.resyncs,
+            "errors": self.errors,
+        }
+
+
+poller = Poller()
+
+
+def start():
+    if ENABLED:
+        poller.start()
+
+
+def stop():
+    poller.stop()
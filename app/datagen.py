@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for benchmarking
+Bulk-loads users, businesses, requirements, posts, reactions, comments,
+message threads and connections using Core inserts
+
+Usage:
+    python -m app.datagen --scale 0.01          # ~1k users, 10k posts, 100k reactions
+    python -m app.datagen                       # full size: 100k users, 1M posts, 10M reactions
+    DATABASE_URL=sqlite:////tmp/bench.db python -m app.datagen --wipe
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from sqlalchemy import func, select
+
+from app.main import (
+    engine, get_pwd_context, COUNTRY_MULTIPLIERS,
+    User, Business, Requirement, Message, Post, PostReaction, PostComment, Connection,
+)
+from app.db import Base
+from app.models import MaintenanceState
+from app.migrations import migrate
+from app.rollups import rebuild as rebuild_rollups
+from app.timeline import backfill as backfill_timelines
+from app.trending import rebuild as rebuild_trending
+from app.suggestions import compute_all as compute_suggestions
+
+DEFAULT_PASSWORD = "bench1234"
+CHUNK_SIZE = 10000
+
+# ---------- Distributions ----------
+ROLE_WEIGHTS = [("business", 55), ("investor", 44), ("admin", 1)]
+
+SECTOR_WEIGHTS = [
+    ("Food & Beverage", 18), ("Technology", 16), ("Retail", 14), ("Manufacturing", 9),
+    ("Healthcare", 8), ("Hospitality", 8), ("Education", 7), ("Logistics", 6),
+    ("Fashion", 6), ("Beauty", 4), ("Fitness", 4),
+]
+
+REGION_WEIGHTS = {
+    "North America": 26, "Europe": 24, "Asia Pacific": 30,
+    "South America": 7, "Africa": 5, "Middle East": 8,
+}
+
+PARTNERSHIP_WEIGHTS = [("seek_local_partner", 45), ("seek_investor", 35), ("offer_franchise", 20)]
+
+POST_TYPE_WEIGHTS = [("text", 70), ("image", 18), ("article", 9), ("video", 3)]
+
+REACTION_WEIGHTS = [
+    ("like", 60), ("love", 10), ("celebrate", 10), ("support", 8), ("insightful", 8), ("funny", 4),
+]
+
+CONNECTION_STATUS_WEIGHTS = [("accepted", 80), ("pending", 15), ("declined", 5)]
+
+CITIES = ["Capital", "Harbor City", "Old Town", "Riverside", "Lakeside", "Hillview", "Central", "Northgate"]
+
+FIRST_NAMES = ["Ana", "Ben", "Chen", "Dara", "Elif", "Femi", "Gita", "Hugo", "Ines", "Jon",
+               "Kofi", "Lena", "Mina", "Nils", "Omar", "Priya", "Quinn", "Rosa", "Sami", "Tara"]
+LAST_NAMES = ["Adams", "Bauer", "Costa", "Dubois", "Eze", "Fischer", "Garcia", "Haddad", "Ito",
+              "Jensen", "Kim", "Lopez", "Mehta", "Novak", "Okafor", "Patel", "Rossi", "Silva"]
+BRAND_WORDS = ["Blue", "Peak", "Golden", "Harbor", "Summit", "Bright", "Urban", "Green", "Nova",
+               "Atlas", "Crown", "Maple", "Orbit", "Pioneer", "Cedar", "Delta", "Lumen"]
+BRAND_SUFFIXES = ["Bakery", "Labs", "Foods", "Studio", "Works", "Market", "Capital", "Partners",
+                  "Kitchen", "Logistics", "Health", "Academy", "Goods", "Ventures"]
+VOCABULARY = ("expansion market franchise partner investor growth launch opening store brand "
+              "customers revenue supply chain local team hiring funding round retail demand "
+              "pilot region strategy quarter results export import product service pricing "
+              "announce excited proud milestone new city country opportunity network").split()
+
+
+def _weighted(pairs):
+    values = [v for v, _ in pairs]
+    weights = [w for _, w in pairs]
+    return values, weights
+
+
+def _country_weights():
+    per_region = {}
+    for data in COUNTRY_MULTIPLIERS.values():
+        per_region[data["region"]] = per_region.get(data["region"], 0) + 1
+    return [
+        (country, REGION_WEIGHTS.get(data["region"], 1) / per_region[data["region"]])
+        for country, data in COUNTRY_MULTIPLIERS.items()
+    ]
+
+
+def _sentence(rng, min_words, max_words):
+    words = rng.choices(VOCABULARY, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _timestamps(rng, count, now, days):
+    """Return `count` ascending timestamps spread over the last `days` days"""
+    span = days * 86400
+    offsets = sorted(rng.random() * span for _ in range(count))
+    start = now - datetime.timedelta(days=days)
+    return [start + datetime.timedelta(seconds=o) for o in offsets]
+
+
+def _skewed_count(rng, mean, cap):
+    """Heavy-tailed count (Pareto, alpha=1.5) with the requested mean"""
+    return min(cap, int(rng.paretovariate(1.5) * mean / 3.0 + 0.5))
+
+
+def _next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _bulk_insert(conn, model, rows):
+    table = model.__table__
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            conn.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+
+# ---------- Row generators ----------
+
+def gen_users(rng, start_id, count, now, days, password_hash):
+    roles, role_w = _weighted(ROLE_WEIGHTS)
+    for i, created_at in enumerate(_timestamps(rng, count, now, days)):
+        uid = start_id + i
+        yield {
+            "id": uid,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": f"user{uid}@bench.example",
+            "password_hash": password_hash,
+            "role": rng.choices(roles, role_w)[0],
+            "created_at": created_at,
+        }
+
+
+def gen_businesses(rng, start_id, owners):
+    sectors, sector_w = _weighted(SECTOR_WEIGHTS)
+    countries, country_w = _weighted(_country_weights())
+    for i, owner_id in enumerate(owners):
+        low = rng.choice([25, 50, 100, 250, 500, 1000]) * 1000.0
+        yield {
+            "id": start_id + i,
+            "owner_id": owner_id,
+            "name": f"{rng.choice(BRAND_WORDS)} {rng.choice(BRAND_SUFFIXES)}",
+            "sector": rng.choices(sectors, sector_w)[0],
+            "brand_story": _sentence(rng, 15, 40),
+            "investment_needs_min": low,
+            "investment_needs_max": low * rng.choice([2, 3, 5, 10]),
+            "expansion_potential": _sentence(rng, 8, 20),
+            "country": rng.choices(countries, country_w)[0],
+            "city": rng.choice(CITIES),
+        }
+
+
+def gen_requirements(rng, start_id, count, owners, now, days):
+    sectors, sector_w = _weighted(SECTOR_WEIGHTS)
+    countries, country_w = _weighted(_country_weights())
+    ptypes, ptype_w = _weighted(PARTNERSHIP_WEIGHTS)
+    for i, created_at in enumerate(_timestamps(rng, count, now, days)):
+        low = rng.choice([10, 50, 100, 200, 500]) * 1000.0
+        yield {
+            "id": start_id + i,
+            "owner_id": rng.choice(owners),
+            "title": f"{rng.choice(BRAND_WORDS)} {rng.choice(BRAND_SUFFIXES)} expansion",
+            "sector": rng.choices(sectors, sector_w)[0],
+            "main_brand": rng.choice(BRAND_WORDS),
+            "sub_brand": rng.choice(BRAND_SUFFIXES),
+            "description": _sentence(rng, 15, 50),
+            "country": rng.choices(countries, country_w)[0],
+            "city": rng.choice(CITIES),
+            "partnership_type": rng.choices(ptypes, ptype_w)[0],
+            "budget_min": low,
+            "budget_max": low * rng.choice([2, 4, 8]),
+            "created_at": created_at,
+        }
+
+
+def gen_connections(rng, start_id, user_ids, avg_degree, now, days):
+    """Preferential-attachment graph: half the edges pick a target already in the graph"""
+    statuses, status_w = _weighted(CONNECTION_STATUS_WEIGHTS)
+    target_edges = len(user_ids) * avg_degree // 2
+    seen = set()
+    endpoints = []
+    next_id = start_id
+    stamps = _timestamps(rng, target_edges, now, days)
+    attempts = 0
+    while len(seen) < target_edges and attempts < target_edges * 4:
+        attempts += 1
+        a = rng.choice(user_ids)
+        b = rng.choice(endpoints) if endpoints and rng.random() < 0.5 else rng.choice(user_ids)
+        if a == b:
+            continue
+        pair = (min(a, b), max(a, b))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        endpoints.extend(pair)
+        created_at = stamps[len(seen) - 1]
+        yield {
+            "id": next_id,
+            "requester_id": a,
+            "receiver_id": b,
+            "status": rng.choices(statuses, status_w)[0],
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        next_id += 1
+
+
+def gen_posts(rng, start_id, count, user_ids, now, days):
+    ptypes, ptype_w = _weighted(POST_TYPE_WEIGHTS)
+    for i, created_at in enumerate(_timestamps(rng, count, now, days)):
+        post_type = rng.choices(ptypes, ptype_w)[0]
+        pid = start_id + i
+        yield {
+            "id": pid,
+            "user_id": rng.choice(user_ids),
+            "content": _sentence(rng, 8, 60),
+            "post_type": post_type,
+            "media_url": f"/uploads/images/bench-{pid % 1000}.png" if post_type == "image" else
+                         (f"/uploads/videos/bench-{pid % 100}.mp4" if post_type == "video" else None),
+            "media_thumbnail": None,
+            "article_title": _sentence(rng, 3, 8) if post_type == "article" else None,
+            "article_summary": _sentence(rng, 15, 30) if post_type == "article" else None,
+            "is_deleted": 1 if rng.random() < 0.01 else 0,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def gen_reactions(rng, start_id, target, post_ids, user_ids, now):
+    rtypes, rtype_w = _weighted(REACTION_WEIGHTS)
+    mean = max(1, target // max(1, len(post_ids)))
+    emitted = 0
+    next_id = start_id
+    # One pass over the posts keeps (post_id, user_id) unique; heavy-tailed sizes mimic viral posts
+    for post_id in post_ids:
+        k = min(target - emitted, _skewed_count(rng, mean, len(user_ids)))
+        for uid in rng.sample(user_ids, k):
+            yield {
+                "id": next_id,
+                "post_id": post_id,
+                "user_id": uid,
+                "reaction_type": rng.choices(rtypes, rtype_w)[0],
+                "created_at": now,
+            }
+            next_id += 1
+        emitted += k
+        if emitted >= target:
+            return
+
+
+def gen_comments(rng, start_id, count, post_ids, user_ids, now, days):
+    last_comment = {}
+    for i, created_at in enumerate(_timestamps(rng, count, now, days)):
+        cid = start_id + i
+        # Popular posts attract most of the discussion
+        post_id = post_ids[-min(len(post_ids), int(rng.paretovariate(1.2) * 50))] \
+            if rng.random() < 0.3 else rng.choice(post_ids)
+        parent = last_comment.get(post_id) if rng.random() < 0.2 else None
+        last_comment[post_id] = cid
+        yield {
+            "id": cid,
+            "post_id": post_id,
+            "user_id": rng.choice(user_ids),
+            "content": _sentence(rng, 3, 25),
+            "parent_comment_id": parent,
+            "is_deleted": 1 if rng.random() < 0.01 else 0,
+            "created_at": created_at,
+        }
+
+
+def gen_messages(rng, start_id, threads, per_thread, user_ids, pairs, now, days):
+    next_id = start_id
+    for _ in range(threads):
+        if pairs and rng.random() < 0.8:
+            a, b = rng.choice(pairs)
+        else:
+            a, b = rng.sample(user_ids, 2)
+        n = rng.randint(1, per_thread * 2 - 1)
+        stamps = _timestamps(rng, n, now, rng.randint(1, days))
+        for j, created_at in enumerate(stamps):
+            sender, receiver = (a, b) if rng.random() < 0.5 else (b, a)
+            unread = j >= n - 2 and rng.random() < 0.5
+            yield {
+                "id": next_id,
+                "sender_id": sender,
+                "receiver_id": receiver,
+                "body": _sentence(rng, 2, 30),
+                "message_type": "text",
+                "attachment_url": None,
+                "attachment_name": None,
+                "attachment_size": None,
+                "is_read": 0 if unread else 1,
+                "read_at": None if unread else created_at,
+                "is_deleted": 0,
+                "reply_to_id": None,
+                "created_at": created_at,
+            }
+            next_id += 1
+
+
+# ---------- Loader ----------
+
+def wipe(conn):
+    # Every table, dependents first, so derived tables keep no rows pointing at deleted ids. The
+    # maintenance lease row is run state, not data, and the job expects it to exist.
+    for table in reversed(Base.metadata.sorted_tables):
+        if table is not MaintenanceState.__table__:
+            conn.execute(table.delete())
+
+
+def load(args):
+    rng = random.Random(args.seed)
+    now = datetime.datetime.utcnow()
+    s = args.scale
+    n_users = max(10, int(args.users * s))
+    n_posts = int(args.posts * s)
+    n_reactions = int(args.reactions * s)
+    n_comments = int(args.comments * s)
+    n_threads = int(args.threads * s)
+    n_requirements = int(args.requirements * s)
+
+    # One bcrypt hash shared by every synthetic account; hashing per user would dominate load time
+    password_hash = get_pwd_context().hash(args.password)
+    timings = []
+    migrate(engine)
+
+    def step(label, model, rows):
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            count = _bulk_insert(conn, model, rows)
+        elapsed = time.perf_counter() - t0
+        timings.append((label, count, elapsed))
+        print(f"  {label:<13} {count:>10,} rows in {elapsed:7.1f}s ({count / max(elapsed, 1e-9):,.0f}/s)")
+        return count
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        if args.wipe:
+            print("Wiping existing data...")
+            wipe(conn)
+        first_user = _next_id(conn, User)
+        first = {m: _next_id(conn, m) for m in (Business, Requirement, Connection, Post, PostReaction, PostComment, Message)}
+
+    print(f"Generating dataset (seed={args.seed}, scale={s})")
+    user_rows = list(gen_users(rng, first_user, n_users, now, args.days, password_hash))
+    user_ids = [u["id"] for u in user_rows]
+    business_owners = [u["id"] for u in user_rows if u["role"] == "business"]
+    step("users", User, iter(user_rows))
+    del user_rows
+
+    owners_with_biz = [uid for uid in business_owners if rng.random() < 0.8]
+    step("businesses", Business, gen_businesses(rng, first[Business], owners_with_biz))
+    step("requirements", Requirement,
+         gen_requirements(rng, first[Requirement], n_requirements, business_owners or user_ids, now, args.days))
+
+    accepted_pairs = []
+
+    def track(rows):
+        for row in rows:
+            if row["status"] == "accepted":
+                accepted_pairs.append((row["requester_id"], row["receiver_id"]))
+            yield row
+
+    step("connections", Connection,
+         track(gen_connections(rng, first[Connection], user_ids, args.avg_degree, now, args.days)))
+
+    post_ids = list(range(first[Post], first[Post] + n_posts))
+    step("posts", Post, gen_posts(rng, first[Post], n_posts, user_ids, now, args.days))
+    if post_ids:
+        step("reactions", PostReaction, gen_reactions(rng, first[PostReaction], n_reactions, post_ids, user_ids, now))
+        step("comments", PostComment, gen_comments(rng, first[PostComment], n_comments, post_ids, user_ids, now, args.days))
+    step("messages", Message,
+         gen_messages(rng, first[Message], n_threads, args.messages_per_thread, user_ids, accepted_pairs, now, args.days))
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    timings.append(("analyze", 0, time.perf_counter() - t0))
+
+    # Bulk inserts bypass the endpoints that keep the admin rollups current
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+    timings.append(("rollups", 0, time.perf_counter() - t0))
+
+    # Network feed timelines are fanned out by create_post, which bulk inserts skip too
+    t0 = time.perf_counter()
+    backfill_timelines(engine)
+    timings.append(("timelines", 0, time.perf_counter() - t0))
+
+    # Trending scores are bumped by the reaction and comment endpoints, so rebuild them from the tables
+    t0 = time.perf_counter()
+    rebuild_trending(engine)
+    timings.append(("trending", 0, time.perf_counter() - t0))
+
+    t0 = time.perf_counter()
+    compute_suggestions(engine)
+    timings.append(("suggestions", 0, time.perf_counter() - t0))
+
+    total_rows = sum(c for _, c, _ in timings)
+    total_time = sum(t for _, _, t in timings)
+    print(f"Loaded {total_rows:,} rows in {total_time:.1f}s. All accounts use password '{args.password}'.")
+    return timings
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Generate and bulk-load a synthetic Globridge dataset")
+    p.add_argument("--scale", type=float, default=1.0, help="multiplier applied to every volume below")
+    p.add_argument("--users", type=int, default=100_000)
+    p.add_argument("--posts", type=int, default=1_000_000)
+    p.add_argument("--reactions", type=int, default=10_000_000)
+    p.add_argument("--comments", type=int, default=2_000_000)
+    p.add_argument("--threads", type=int, default=200_000, help="message threads (pairs of users)")
+    p.add_argument("--messages-per-thread", type=int, default=10, help="average messages per thread")
+    p.add_argument("--requirements", type=int, default=50_000)
+    p.add_argument("--avg-degree", type=int, default=8, help="average connections per user")
+    p.add_argument("--days", type=int, default=365, help="spread timestamps over this many days")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--password", default=DEFAULT_PASSWORD)
+    p.add_argument("--wipe", action="store_true", help="delete existing rows before loading")
+    return p
+
+
+if __name__ == "__main__":
+    load(build_parser().parse_args())
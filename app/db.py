@@ -0,0 +1,90 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session
+from starlette.requests import Request
+from urllib.parse import quote
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Production vs Development database handling
+if os.getenv("RAILWAY_ENVIRONMENT") or os.getenv("DATABASE_URL"):
+    # Production environment - use Railway's database or external database
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./globridge.db")
+    DB_PATH = "./globridge.db"
+else:
+    # Development environment
+    DB_PATH = os.path.join(BASE_DIR, "globridge.db")
+    DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+WRITE_POOL_SIZE = int(os.getenv("GLOBRIDGE_WRITE_POOL_SIZE", "5"))
+WRITE_POOL_OVERFLOW = int(os.getenv("GLOBRIDGE_WRITE_POOL_OVERFLOW", "10"))
+READ_POOL_SIZE = int(os.getenv("GLOBRIDGE_READ_POOL_SIZE", "10"))
+READ_POOL_OVERFLOW = int(os.getenv("GLOBRIDGE_READ_POOL_OVERFLOW", "20"))
+READ_ROUTING = os.getenv("GLOBRIDGE_READ_ROUTING", "1") != "0"
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _read_url(url):
+    """A replica from GLOBRIDGE_READ_DATABASE_URL, else the same SQLite file opened read-only (mode=ro)"""
+    replica = os.getenv("GLOBRIDGE_READ_DATABASE_URL")
+    if replica:
+        return replica
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    if parsed.database.startswith("file:"):
+        return None  # already a URI filename; leave its flags alone
+    path = quote(os.path.abspath(parsed.database))
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+
+def _engine(url, pool_size, max_overflow):
+    parsed = make_url(url)
+    options = {}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    if parsed.database not in (None, "", ":memory:"):
+        options.update(pool_size=pool_size, max_overflow=max_overflow)
+    return create_engine(url, **options)
+
+
+# create_engine is lazy: no connection (and no database file) is opened until first use
+engine = _engine(DATABASE_URL, WRITE_POOL_SIZE, WRITE_POOL_OVERFLOW)
+READ_DATABASE_URL = _read_url(DATABASE_URL) if READ_ROUTING else None
+# Without a separate read URL (in-memory database, routing off) reads share the writer
+read_engine = _engine(READ_DATABASE_URL, READ_POOL_SIZE, READ_POOL_OVERFLOW) if READ_DATABASE_URL else engine
+SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+ReadSessionLocal = scoped_session(sessionmaker(bind=read_engine, autoflush=False, autocommit=False))
+Base = declarative_base()
+
+
+def enable_wal(bind=None):
+    """Put a SQLite database in WAL mode (persistent in the file) so readers never wait on the writer"""
+    bind = bind or engine
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA journal_mode=WAL").scalar()
+
+
+def _session(factory):
+    # A fresh session per request, not the scoped one: the registry is keyed by thread, and a request's
+    # dependency frees its threadpool thread once it yields, so a concurrent request could get the same session
+    db = factory.session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db(request: Request):
+    # GET and HEAD handlers get a read-only session; anything that mutates gets the writer
+    if request.method in READ_METHODS:
+        yield from _session(ReadSessionLocal)
+    else:
+        yield from _session(SessionLocal)
+
+
+def get_write_db():
+    """For GET handlers that also write (marking messages read, badge bookkeeping)"""
+    yield from _session(SessionLocal)
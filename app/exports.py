@@ -0,0 +1,158 @@
+"""
+Streaming bulk exports
+
+`GET /api/export/{dataset}` streams businesses, requirements, connections or
+message metadata as CSV or NDJSON. The list endpoints build their whole result
+in memory; an export never does. It opens its own read connection when the
+body starts streaming and executes with `yield_per`, so rows arrive from the
+cursor CHUNK_ROWS at a time. Each chunk is encoded (and gzip-compressed when
+the client sends `Accept-Encoding: gzip`) and handed to the response before
+the next one is read. Memory use therefore depends on CHUNK_ROWS, not on the
+table size.
+
+Businesses and requirements are the directory every signed-in user can
+already browse, and take the list endpoints' filters. Connections and message
+metadata are limited to the viewer's own rows unless the viewer is an admin.
+Message exports carry no bodies and cover both `messages` and
+`messages_archive`.
+"""
+
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from sqlalchemy import select, case, or_, literal
+
+from app.models import User, Business, Requirement, Connection, Message, ArchivedMessage
+from app.read_models import business_filters, requirement_filters
+
+CHUNK_ROWS = 1000
+GZIP_LEVEL = 6
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+# ---------- Datasets ----------
+# Each returns the queries to stream, in order; all of them select the same labelled columns.
+
+def _businesses(viewer, sector=None, country=None, q=None, amount_min=None, amount_max=None, **_):
+    return [
+        select(
+            Business.id, Business.name, Business.sector, Business.country, Business.city,
+            Business.investment_needs_min, Business.investment_needs_max, Business.expansion_potential,
+            Business.brand_story, User.id.label("owner_id"), User.name.label("owner_name"),
+            User.email.label("owner_email"),
+        )
+        .join(User, Business.owner_id == User.id)
+        .where(*business_filters(sector, country, q, amount_min, amount_max).values())
+        .order_by(Business.id)
+    ]
+
+
+def _requirements(viewer, sector=None, country=None, q=None, partnership_type=None, amount_min=None,
+                  amount_max=None, **_):
+    return [
+        select(
+            Requirement.id, Requirement.title, Requirement.sector, Requirement.main_brand, Requirement.sub_brand,
+            Requirement.description, Requirement.country, Requirement.city, Requirement.partnership_type,
+            Requirement.budget_min, Requirement.budget_max, Requirement.created_at,
+            User.id.label("owner_id"), User.name.label("owner_name"),
+        )
+        .join(User, Requirement.owner_id == User.id)
+        .where(*requirement_filters(sector, country, q, partnership_type, amount_min, amount_max).values())
+        .order_by(Requirement.id)
+    ]
+
+
+def _connections(viewer, status=None, **_):
+    q = select(
+        Connection.id, Connection.requester_id, Connection.receiver_id, Connection.status,
+        Connection.created_at, Connection.updated_at,
+    )
+    if viewer.role != "admin":
+        q = q.where(or_(Connection.user_low_id == viewer.id, Connection.user_high_id == viewer.id))
+    if status:
+        q = q.where(Connection.status == status)
+    return [q.order_by(Connection.id)]
+
+
+def _messages(viewer, **_):
+    hot = select(
+        Message.id, Message.sender_id, Message.receiver_id, Message.message_type,
+        Message.attachment_name, Message.attachment_size, Message.is_read, Message.read_at,
+        Message.is_deleted, Message.reply_to_id, Message.created_at, literal(0).label("archived"),
+    )
+    archived_receiver = case((ArchivedMessage.sender_id == ArchivedMessage.user_low_id, ArchivedMessage.user_high_id),
+                             else_=ArchivedMessage.user_low_id)
+    cold = select(
+        ArchivedMessage.id, ArchivedMessage.sender_id, archived_receiver.label("receiver_id"),
+        ArchivedMessage.message_type, ArchivedMessage.attachment_name, ArchivedMessage.attachment_size,
+        literal(1).label("is_read"), ArchivedMessage.read_at, literal(0).label("is_deleted"),
+        ArchivedMessage.reply_to_id, ArchivedMessage.created_at, literal(1).label("archived"),
+    )
+    if viewer.role != "admin":
+        hot = hot.where(or_(Message.sender_id == viewer.id, Message.receiver_id == viewer.id))
+        cold = cold.where(or_(ArchivedMessage.user_low_id == viewer.id, ArchivedMessage.user_high_id == viewer.id))
+    # Two primary-key walks rather than one sorted UNION: a sort would have to see every row first
+    return [hot.order_by(Message.id), cold.order_by(ArchivedMessage.id)]
+
+
+DATASETS = {
+    "businesses": _businesses,
+    "requirements": _requirements,
+    "connections": _connections,
+    "messages": _messages,
+}
+
+
+def queries(dataset, viewer, **filters):
+    return DATASETS[dataset](viewer, **filters)
+
+
+# ---------- Encoding ----------
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (datetime.datetime, datetime.date)) else value
+
+
+def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # header only: nothing matched
+
+
+def _ndjson_chunks(columns, partitions):
+    for rows in partitions:
+        yield "".join(json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + "\n" for row in rows)
+
+
+def _partitions(bind, statements):
+    with bind.connect() as conn:
+        for statement in statements:
+            result = conn.execution_options(yield_per=CHUNK_ROWS).execute(statement)
+            yield from result.partitions()
+
+
+def stream(bind, statements, fmt, compress=False):
+    """Bytes of the export, one encoded chunk of CHUNK_ROWS rows at a time"""
+    columns = list(statements[0].selected_columns.keys())
+    encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    gzip = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip framing
+    for text in encode(columns, _partitions(bind, statements)):
+        data = text.encode("utf-8")
+        if gzip is None:
+            yield data
+        else:
+            data = gzip.compress(data)
+            if data:
+                yield data
+    if gzip is not None:
+        yield gzip.flush()
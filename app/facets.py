@@ -0,0 +1,107 @@
+"""
+Facet counts for the business and requirement directories
+
+For the current filter, each dimension (sector, country, partnership type)
+is counted with one grouped query over its normalized key. That query applies
+every filter except the dimension's own, so the counts show what picking
+another value would return. Results are cached per filter signature and
+dropped on any write to the table, in this worker directly and in the others
+through app/cache_bus.py. The TTL is a backstop.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, func
+
+from app.models import Business, Requirement
+from app.read_models import business_filters, requirement_filters
+
+MAX_ENTRIES = int(os.getenv("GLOBRIDGE_FACET_CACHE_ENTRIES", "512"))
+TTL = float(os.getenv("GLOBRIDGE_FACET_CACHE_TTL", "60"))
+
+# kind -> (table, filter builder, {dimension: (key column, display column)})
+DIMENSIONS = {
+    "businesses": (Business, business_filters, {
+        "sector": (Business.sector_key, Business.sector),
+        "country": (Business.country_key, Business.country),
+    }),
+    "requirements": (Requirement, requirement_filters, {
+        "sector": (Requirement.sector_key, Requirement.sector),
+        "country": (Requirement.country_key, Requirement.country),
+        "partnership_type": (Requirement.partnership_type, Requirement.partnership_type),
+    }),
+}
+
+
+def compute(db, kind, **filters):
+    model, build_filters, dimensions = DIMENSIONS[kind]
+    criteria = build_filters(**filters)
+    facets = {}
+    for dimension, (key, label) in dimensions.items():
+        others = [clause for name, clause in criteria.items() if name != dimension]
+        rows = db.execute(
+            select(key, func.min(label), func.count())
+            .where(key.isnot(None), *others)
+            .group_by(key).order_by(func.count().desc(), key)
+        ).all()
+        facets[dimension] = [{"key": k, "value": value, "count": count} for k, value, count in rows]
+    total = db.execute(select(func.count()).select_from(model).where(*criteria.values())).scalar()
+    return {"total": total, "facets": facets}
+
+
+class FacetCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # signature -> (stored_at, result)
+        self._versions = {}  # kind -> write count
+        self.hits = self.misses = self.invalidations = 0
+
+    def lookup(self, kind, signature):
+        """Return (result or None, token); pass the token back to store() after a miss"""
+        now = time.monotonic()
+        with self._lock:
+            token = self._versions.get(kind, 0)
+            entry = self._entries.get(signature)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(signature)
+                self.hits += 1
+                return entry[1], token
+            self.misses += 1
+            return None, token
+
+    def store(self, kind, signature, token, result):
+        with self._lock:
+            if token != self._versions.get(kind, 0):
+                return  # a write landed while the counts were being computed
+            self._entries[signature] = (time.monotonic(), result)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, kind):
+        """Call after committing any insert or update to the kind's table"""
+        with self._lock:
+            self._versions[kind] = self._versions.get(kind, 0) + 1
+            for signature in [s for s in self._entries if s[0] == kind]:
+                del self._entries[signature]
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+facet_cache = FacetCache()
@@ -0,0 +1,192 @@
+"""
+Shared cache of assembled global feed pages
+
+Pages are cached without per-viewer fields and keyed by a global feed version.
+`create_post` bumps the version, which drops every page because new posts shift
+all offsets. Reactions and comments only change counters, so they patch the
+affected post in place. `user_reaction` is overlaid per request from one small
+lookup of the viewer's reactions on the page.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select, func
+
+from app.models import PostReaction, PostComment
+
+MAX_ENTRIES = int(os.getenv("GLOBRIDGE_FEED_CACHE_ENTRIES", "256"))
+MAX_BYTES = int(os.getenv("GLOBRIDGE_FEED_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+
+def _estimate_size(posts):
+    size = 64
+    for p in posts:
+        size += 400 + sum(len(v) for v in p.values() if isinstance(v, str))
+    return size
+
+
+class FeedPageCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._patch_lock = threading.Lock()
+        self._pages = OrderedDict()  # key -> (posts, size)
+        self._post_index = {}  # post_id -> set of keys holding it
+        self._bytes = 0
+        self.version = 0
+        self._write_seq = 0
+        self.hits = self.misses = self.stores = self.rejected = 0
+        self.patches = self.invalidations = self.evictions = 0
+
+    # ---------- Read path ----------
+
+    def lookup(self, key):
+        """Return (posts or None, token); pass the token back to store() after a miss"""
+        with self._lock:
+            token = (self.version, self._write_seq)
+            entry = self._pages.get((self.version,) + key)
+            if entry is None:
+                self.misses += 1
+                return None, token
+            self._pages.move_to_end((self.version,) + key)
+            self.hits += 1
+            return entry[0], token
+
+    def store(self, key, token, posts):
+        """Cache a page unless a write happened while it was being built"""
+        size = _estimate_size(posts)
+        with self._lock:
+            if token != (self.version, self._write_seq) or size > self.max_bytes:
+                self.rejected += 1
+                return
+            full_key = (self.version,) + key
+            self._drop(full_key)
+            self._pages[full_key] = (posts, size)
+            self._bytes += size
+            for p in posts:
+                self._post_index.setdefault(p["id"], set()).add(full_key)
+            self.stores += 1
+            while self._pages and (len(self._pages) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._pages)))
+                self.evictions += 1
+
+    def _drop(self, full_key):
+        entry = self._pages.pop(full_key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        for p in entry[0]:
+            keys = self._post_index.get(p["id"])
+            if keys:
+                keys.discard(full_key)
+                if not keys:
+                    del self._post_index[p["id"]]
+
+    # ---------- Write path ----------
+
+    def bump(self):
+        """A post was added or removed: every cached page is now misaligned"""
+        with self._lock:
+            self.version += 1
+            self._pages.clear()
+            self._post_index.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def refresh_post(self, post_id, loader):
+        """Patch one post's counters in every cached page that holds it.
+
+        Call after the write commits. `loader()` reads the post's current
+        fields from the database; values are absolute, so repeated or
+        reordered patches converge.
+        """
+        with self._lock:
+            self._write_seq += 1  # pages being built right now may predate the write
+            held = post_id in self._post_index
+        if not held:
+            return
+        with self._patch_lock:
+            fields = loader()
+            with self._lock:
+                for full_key in self._post_index.get(post_id, ()):
+                    for i, p in enumerate(self._pages[full_key][0]):
+                        if p["id"] == post_id:
+                            # Replace rather than mutate: the old dict may be mid-serialization
+                            self._pages[full_key][0][i] = {**p, **fields}
+                self.patches += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._pages),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "rejected_stores": self.rejected,
+                "patches": self.patches,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+feed_cache = FeedPageCache()
+
+
+# ---------- Per-post loaders and per-viewer overlay ----------
+
+def load_reaction_counts(db, post_id):
+    rows = db.execute(
+        select(PostReaction.reaction_type, func.count())
+        .where(PostReaction.post_id == post_id).group_by(PostReaction.reaction_type)
+    ).all()
+    return {"reactions": {reaction_type: count for reaction_type, count in rows}}
+
+
+def load_comment_count(db, post_id):
+    count = db.execute(
+        select(func.count()).select_from(PostComment)
+        .where(PostComment.post_id == post_id, PostComment.is_deleted == 0)
+    ).scalar()
+    return {"comments_count": count}
+
+
+def load_counters(db, post_ids):
+    """{post_id: reaction and comment counters} for a page of posts in two grouped queries"""
+    counters = {post_id: {"reactions": {}, "comments_count": 0} for post_id in post_ids}
+    if not counters:
+        return counters
+    for post_id, reaction_type, count in db.execute(
+        select(PostReaction.post_id, PostReaction.reaction_type, func.count())
+        .where(PostReaction.post_id.in_(post_ids))
+        .group_by(PostReaction.post_id, PostReaction.reaction_type)
+    ):
+        counters[post_id]["reactions"][reaction_type] = count
+    for post_id, count in db.execute(
+        select(PostComment.post_id, func.count())
+        .where(PostComment.post_id.in_(post_ids), PostComment.is_deleted == 0)
+        .group_by(PostComment.post_id)
+    ):
+        counters[post_id]["comments_count"] = count
+    return counters
+
+
+def overlay_user_reactions(db, posts, user_id):
+    """Copy shared page posts and fill in the viewer's own reaction with one query"""
+    if not posts:
+        return []
+    mine = dict(db.execute(
+        select(PostReaction.post_id, PostReaction.reaction_type).where(
+            PostReaction.user_id == user_id,
+            PostReaction.post_id.in_([p["id"] for p in posts]),
+        )
+    ).all())
+    return [{**p, "user_reaction": mine.get(p["id"])} for p in posts]
@@ -0,0 +1,174 @@
+"""
+Connection graph lookups
+
+Every connection row carries its canonical (user_low_id, user_high_id) pair
+under a unique index, so there is at most one edge between two users and the
+edge is found by one index probe whichever side asks. Statuses for a whole
+page of users are resolved in a single query.
+
+The optional adjacency cache keeps each recently seen viewer's edges in
+process memory. It is off unless GLOBRIDGE_GRAPH_CACHE_USERS is set. Other
+workers' edge changes reach it through app/cache_bus.py within a poll interval,
+or when an entry expires (GRAPH_CACHE_TTL) if the bus is off.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, and_, or_, case
+
+from app.models import Connection, User
+
+CACHE_USERS = int(os.getenv("GLOBRIDGE_GRAPH_CACHE_USERS", "0"))
+CACHE_TTL = float(os.getenv("GLOBRIDGE_GRAPH_CACHE_TTL", "30"))
+CACHE_MAX_DEGREE = 5000  # viewers with more edges than this are always read from the database
+
+
+def pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def status_label(viewer_id, status, requester_id):
+    """Viewer-relative status used by search results: connected, sent, received or none"""
+    if status is None:
+        return "none"
+    if status == "accepted":
+        return "connected"
+    return "sent" if requester_id == viewer_id else "received"
+
+
+def edge(db, a, b):
+    """The single connection row between two users, if any"""
+    low, high = pair(a, b)
+    return db.execute(
+        select(Connection).where(Connection.user_low_id == low, Connection.user_high_id == high)
+    ).scalar_one_or_none()
+
+
+def _edges_query(viewer_id, user_ids=None):
+    columns = (Connection.id, Connection.requester_id, Connection.receiver_id, Connection.status)
+    if user_ids is None:
+        low_side = Connection.user_low_id == viewer_id
+        high_side = Connection.user_high_id == viewer_id
+    else:
+        # Each branch is a range probe on one of the two pair indexes
+        low_side = and_(Connection.user_low_id == viewer_id,
+                        Connection.user_high_id.in_([u for u in user_ids if u > viewer_id]))
+        high_side = and_(Connection.user_high_id == viewer_id,
+                         Connection.user_low_id.in_([u for u in user_ids if u < viewer_id]))
+    return select(*columns).where(or_(low_side, high_side))
+
+
+def _to_adjacency(viewer_id, rows):
+    adjacency = {}
+    for conn_id, requester_id, receiver_id, status in rows:
+        other = receiver_id if requester_id == viewer_id else requester_id
+        adjacency[other] = (conn_id, requester_id, status)
+    return adjacency
+
+
+class AdjacencyCache:
+    """LRU of viewer -> {other user: (connection id, requester id, status)}"""
+
+    def __init__(self, max_users=CACHE_USERS, ttl=CACHE_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # viewer -> (loaded_at, adjacency)
+        self._generation = 0
+        self.hits = self.misses = self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_users > 0
+
+    def get(self, db, viewer_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(viewer_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        adjacency = _to_adjacency(viewer_id, db.execute(_edges_query(viewer_id)).all())
+        with self._lock:
+            # Skip the store if an edge changed while we were reading
+            if generation == self._generation and len(adjacency) <= CACHE_MAX_DEGREE:
+                self._entries[viewer_id] = (now, adjacency)
+                self._entries.move_to_end(viewer_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return adjacency
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+adjacency_cache = AdjacencyCache()
+
+
+def edge_changed(a, b):
+    """Call after committing any insert, status change or delete of the a-b edge"""
+    if adjacency_cache.enabled:
+        adjacency_cache.invalidate(a, b)
+
+
+def batch_statuses(db, viewer_id, user_ids):
+    """{user id: (status label, connection id or None)} for every id, in at most one query"""
+    user_ids = [u for u in user_ids if u != viewer_id]
+    if adjacency_cache.enabled:
+        adjacency = adjacency_cache.get(db, viewer_id)
+    elif user_ids:
+        adjacency = _to_adjacency(viewer_id, db.execute(_edges_query(viewer_id, user_ids)).all())
+    else:
+        adjacency = {}
+    result = {}
+    for user_id in user_ids:
+        found = adjacency.get(user_id)
+        if found is None:
+            result[user_id] = ("none", None)
+        else:
+            conn_id, requester_id, status = found
+            result[user_id] = (status_label(viewer_id, status, requester_id), conn_id)
+    return result
+
+
+def connections_with_users(db, viewer_id, status=None):
+    """(Connection, other User) pairs touching the viewer, newest first, in one query"""
+    other_id = case((Connection.requester_id == viewer_id, Connection.receiver_id),
+                    else_=Connection.requester_id)
+    q = (
+        select(Connection, User)
+        .join(User, User.id == other_id)
+        .where(or_(Connection.user_low_id == viewer_id, Connection.user_high_id == viewer_id))
+    )
+    if status:
+        q = q.where(Connection.status == status)
+    return db.execute(q.order_by(Connection.created_at.desc())).all()
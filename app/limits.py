@@ -0,0 +1,250 @@
+"""
+Rate limiting and adaptive load shedding
+
+`LimitMiddleware` guards /api/ before a request reaches a threadpool worker or
+the database:
+
+- Route classes (messages, reactions, uploads, searches, ...) each have a
+  token bucket per signed-in user and a looser one per client IP. A request
+  that finds a bucket empty gets 429 with Retry-After set to the time until
+  the next token. Buckets live in a bounded LRU dict, and each check is O(1).
+  The session cookie is resolved to a user id by the app's `identify`
+  callback (signature check, then one lookup per session per worker, cached),
+  so a forged or stale cookie only counts against its IP. The client IP is
+  the one uvicorn reports, which behind a proxy needs --forwarded-allow-ips.
+- An adaptive concurrency limit caps in-flight API requests. Every window the
+  limit shrinks multiplicatively while the EWMA of SQL statement latency is
+  above target, and otherwise grows by one up to the ceiling. Requests over the
+  limit get 503 with Retry-After instead of queueing behind a slow database.
+
+Rates are configured per class with GLOBRIDGE_RATE_<CLASS>="<tokens per
+second>:<burst>" ("0" turns the class off). GLOBRIDGE_RATE_LIMITS=0 and
+GLOBRIDGE_LOAD_SHEDDING=0 disable each half. All state is in memory and per
+worker.
+"""
+
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+
+import anyio
+from sqlalchemy import event
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+
+RATE_LIMITS = os.getenv("GLOBRIDGE_RATE_LIMITS", "1") != "0"
+LOAD_SHEDDING = os.getenv("GLOBRIDGE_LOAD_SHEDDING", "1") != "0"
+MAX_KEYS = int(os.getenv("GLOBRIDGE_RATE_MAX_KEYS", "100000"))
+MAX_SESSIONS = 10000  # resolved session cookie -> user id entries kept per worker
+IP_FACTOR = float(os.getenv("GLOBRIDGE_RATE_IP_FACTOR", "4"))  # an IP may carry several users (NAT, offices)
+
+SHED_MAX_INFLIGHT = int(os.getenv("GLOBRIDGE_SHED_MAX_INFLIGHT", "64"))
+SHED_MIN_INFLIGHT = int(os.getenv("GLOBRIDGE_SHED_MIN_INFLIGHT", "8"))
+SHED_DB_LATENCY_MS = float(os.getenv("GLOBRIDGE_SHED_DB_LATENCY_MS", "50"))
+SHED_WINDOW = float(os.getenv("GLOBRIDGE_SHED_WINDOW", "0.5"))
+SHED_RETRY_AFTER = 1
+EWMA_ALPHA = 0.1
+
+# class -> (method, path pattern, default "rate:burst")
+ROUTE_CLASSES = {
+    "auth": ("POST", r"/api/(login|register)", "0.2:10"),
+    "messages": ("POST", r"/api/messages", "1:20"),
+    "reactions": ("POST", r"/api/(posts/\d+/reactions|reactions/batch)", "5:30"),
+    "comments": ("POST", r"/api/posts/\d+/comments", "1:20"),
+    "upload": ("POST", r"/api/upload", "0.2:5"),
+    "search": ("GET", r"/api/(users/search|businesses|requirements|businesses/facets|requirements/facets)", "5:30"),
+}
+# Observability endpoints are never shed
+UNSHED = {"/api/health", "/api/metrics"}
+
+
+def _parse_rate(spec):
+    if spec.strip() == "0":
+        return None
+    rate, _, burst = spec.partition(":")
+    return float(rate), float(burst or rate)
+
+
+def _load_rules():
+    rules = {}
+    for name, (method, pattern, default) in ROUTE_CLASSES.items():
+        rate = _parse_rate(os.getenv(f"GLOBRIDGE_RATE_{name.upper()}", default))
+        if rate is not None:
+            rules.setdefault(method, []).append((re.compile(pattern + "$"), name, rate))
+    return rules
+
+
+class RateLimiter:
+    def __init__(self, rules, max_keys=MAX_KEYS):
+        self.rules = rules
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # (class, ident) -> [tokens, updated_at]
+        self.allowed = self.limited = 0
+        self.limited_by_class = {}
+
+    def classify(self, method, path):
+        for pattern, name, rate in self.rules.get(method, ()):
+            if pattern.match(path):
+                return name, rate
+        return None
+
+    def _take(self, key, rate, burst, now):
+        """Spend one token; returns 0 if allowed, else seconds until a token is available"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def check(self, name, rate, user_id, ip, now):
+        per_second, burst = rate
+        wait = self._take((name, "ip", ip), per_second * IP_FACTOR, burst * IP_FACTOR, now)
+        if not wait and user_id is not None:
+            wait = self._take((name, "user", user_id), per_second, burst, now)
+        if wait:
+            self.limited += 1
+            self.limited_by_class[name] = self.limited_by_class.get(name, 0) + 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self):
+        return {"keys": len(self._buckets), "allowed": self.allowed, "limited": self.limited,
+                "limited_by_class": dict(self.limited_by_class)}
+
+
+class LoadShedder:
+    """AIMD concurrency limit driven by SQL latency; admit/release run on the event loop thread"""
+
+    def __init__(self, max_limit=SHED_MAX_INFLIGHT, min_limit=SHED_MIN_INFLIGHT,
+                 target_ms=SHED_DB_LATENCY_MS, window=SHED_WINDOW):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.target_ms = target_ms
+        self.window = window
+        self.limit = max_limit
+        self.in_flight = 0
+        self.db_latency_ms = 0.0
+        self.admitted = self.shed = 0
+        self._adjusted_at = time.monotonic()
+
+    def observe_query(self, seconds):
+        # Called from worker threads; a lost update only nudges an average
+        self.db_latency_ms += EWMA_ALPHA * (seconds * 1000 - self.db_latency_ms)
+
+    def admit(self):
+        if self.in_flight >= self.limit:
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, now):
+        self.in_flight -= 1
+        if now - self._adjusted_at < self.window:
+            return
+        self._adjusted_at = now
+        if self.db_latency_ms > self.target_ms:
+            self.limit = max(self.min_limit, int(self.limit * 0.75))
+        elif self.limit < self.max_limit:
+            self.limit += 1
+
+    def stats(self):
+        return {"limit": self.limit, "in_flight": self.in_flight, "db_latency_ms": round(self.db_latency_ms, 2),
+                "admitted": self.admitted, "shed": self.shed}
+
+
+rate_limiter = RateLimiter(_load_rules())
+load_shedder = LoadShedder()
+
+
+def watch_engine(engine, shedder=load_shedder):
+    """Feed every SQL statement's execution time into the shedder's latency average"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info["limits_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("limits_started", None)
+        if started is not None:
+            shedder.observe_query(time.perf_counter() - started)
+
+
+def _reject(status, retry_after, detail):
+    return JSONResponse({"detail": detail}, status_code=status,
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class LimitMiddleware:
+    def __init__(self, app, limiter=rate_limiter, shedder=load_shedder, session_cookie="globridge_session",
+                 identify=None):
+        self.app = app
+        self.limiter = limiter
+        self.shedder = shedder
+        self.session_cookie = session_cookie
+        self.identify = identify  # session cookie -> user id or None; may query, so it runs in a thread
+        self._users = OrderedDict()  # session cookie -> user id, for cookies that resolved
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        if RATE_LIMITS:
+            rule = self.limiter.classify(scope["method"], path)
+            if rule is not None:
+                user_id = await self._user_id(scope)
+                wait = self.limiter.check(*rule, user_id, (scope.get("client") or ("?",))[0], time.monotonic())
+                if wait:
+                    await _reject(429, wait, "Too many requests, slow down")(scope, receive, send)
+                    return
+
+        if not LOAD_SHEDDING or path in UNSHED:
+            await self.app(scope, receive, send)
+            return
+        if not self.shedder.admit():
+            await _reject(503, SHED_RETRY_AFTER, "Server busy, retry shortly")(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.release(time.monotonic())
+
+    def _session(self, scope):
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                return cookie_parser(value.decode("latin-1")).get(self.session_cookie)
+        return None
+
+    async def _user_id(self, scope):
+        session = self._session(scope)
+        if not session or self.identify is None:
+            return None
+        user_id = self._users.get(session)
+        if user_id is not None:
+            self._users.move_to_end(session)
+            return user_id
+        user_id = await anyio.to_thread.run_sync(self.identify, session)
+        if user_id is not None:
+            # Only cookies that resolved are kept, so made-up values cannot churn the cache
+            self._users[session] = user_id
+            if len(self._users) > MAX_SESSIONS:
+                self._users.popitem(last=False)
+        return user_id
+
+
+def stats():
+    return {"rate_limits": rate_limiter.stats(), "load_shedding": load_shedder.stats()}
@@ -1,45 +1,54 @@
 from fastapi import FastAPI, Request, Response, Depends, HTTPException, UploadFile, File
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 from itsdangerous import TimestampSigner, BadSignature, SignatureExpired
-from passlib.context import CryptContext
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, Float, DateTime, or_, and_
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, scoped_session
-import os, secrets, smtplib, datetime, shutil, uuid
+from sqlalchemy import or_, and_, select
+from sqlalchemy.exc import IntegrityError
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import os, secrets, datetime, shutil, uuid
+
+from app.db import BASE_DIR, engine, read_engine, SessionLocal, ReadSessionLocal, get_db, get_write_db, enable_wal
+from app.models import (
+    User, SessionToken, Business, Requirement, Message, Post, PostReaction, PostComment, Connection,
+    UserSuggestion, normalize_key,
+)
+from app.migrations import migrate
+from app.timeline import fan_out_post, on_connection_accepted, on_connection_removed, timeline_post_ids
+from app.feed_cache import (
+    feed_cache, load_reaction_counts, load_comment_count, load_counters, overlay_user_reactions,
+)
+from app.probe import probe, post_hwm
+from app import badges, graph, trending, rollups, read_models, ranges, assets, shell, limits, reactions, cache_bus, archive, maintenance, exports
+from app.singleflight import flights, request_key
+from app.facets import facet_cache, compute as compute_facets
+from app.media import MediaFiles
+from app.suggestions import mark_dirty as queue_suggestion_refresh, SUGGESTIONS_K
 
 # ---------- Password hashing ----------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib/bcrypt are only needed for register/login, so build the context on first use
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # ---------- App & Secrets ----------
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# Production vs Development database handling
-if os.getenv("RAILWAY_ENVIRONMENT") or os.getenv("DATABASE_URL"):
-    # Production environment - use Railway's database or external database
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./globridge.db")
-    DB_PATH = "./globridge.db"
-else:
-    # Development environment
-    DB_PATH = os.path.join(BASE_DIR, "globridge.db")
-    DATABASE_URL = f"sqlite:///{DB_PATH}"
-
 SECRET_KEY = os.getenv("GLOBRIDGE_SECRET_KEY", "dev-secret-change-me")
 COOKIE_NAME = "globridge_session"
 SIGNER = TimestampSigner(SECRET_KEY)
 
 # ---------- File Upload Configuration ----------
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+UPLOAD_DIR = os.getenv("GLOBRIDGE_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 ALLOWED_VIDEO_TYPES = {"video/mp4", "video/mov", "video/avi", "video/webm"}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
-# Create upload directories if they don't exist
-os.makedirs(f"{UPLOAD_DIR}/images", exist_ok=True)
-os.makedirs(f"{UPLOAD_DIR}/videos", exist_ok=True)
+def init_upload_dirs():
+    os.makedirs(f"{UPLOAD_DIR}/images", exist_ok=True)
+    os.makedirs(f"{UPLOAD_DIR}/videos", exist_ok=True)
 
 # ---------- SMTP Optional ----------
 SMTP_HOST = os.getenv("SMTP_HOST")
@@ -52,6 +61,7 @@ def send_email(to_email: str, subject: str, body: str) -> bool:
     if not (SMTP_HOST and SMTP_USERNAME and SMTP_PASSWORD):
         return False
     try:
+        import smtplib
         msg = f"From: {SMTP_FROM}\r\nTo: {to_email}\r\nSubject: {subject}\r\n\r\n{body}"
         with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
             server.starttls()
@@ -61,122 +71,6 @@ def send_email(to_email: str, subject: str, body: str) -> bool:
     except Exception:
         return False
 
-# ---------- DB ----------
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
-Base = declarative_base()
-
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True)
-    name = Column(String(120), nullable=False)
-    email = Column(String(255), unique=True, nullable=False)
-    password_hash = Column(String(255), nullable=False)
-    role = Column(String(20), nullable=False)  # 'business' or 'investor'
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-    business = relationship("Business", back_populates="owner", uselist=False)
-
-class SessionToken(Base):
-    __tablename__ = "sessions"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String(255), unique=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
-
-class Business(Base):
-    __tablename__ = "businesses"
-    id = Column(Integer, primary_key=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    name = Column(String(200), nullable=False)
-    sector = Column(String(100), nullable=True)
-    brand_story = Column(Text, nullable=True)
-    investment_needs_min = Column(Float, nullable=True)
-    investment_needs_max = Column(Float, nullable=True)
-    expansion_potential = Column(Text, nullable=True)
-    country = Column(String(100), nullable=True)
-    city = Column(String(100), nullable=True)
-
-    owner = relationship("User", back_populates="business")
-
-class Requirement(Base):
-    __tablename__ = "requirements"
-    id = Column(Integer, primary_key=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    title = Column(String(200), nullable=False)
-    sector = Column(String(100), nullable=True)
-    main_brand = Column(String(200), nullable=True)
-    sub_brand = Column(String(200), nullable=True)
-    description = Column(Text, nullable=True)
-    country = Column(String(100), nullable=True)
-    city = Column(String(100), nullable=True)
-    partnership_type = Column(String(50), nullable=True)  # seek_local_partner | seek_investor | offer_franchise
-    budget_min = Column(Float, nullable=True)
-    budget_max = Column(Float, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-    owner = relationship("User")
-
-class Message(Base):
-    __tablename__ = "messages"
-    id = Column(Integer, primary_key=True)
-    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    body = Column(Text, nullable=False)
-    message_type = Column(String, default="text")  # text, image, file, system
-    attachment_url = Column(String, nullable=True)
-    attachment_name = Column(String, nullable=True)
-    attachment_size = Column(Integer, nullable=True)
-    is_read = Column(Integer, default=0)  # 0 = unread, 1 = read
-    read_at = Column(DateTime, nullable=True)
-    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
-    reply_to_id = Column(Integer, ForeignKey("messages.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-class Post(Base):
-    __tablename__ = "posts"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    content = Column(Text, nullable=False)
-    post_type = Column(String, default="text")  # text, image, video, article
-    media_url = Column(String, nullable=True)
-    media_thumbnail = Column(String, nullable=True)
-    article_title = Column(String, nullable=True)
-    article_summary = Column(Text, nullable=True)
-    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
-
-class PostReaction(Base):
-    __tablename__ = "post_reactions"
-    id = Column(Integer, primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    reaction_type = Column(String, default="like")  # like, love, celebrate, support, funny, insightful
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-class PostComment(Base):
-    __tablename__ = "post_comments"
-    id = Column(Integer, primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    content = Column(Text, nullable=False)
-    parent_comment_id = Column(Integer, ForeignKey("post_comments.id"), nullable=True)
-    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-class Connection(Base):
-    __tablename__ = "connections"
-    id = Column(Integer, primary_key=True)
-    requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    status = Column(String, default="pending")  # pending, accepted, declined, blocked
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
-
-Base.metadata.create_all(bind=engine)
-
 # Auto-seed database if empty (for production deployment)
 def auto_seed_if_empty():
     try:
@@ -192,22 +86,24 @@ def auto_seed_if_empty():
                 biz_user = User(
                     name="HAE's Bakery",
                     email="hae@bakery.example",
-                    password_hash=pwd_context.hash("demo1234"),
+                    password_hash=get_pwd_context().hash("demo1234"),
                     role="business"
                 )
                 inv_user = User(
                     name="BluePeak Investments", 
                     email="partner@bluepeak.example",
-                    password_hash=pwd_context.hash("demo1234"),
+                    password_hash=get_pwd_context().hash("demo1234"),
                     role="investor"
                 )
                 admin_user = User(
                     name="Admin User",
                     email="admin@globridge.com",
-                    password_hash=pwd_context.hash("admin123"),
+                    password_hash=get_pwd_context().hash("admin123"),
                     role="admin"
                 )
                 db.add_all([biz_user, inv_user, admin_user])
+                for seeded in (biz_user, inv_user, admin_user):
+                    rollups.record(db, "signups", seeded.role)
                 db.commit()
                 print("Auto-seeding completed successfully!")
             else:
@@ -224,7 +120,45 @@ def auto_seed_if_empty():
 
 
 # ---------- App init ----------
-app = FastAPI(title="Globridge MVP", version="0.1.0")
+# Startup work lives here rather than at import time, so importing app.main (uvicorn workers,
+# tests, scripts) stays cheap and side-effect free.
+AUTO_MIGRATE = os.getenv("GLOBRIDGE_AUTO_MIGRATE", "1") != "0"
+BUILD_ASSETS = os.getenv("GLOBRIDGE_BUILD_ASSETS", "1") != "0"
+SQLITE_WAL = os.getenv("GLOBRIDGE_SQLITE_WAL", "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_upload_dirs()
+    if SQLITE_WAL:
+        enable_wal(engine)  # read-only sessions for GETs then never wait on the writer
+    if AUTO_MIGRATE:
+        migrate(engine)
+    if BUILD_ASSETS:
+        assets.ensure_built()
+    cache_bus.start()
+    maintenance.scheduler.start()
+    yield
+    maintenance.scheduler.stop()
+    cache_bus.stop()
+
+app = FastAPI(title="Globridge MVP", version="0.1.0", lifespan=lifespan)
+
+def session_user_id(token):
+    """The user a session cookie belongs to, or None if it is forged, expired or signed out"""
+    try:
+        SIGNER.unsign(token, max_age=60*60*24*8)
+    except (BadSignature, SignatureExpired):
+        return None  # checked first, so made-up cookies never reach the database
+    with ReadSessionLocal.session_factory() as db:
+        return db.execute(select(SessionToken.user_id).where(
+            SessionToken.token == token, SessionToken.expires_at >= datetime.datetime.utcnow(),
+        )).scalar()
+
+# Rate limits and load shedding run inside CORS, so their 429/503 responses still carry CORS headers
+app.add_middleware(limits.LimitMiddleware, session_cookie=COOKIE_NAME, identify=session_user_id)
+limits.watch_engine(engine)
+if read_engine is not engine:
+    limits.watch_engine(read_engine)
 
 # Add CORS middleware for production deployment
 app.add_middleware(
@@ -237,17 +171,19 @@ app.add_middleware(
 
 # Auto-seed will be handled manually via /api/seed endpoint
 
-app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+app.mount("/static", assets.AssetFiles(directory=assets.STATIC_DIR), name="static")
+# Videos get byte-range serving; mounted first so it wins over the generic /uploads mount
+app.mount("/uploads/videos", MediaFiles(directory=os.path.join(UPLOAD_DIR, "videos"), check_dir=False), name="videos")
+app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR, check_dir=False), name="uploads")
+
+@lru_cache(maxsize=None)
+def get_templates():
+    from fastapi.templating import Jinja2Templates
+    templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+    templates.env.globals["asset_url"] = assets.url
+    return templates
 
 # ---------- Helpers ----------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 def create_session(user_id: int, db):
     token_raw = secrets.token_urlsafe(24)
@@ -279,7 +215,18 @@ def require_auth(request: Request, db):
 # ---------- Routes (web) ----------
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    # Rendered once per asset build and served from memory with an ETag (app/shell.py)
+    return shell.respond(request, _render_index)
+
+def _render_index():
+    return get_templates().get_template("index.html").render()
+
+@app.get("/healthz")
+def healthz():
+    # Platform healthcheck: one trivial query on a pooled connection, no session or table scan
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    return {"status": "ok"}
 
 # ---------- Schemas ----------
 class RegisterForm(BaseModel):
@@ -319,6 +266,12 @@ class PostPayload(BaseModel):
 class ReactionPayload(BaseModel):
     reaction_type: str = "like"  # like, love, celebrate, support, funny, insightful, or empty string to remove
 
+class ReactionChange(ReactionPayload):
+    post_id: int
+
+class ReactionBatchPayload(BaseModel):
+    changes: List[ReactionChange]
+
 class CommentPayload(BaseModel):
     content: str
     parent_comment_id: Optional[int] = None
@@ -346,17 +299,19 @@ def register(payload: RegisterForm, db=Depends(get_db)):
     user = User(
         name=payload.name,
         email=payload.email,
-        password_hash=pwd_context.hash(payload.password),
+        password_hash=get_pwd_context().hash(payload.password),
         role=payload.role
     )
-    db.add(user); db.commit()
+    db.add(user)
+    rollups.record(db, "signups", user.role)
+    db.commit()
     return {"ok": True, "user_id": user.id}
 
 @app.post("/api/login")
 def login(payload: LoginForm, response: Response, db=Depends(get_db)):
     try:
         user = db.query(User).filter(User.email == payload.email).first()
-        if not user or not pwd_context.verify(payload.password, user.password_hash):
+        if not user or not get_pwd_context().verify(payload.password, user.password_hash):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         token, expires = create_session(user.id, db)
         response.set_cookie(COOKIE_NAME, token, httponly=True, secure=False)
@@ -396,36 +351,89 @@ def health_check(db=Depends(get_db)):
             "environment": "production" if os.getenv("RAILWAY_ENVIRONMENT") else "development"
         }
 
+@app.get("/api/metrics")
+def get_metrics():
+    return {
+        "feed_cache": feed_cache.stats(),
+        "graph_cache": graph.adjacency_cache.stats(),
+        "single_flight": flights.stats(),
+        "facet_cache": facet_cache.stats(),
+        "cache_bus": cache_bus.poller.stats(),
+        "maintenance": maintenance.scheduler.stats(),
+        **limits.stats(),
+    }
+
+# ---------- Cross-worker cache invalidation ----------
+# Writes publish a topic in their transaction; other workers' pollers replay it here (app/cache_bus.py).
+# keys=None means the worker fell behind the retained events and must drop everything for the topic.
+
+def _publish_edge(db, a, b):
+    cache_bus.publish(db, "edges", "%d:%d" % graph.pair(a, b))
+
+def _on_feed(db, post_ids):
+    feed_cache.bump()
+    if post_ids:
+        post_hwm.advance(max(int(p) for p in post_ids))
+
+def _on_counters(db, post_ids):
+    if post_ids is None:
+        feed_cache.bump()
+        return
+    for post_id in map(int, post_ids):
+        # The loader only runs if this worker has the post in a cached page
+        feed_cache.refresh_post(post_id, lambda: {**load_reaction_counts(db, post_id),
+                                                  **load_comment_count(db, post_id)})
+
+def _on_facets(db, kinds):
+    for kind in kinds or ("businesses", "requirements"):
+        facet_cache.invalidate(kind)
+
+def _on_edges(db, pairs):
+    if pairs is None:
+        graph.adjacency_cache.clear()
+        return
+    for key in pairs:
+        graph.edge_changed(*map(int, key.split(":")))
+
+cache_bus.subscribe("feed", _on_feed)
+cache_bus.subscribe("counters", _on_counters)
+cache_bus.subscribe("facets", _on_facets)
+cache_bus.subscribe("edges", _on_edges)
+
 # ---------- Requirement APIs ----------
 @app.post("/api/requirements")
 def create_requirement(payload: RequirementPayload, request: Request, db=Depends(get_db)):
     user = require_auth(request, db)
     r = Requirement(owner_id=user.id, **payload.model_dump())
-    db.add(r); db.commit()
+    db.add(r)
+    rollups.record(db, "requirements", user.role)
+    cache_bus.publish(db, "facets", "requirements")
+    db.commit()
+    facet_cache.invalidate("requirements")
     return {"ok": True, "requirement_id": r.id}
 
 @app.get("/api/requirements")
 def list_requirements(request: Request, sector: Optional[str] = None, country: Optional[str] = None,
                       q: Optional[str] = None, partnership_type: Optional[str] = None,
+                      amount_min: Optional[float] = None, amount_max: Optional[float] = None,
                       db=Depends(get_db)):
     user = current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    query = db.query(Requirement).join(User, Requirement.owner_id == User.id)
-    if sector: query = query.filter(Requirement.sector.ilike(f"%{sector}%"))
-    if country: query = query.filter(Requirement.country.ilike(f"%{country}%"))
-    if partnership_type: query = query.filter(Requirement.partnership_type == partnership_type)
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            (Requirement.title.ilike(like)) |
-            (Requirement.description.ilike(like)) |
-            (Requirement.main_brand.ilike(like)) |
-            (Requirement.sub_brand.ilike(like))
-        )
-    rows = query.order_by(Requirement.id.desc()).all()
+    _check_amount_range(amount_min, amount_max)
+    # Every signed-in user sees the same list, so identical concurrent requests share one query
+    key = request_key("requirements", "member", sector=normalize_key(sector), country=normalize_key(country),
+                      q=q, partnership_type=partnership_type, amount_min=amount_min, amount_max=amount_max)
+    return flights.do(key, lambda: _list_requirements(db, sector, country, q, partnership_type, amount_min, amount_max))
+
+def _check_amount_range(amount_min, amount_max):
+    # amount_min/amount_max select rows whose budget or investment range overlaps [amount_min, amount_max]
+    if amount_min is not None and amount_max is not None and amount_min > amount_max:
+        raise HTTPException(status_code=400, detail="amount_min must not exceed amount_max")
+
+def _list_requirements(db, sector, country, q, partnership_type, amount_min=None, amount_max=None):
     items = []
-    for r in rows:
+    for r in read_models.requirement_rows(db, sector, country, q, partnership_type, amount_min, amount_max):
         items.append({
             "id": r.id,
             "title": r.title,
@@ -436,10 +444,35 @@ def list_requirements(request: Request, sector: Optional[str] = None, country: O
             "city": r.city,
             "budget": [r.budget_min, r.budget_max],
             "partnership_type": r.partnership_type,
-            "owner": {"id": r.owner.id, "name": r.owner.name}
+            "owner": {"id": r.owner_id, "name": r.owner_name}
         })
     return {"items": items}
 
+@app.get("/api/requirements/facets")
+def requirement_facets(request: Request, sector: Optional[str] = None, country: Optional[str] = None,
+                       q: Optional[str] = None, partnership_type: Optional[str] = None,
+                       amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+                       db=Depends(get_db)):
+    user = current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    _check_amount_range(amount_min, amount_max)
+    return _facets(db, "requirements", sector=sector, country=country, q=q, partnership_type=partnership_type,
+                   amount_min=amount_min, amount_max=amount_max)
+
+def _facets(db, kind, sector=None, country=None, **filters):
+    # Counts per sector/country/partnership type for the current filter, cached per filter signature
+    signature = request_key(kind, "facets", sector=normalize_key(sector), country=normalize_key(country), **filters)
+    cached, token = facet_cache.lookup(kind, signature)
+    if cached is not None:
+        return cached
+
+    def build():
+        result = compute_facets(db, kind, sector=sector, country=country, **filters)
+        facet_cache.store(kind, signature, token, result)
+        return result
+    return flights.do(signature, build)
+
 # ---------- Business APIs ----------
 @app.post("/api/business")
 def create_or_update_business(payload: BusinessPayload, request: Request, db=Depends(get_db)):
@@ -450,35 +483,47 @@ def create_or_update_business(payload: BusinessPayload, request: Request, db=Dep
     if not biz:
         biz = Business(owner_id=user.id, **payload.model_dump())
         db.add(biz)
+        rollups.record(db, "businesses", user.role)
     else:
         for k, v in payload.model_dump().items():
             setattr(biz, k, v)
+        biz.sector_key = normalize_key(biz.sector)
+        biz.country_key = normalize_key(biz.country)
+    cache_bus.publish(db, "facets", "businesses")
     db.commit()
+    facet_cache.invalidate("businesses")
     return {"ok": True, "business_id": biz.id}
 
 @app.get("/api/businesses")
-def list_businesses(sector: Optional[str] = None, country: Optional[str] = None, q: Optional[str] = None, db=Depends(get_db)):
-    query = db.query(Business).join(User, Business.owner_id == User.id)
-    if sector: query = query.filter(Business.sector.ilike(f"%{sector}%"))
-    if country: query = query.filter(Business.country.ilike(f"%{country}%"))
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Business.name.ilike(like)) | (Business.brand_story.ilike(like)) | (Business.expansion_potential.ilike(like)))
-    rows = query.order_by(Business.id.desc()).all()
+def list_businesses(sector: Optional[str] = None, country: Optional[str] = None, q: Optional[str] = None,
+                    amount_min: Optional[float] = None, amount_max: Optional[float] = None, db=Depends(get_db)):
+    _check_amount_range(amount_min, amount_max)
+    key = request_key("businesses", "public", sector=normalize_key(sector), country=normalize_key(country), q=q,
+                      amount_min=amount_min, amount_max=amount_max)
+    return flights.do(key, lambda: _list_businesses(db, sector, country, q, amount_min, amount_max))
+
+def _list_businesses(db, sector, country, q, amount_min=None, amount_max=None):
     results = []
-    for b in rows:
+    for b in read_models.business_rows(db, sector, country, q, amount_min, amount_max):
         results.append({
             "id": b.id,
             "name": b.name,
             "sector": b.sector,
             "country": b.country,
             "city": b.city,
-            "owner": {"id": b.owner.id, "name": b.owner.name, "email": b.owner.email},
+            "owner": {"id": b.owner_id, "name": b.owner_name, "email": b.owner_email},
             "investment_needs": [b.investment_needs_min, b.investment_needs_max],
             "expansion_potential": b.expansion_potential,
         })
     return {"items": results}
 
+@app.get("/api/businesses/facets")
+def business_facets(sector: Optional[str] = None, country: Optional[str] = None, q: Optional[str] = None,
+                    amount_min: Optional[float] = None, amount_max: Optional[float] = None, db=Depends(get_db)):
+    _check_amount_range(amount_min, amount_max)
+    return _facets(db, "businesses", sector=sector, country=country, q=q,
+                   amount_min=amount_min, amount_max=amount_max)
+
 @app.get("/api/businesses/{biz_id}")
 def get_business(biz_id: int, db=Depends(get_db)):
     b = db.query(Business).get(biz_id)
@@ -490,30 +535,36 @@ def get_business(biz_id: int, db=Depends(get_db)):
 
 # ---------- Matching ----------
 @app.get("/api/matches")
-def get_matches(request: Request, db=Depends(get_db)):
+def get_matches(request: Request, amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+                db=Depends(get_db)):
     user = require_auth(request, db)
+    _check_amount_range(amount_min, amount_max)
     # naive matching: sector keyword + investment range overlap
     if user.role == "business":
-        biz = db.query(Business).filter(Business.owner_id == user.id).first()
-        if not biz:
+        if not read_models.owns_business(db, user.id):
             return {"items": []}
         # find investors who messaged similar sectors before (proxy) or all investors
-        investors = db.query(User).filter(User.role == "investor").all()
-        items = [{"user_id": inv.id, "name": inv.name, "email": inv.email, "fit": 0.6} for inv in investors]
+        items = [{"user_id": inv.id, "name": inv.name, "email": inv.email, "fit": 0.6}
+                 for inv in read_models.investor_rows(db)]
         return {"items": items}
     else:
-        # user is investor -> show businesses that match simple heuristics
-        businesses = db.query(Business).order_by(Business.id.desc()).all()
+        # user is investor -> show businesses whose investment needs overlap the ticket size, if one is given
+        ticket = amount_min is not None or amount_max is not None
         items = []
-        for b in businesses:
+        for b in read_models.business_rows(db, amount_min=amount_min, amount_max=amount_max):
             fit = 0.5
+            if ticket:
+                fit = round(fit + 0.5 * ranges.overlap_fraction(b.investment_needs_min, b.investment_needs_max,
+                                                                amount_min, amount_max), 3)
             items.append({
                 "business_id": b.id, "name": b.name, "sector": b.sector,
                 "country": b.country, "city": b.city,
                 "investment_needs": [b.investment_needs_min, b.investment_needs_max],
-                "owner": {"id": b.owner.id, "name": b.owner.name, "email": b.owner.email},
+                "owner": {"id": b.owner_id, "name": b.owner_name, "email": b.owner_email},
                 "fit": fit
             })
+        if ticket:
+            items.sort(key=lambda item: -item["fit"])
         return {"items": items}
 
 # ---------- Messaging ----------
@@ -523,7 +574,10 @@ def send_message(payload: MessagePayload, request: Request, db=Depends(get_db)):
     receiver = db.query(User).get(payload.to_user_id)
     if not receiver: raise HTTPException(status_code=404, detail="Receiver not found")
     msg = Message(sender_id=sender.id, receiver_id=receiver.id, body=payload.body.strip())
-    db.add(msg); db.commit()
+    db.add(msg)
+    badges.adjust(db, receiver.id, unread=1)
+    rollups.record(db, "messages", sender.role)
+    db.commit()
     # email notify (best-effort)
     send_email(receiver.email, subject=f"New message from {sender.name} on Globridge", 
                body=f"You have a new message:\n\n{payload.body}\n\nLogin to reply.")
@@ -532,10 +586,7 @@ def send_message(payload: MessagePayload, request: Request, db=Depends(get_db)):
 @app.get("/api/messages/thread/{other_user_id}")
 def thread(other_user_id: int, request: Request, db=Depends(get_db)):
     user = require_auth(request, db)
-    msgs = db.query(Message).filter(
-        ((Message.sender_id==user.id) & (Message.receiver_id==other_user_id)) |
-        ((Message.sender_id==other_user_id) & (Message.receiver_id==user.id))
-    ).order_by(Message.created_at.asc()).all()
+    msgs = archive.full_history(db, user.id, other_user_id)
     out = [{"id": m.id, "from": m.sender_id, "to": m.receiver_id, "body": m.body, "created_at": m.created_at.isoformat()} for m in msgs]
     return {"items": out}
 
@@ -630,6 +681,11 @@ class CostInput(BaseModel):
 @app.get("/api/countries")
 def get_countries():
     """Get all available countries for cost comparison"""
+    return _country_list()
+
+@lru_cache(maxsize=None)
+def _country_list():
+    # COUNTRY_MULTIPLIERS is static, so build the sorted list once per process
     countries = []
     for country, data in COUNTRY_MULTIPLIERS.items():
         countries.append({
@@ -722,6 +778,21 @@ def get_conversations(request: Request, db=Depends(get_db)):
                     conv_dict[partner_id]["last_message"] = conv.body
                     conv_dict[partner_id]["last_time"] = conv.created_at
         
+        # Conversations whose messages have all been archived (app/archive.py)
+        archived = {p: m for p, m in archive.latest_by_partner(db, user.id).items() if p not in conv_dict}
+        partners = {u.id: u for u in db.query(User).filter(User.id.in_(archived))} if archived else {}
+        for partner_id, m in sorted(archived.items(), key=lambda item: item[1].id, reverse=True):
+            partner = partners.get(partner_id)
+            if partner:
+                conv_dict[partner_id] = {
+                    "partner_id": partner_id,
+                    "partner_name": partner.name,
+                    "partner_role": partner.role,
+                    "last_message": m.body,
+                    "last_time": m.created_at,
+                    "unread_count": 0
+                }
+        
         return {"conversations": list(conv_dict.values())}
     except Exception as e:
         print(f"Error in get_conversations: {e}")
@@ -729,25 +800,27 @@ def get_conversations(request: Request, db=Depends(get_db)):
         return {"conversations": []}
 
 @app.get("/api/messages/conversation/{partner_id}")
-def get_conversation(partner_id: int, request: Request, db=Depends(get_db)):
+def get_conversation(partner_id: int, request: Request, before_id: Optional[int] = None,
+                     limit: int = archive.PAGE_SIZE, db=Depends(get_write_db)):
     user = current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Get messages between current user and partner (only active messages)
-    messages = db.query(Message).filter(
-        ((Message.sender_id == user.id) & (Message.receiver_id == partner_id)) |
-        ((Message.sender_id == partner_id) & (Message.receiver_id == user.id)),
-        Message.is_deleted == 0
-    ).order_by(Message.created_at.asc()).all()
-    
-    # Mark messages as read when viewing conversation
-    for msg in messages:
-        if msg.receiver_id == user.id and msg.is_read == 0:
-            msg.is_read = 1
-            msg.read_at = datetime.datetime.utcnow()
-    
-    db.commit()
+    limit = max(1, min(limit, archive.MAX_PAGE_SIZE))
+    
+    # Opening the conversation (first page) reads everything the partner has sent
+    if before_id is None:
+        newly_read = db.query(Message).filter(
+            Message.sender_id == partner_id,
+            Message.receiver_id == user.id,
+            Message.is_read == 0,
+            Message.is_deleted == 0
+        ).update({Message.is_read: 1, Message.read_at: datetime.datetime.utcnow()}, synchronize_session=False)
+        if newly_read:
+            badges.adjust(db, user.id, unread=-newly_read)
+            db.commit()
+    
+    # Newest first from the hot table; scrolling back with before_id pages into the archive
+    messages, has_more = archive.conversation_page(db, user.id, partner_id, before_id, limit)
     
     partner = db.query(User).filter(User.id == partner_id).first()
     partner_name = partner.name if partner else f"User #{partner_id}"
@@ -769,22 +842,31 @@ def get_conversation(partner_id: int, request: Request, db=Depends(get_db)):
                 "attachment_name": msg.attachment_name
             }
             for msg in messages
-        ]
+        ],
+        "has_more": has_more,
+        "next_before_id": messages[0].id if has_more else None
     }
 
-@app.get("/api/messages/unread-count")
-def get_unread_count(request: Request, db=Depends(get_db)):
+@app.get("/api/badges")
+def get_badges(request: Request, db=Depends(get_write_db)):
     user = current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    unread_count = db.query(Message).filter(
-        Message.receiver_id == user.id,
-        Message.is_read == 0,
-        Message.is_deleted == 0
-    ).count()
+    counts = badges.get_badges(db, user.id)
+    etag = badges.badges_etag(counts)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(counts, headers=headers)
+
+@app.get("/api/messages/unread-count")
+def get_unread_count(request: Request, db=Depends(get_write_db)):
+    user = current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    return {"unread_count": unread_count}
+    return {"unread_count": badges.get_badges(db, user.id)["unread_messages"]}
 
 @app.post("/api/messages/mark-read/{message_id}")
 def mark_message_read(message_id: int, request: Request, db=Depends(get_db)):
@@ -798,11 +880,16 @@ def mark_message_read(message_id: int, request: Request, db=Depends(get_db)):
     ).first()
     
     if not message:
+        # Archived messages are always read
+        if archive.find_for_user(db, message_id, user.id) is not None:
+            return {"ok": True}
         raise HTTPException(status_code=404, detail="Message not found")
     
     if message.is_read == 0:
         message.is_read = 1
         message.read_at = datetime.datetime.utcnow()
+        if not message.is_deleted:
+            badges.adjust(db, user.id, unread=-1)
         db.commit()
     
     return {"ok": True}
@@ -819,9 +906,19 @@ def delete_message(message_id: int, request: Request, db=Depends(get_db)):
     ).first()
     
     if not message:
-        raise HTTPException(status_code=404, detail="Message not found")
+        # Archived messages have no deleted flag, so they are removed outright
+        archived = archive.find_for_user(db, message_id, user.id)
+        if archived is None or archived.sender_id != user.id:
+            raise HTTPException(status_code=404, detail="Message not found")
+        db.delete(archived)
+        rollups.record(db, "messages", user.role, -1, archived.created_at)
+        db.commit()
+        return {"ok": True}
     
+    if message.is_read == 0 and not message.is_deleted:
+        badges.adjust(db, message.receiver_id, unread=-1)
     message.is_deleted = 1
+    message.deleted_at = datetime.datetime.utcnow()  # the purge job hard-deletes it after the retention window
     db.commit()
     
     return {"ok": True}
@@ -890,81 +987,129 @@ async def upload_file(request: Request, file: UploadFile = File(...), file_type:
 
 # ---------- Feed System API Endpoints ----------
 
+def _mark_feed_seen(db, user_id, posts, offset, before_id):
+    # Only the first page clears the "new feed items" badge. Polls that show nothing new only read,
+    # so the writer (and SQLite's write lock) is touched only when the marker moves.
+    if posts and offset == 0 and not before_id:
+        newest = max(p["id"] for p in posts)
+        if badges.feed_seen_behind(db, user_id, newest):
+            with SessionLocal.session_factory() as writer:
+                badges.mark_feed_seen(writer, user_id, newest)
+                writer.commit()
+
+def _feed_post_query(db):
+    return db.query(
+        Post.id,
+        Post.content,
+        Post.post_type,
+        Post.media_url,
+        Post.media_thumbnail,
+        Post.article_title,
+        Post.article_summary,
+        Post.created_at,
+        Post.user_id,
+        User.name.label('author_name'),
+        User.email.label('author_email'),
+        User.role.label('author_role')
+    ).join(
+        User, Post.user_id == User.id
+    ).filter(
+        Post.is_deleted == 0
+    )
+
+def _feed_posts(db, posts):
+    # Reaction and comment counters for the whole page come from two grouped queries
+    counters = load_counters(db, [post.id for post in posts])
+    return [
+        {
+            "id": post.id,
+            "content": post.content,
+            "post_type": post.post_type,
+            "media_url": post.media_url,
+            "media_thumbnail": post.media_thumbnail,
+            "article_title": post.article_title,
+            "article_summary": post.article_summary,
+            "created_at": post.created_at,
+            "author": {
+                "id": post.user_id,
+                "name": post.author_name,
+                "email": post.author_email,
+                "role": post.author_role
+            },
+            **counters[post.id]
+        }
+        for post in posts
+    ]
+
 @app.get("/api/feed")
-def get_feed(request: Request, db=Depends(get_db), limit: int = 20, offset: int = 0):
+def get_feed(request: Request, db=Depends(get_db), limit: int = 20, offset: int = 0,
+             scope: str = "all", before_id: Optional[int] = None):
     user = current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        # Use JOIN query to get posts with author info
-        posts_query = db.query(
-            Post.id,
-            Post.content,
-            Post.post_type,
-            Post.media_url,
-            Post.media_thumbnail,
-            Post.article_title,
-            Post.article_summary,
-            Post.created_at,
-            Post.user_id,
-            User.name.label('author_name'),
-            User.email.label('author_email'),
-            User.role.label('author_role')
-        ).join(
-            User, Post.user_id == User.id
-        ).filter(
-            Post.is_deleted == 0
-        ).order_by(Post.created_at.desc()).offset(offset).limit(limit)
+        # The global feed is the same for everyone apart from user_reaction, so share assembled pages
+        cache_key = (limit, offset, before_id)
+        if scope != "network":
+            cached_posts, cache_token = feed_cache.lookup(cache_key)
+            if cached_posts is not None:
+                _mark_feed_seen(db, user.id, cached_posts, offset, before_id)
+                return {"posts": overlay_user_reactions(db, cached_posts, user.id)}
         
-        posts = posts_query.all()
+        # Use JOIN query to get posts with author info
+        posts_query = _feed_post_query(db)
         
-        # Get reactions and comments for each post
-        result_posts = []
-        for post in posts:
-            # Get reactions count
-            reactions = db.query(PostReaction).filter(PostReaction.post_id == post.id).all()
-            reaction_counts = {}
-            for reaction in reactions:
-                reaction_counts[reaction.reaction_type] = reaction_counts.get(reaction.reaction_type, 0) + 1
-            
-            # Get comments count
-            comments_count = db.query(PostComment).filter(
-                PostComment.post_id == post.id,
-                PostComment.is_deleted == 0
-            ).count()
-            
-            # Get user's reaction to this post
-            user_reaction = db.query(PostReaction).filter(
-                PostReaction.post_id == post.id,
-                PostReaction.user_id == user.id
-            ).first()
+        if scope == "network":
+            # Connection-scoped feed: page through the viewer's precomputed timeline
+            post_ids = timeline_post_ids(db, user.id, limit, offset=offset, before_id=before_id)
+            posts_query = posts_query.filter(Post.id.in_(post_ids)).order_by(Post.id.desc())
+            result_posts = _feed_posts(db, posts_query.all())
+        else:
+            if before_id:
+                posts_query = posts_query.filter(Post.id < before_id)
+            posts_query = posts_query.order_by(Post.created_at.desc()).offset(offset).limit(limit)
             
-            result_posts.append({
-                "id": post.id,
-                "content": post.content,
-                "post_type": post.post_type,
-                "media_url": post.media_url,
-                "media_thumbnail": post.media_thumbnail,
-                "article_title": post.article_title,
-                "article_summary": post.article_summary,
-                "created_at": post.created_at,
-                "author": {
-                    "id": post.user_id,
-                    "name": post.author_name,
-                    "email": post.author_email,
-                    "role": post.author_role
-                },
-                "reactions": reaction_counts,
-                "user_reaction": user_reaction.reaction_type if user_reaction else None,
-                "comments_count": comments_count
-            })
+            # Concurrent misses on the same page build it once and share it
+            def build_page():
+                page = _feed_posts(db, posts_query.all())
+                feed_cache.store(cache_key, cache_token, page)
+                return page
+            result_posts = flights.do(request_key("feed", "member", limit=limit, offset=offset,
+                                                  before_id=before_id, version=cache_token[0]), build_page)
         
-        return {"posts": result_posts}
+        _mark_feed_seen(db, user.id, result_posts, offset, before_id)
+        return {"posts": overlay_user_reactions(db, result_posts, user.id)}
     except Exception as e:
         print(f"Error in get_feed: {e}")
         return {"posts": []}
 
+@app.get("/api/feed/probe")
+def probe_feed(request: Request, db=Depends(get_db), since_post_id: Optional[int] = None,
+               since_message_id: Optional[int] = None, since_connection_id: Optional[int] = None):
+    user = current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    return probe(db, user.id, since_post_id, since_message_id, since_connection_id)
+
+@app.get("/api/feed/trending")
+def get_trending_feed(request: Request, db=Depends(get_db), limit: int = 20, offset: int = 0):
+    user = current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    limit = max(1, min(limit, 50))
+    ranked = trending.top_posts(db, limit, offset)
+    if not ranked:
+        return {"posts": []}
+    
+    rows = {post.id: post for post in _feed_post_query(db).filter(Post.id.in_([pid for pid, _ in ranked])).all()}
+    posts = [rows[pid] for pid, _ in ranked if pid in rows]
+    scores = dict(ranked)
+    result_posts = [{**p, "trending_score": round(scores[p["id"]], 4)} for p in _feed_posts(db, posts)]
+    return {"posts": overlay_user_reactions(db, result_posts, user.id)}
+
 @app.post("/api/posts")
 def create_post(request: Request, payload: PostPayload, db=Depends(get_db)):
     user = current_user(request, db)
@@ -981,8 +1126,13 @@ def create_post(request: Request, payload: PostPayload, db=Depends(get_db)):
     )
     
     db.add(post)
+    db.flush()
+    fan_out_post(db, post)
+    rollups.record(db, "posts", user.role)
+    cache_bus.publish(db, "feed", post.id)
     db.commit()
-    db.refresh(post)
+    feed_cache.bump()
+    post_hwm.advance(post.id)
     
     return {"ok": True, "post_id": post.id}
 
@@ -992,40 +1142,35 @@ def react_to_post(post_id: int, request: Request, payload: ReactionPayload, db=D
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Check if post exists
-    post = db.query(Post).filter(Post.id == post_id, Post.is_deleted == 0).first()
-    if not post:
+    # Same type toggles off, another type switches, empty string removes (app/reactions.py)
+    found, _ = reactions.apply(db, post_id, user, payload.reaction_type)
+    if not found:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Post not found")
     
-    # Remove existing reaction if any
-    existing_reaction = db.query(PostReaction).filter(
-        PostReaction.post_id == post_id,
-        PostReaction.user_id == user.id
-    ).first()
-    
-    # If reaction_type is empty string, remove existing reaction
-    if not payload.reaction_type or payload.reaction_type == '':
-        if existing_reaction:
-            db.delete(existing_reaction)
-    elif existing_reaction:
-        if existing_reaction.reaction_type == payload.reaction_type:
-            # Remove reaction if same type
-            db.delete(existing_reaction)
-        else:
-            # Update reaction type
-            existing_reaction.reaction_type = payload.reaction_type
-    else:
-        # Add new reaction
-        reaction = PostReaction(
-            post_id=post_id,
-            user_id=user.id,
-            reaction_type=payload.reaction_type
-        )
-        db.add(reaction)
-    
+    cache_bus.publish(db, "counters", post_id)
     db.commit()
+    feed_cache.refresh_post(post_id, lambda: load_reaction_counts(db, post_id))
     return {"ok": True}
 
+@app.post("/api/reactions/batch")
+def react_batch(payload: ReactionBatchPayload, request: Request, db=Depends(get_db)):
+    user = require_auth(request, db)
+    if len(payload.changes) > reactions.MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {reactions.MAX_BATCH} changes per batch")
+    # Changes apply in order in one transaction; a missing post is reported without failing the batch
+    results = []
+    for change in payload.changes:
+        found, reaction_type = reactions.apply(db, change.post_id, user, change.reaction_type)
+        results.append({"post_id": change.post_id, "ok": found, "reaction_type": reaction_type})
+    changed = {r["post_id"] for r in results if r["ok"]}
+    for post_id in changed:
+        cache_bus.publish(db, "counters", post_id)
+    db.commit()
+    for post_id in changed:
+        feed_cache.refresh_post(post_id, lambda: load_reaction_counts(db, post_id))
+    return {"ok": True, "results": results}
+
 @app.get("/api/posts/{post_id}/comments")
 def get_post_comments(post_id: int, request: Request, db=Depends(get_db)):
     user = current_user(request, db)
@@ -1095,8 +1240,11 @@ def add_post_comment(post_id: int, request: Request, payload: CommentPayload, db
     )
     
     db.add(comment)
+    trending.record(db, post_id, trending.COMMENT_WEIGHT)
+    cache_bus.publish(db, "counters", post_id)
     db.commit()
     db.refresh(comment)
+    feed_cache.refresh_post(post_id, lambda: load_comment_count(db, post_id))
     
     return {"ok": True, "comment_id": comment.id}
 
@@ -1108,37 +1256,9 @@ def get_dashboard_stats(request: Request, db=Depends(get_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Get user's posts
-    user_posts = db.query(Post).filter(
-        Post.user_id == user.id,
-        Post.is_deleted == 0
-    ).all()
-    
-    # Get follower count
-    followers_count = db.query(Connection).filter(
-        Connection.receiver_id == user.id,
-        Connection.status == "accepted"
-    ).count()
-    
-    # Get following count
-    following_count = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.status == "accepted"
-    ).count()
-    
-    # Calculate engagement metrics
-    total_likes = 0
-    total_comments = 0
-    total_shares = 0
-    
-    for post in user_posts:
-        # Get reactions for this post
-        reactions = db.query(PostReaction).filter(PostReaction.post_id == post.id).all()
-        total_likes += len(reactions)
-        
-        # Get comments for this post
-        comments = db.query(PostComment).filter(PostComment.post_id == post.id).count()
-        total_comments += comments
+    # Counts come from one aggregate round trip; only the five newest posts are loaded
+    counts = read_models.dashboard_counts(db, user.id)
+    recent_posts = read_models.recent_post_rows(db, user.id, limit=5)
     
     return {
         "user": {
@@ -1148,12 +1268,12 @@ def get_dashboard_stats(request: Request, db=Depends(get_db)):
             "role": user.role
         },
         "stats": {
-            "posts_count": len(user_posts),
-            "followers_count": followers_count,
-            "following_count": following_count,
-            "total_likes": total_likes,
-            "total_comments": total_comments,
-            "total_shares": total_shares
+            "posts_count": counts["posts_count"],
+            "followers_count": counts["followers_count"],
+            "following_count": counts["following_count"],
+            "total_likes": counts["total_likes"],
+            "total_comments": counts["total_comments"],
+            "total_shares": 0
         },
         "recent_posts": [
             {
@@ -1162,10 +1282,10 @@ def get_dashboard_stats(request: Request, db=Depends(get_db)):
                 "post_type": post.post_type,
                 "media_url": post.media_url,
                 "created_at": post.created_at.isoformat(),
-                "likes_count": db.query(PostReaction).filter(PostReaction.post_id == post.id).count(),
-                "comments_count": db.query(PostComment).filter(PostComment.post_id == post.id).count()
+                "likes_count": likes_count,
+                "comments_count": comments_count
             }
-            for post in user_posts[:5]  # Last 5 posts
+            for post, likes_count, comments_count in recent_posts
         ]
     }
 
@@ -1269,30 +1389,12 @@ def get_connections(request: Request, db=Depends(get_db), status: Optional[str]
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    query = db.query(Connection).filter(
-        (Connection.requester_id == user.id) | (Connection.receiver_id == user.id)
-    )
-    
-    if status:
-        query = query.filter(Connection.status == status)
-    
-    connections = query.order_by(Connection.created_at.desc()).all()
-    
     result_connections = []
-    for conn in connections:
-        if conn.requester_id == user.id:
-            other_user_id = conn.receiver_id
-            connection_type = "sent"
-        else:
-            other_user_id = conn.requester_id
-            connection_type = "received"
-        
-        other_user = db.query(User).filter(User.id == other_user_id).first()
-        
+    for conn, other_user in graph.connections_with_users(db, user.id, status):
         result_connections.append({
             "id": conn.id,
             "status": conn.status,
-            "connection_type": connection_type,
+            "connection_type": "sent" if conn.requester_id == user.id else "received",
             "created_at": conn.created_at,
             "user": {
                 "id": other_user.id,
@@ -1304,7 +1406,15 @@ def get_connections(request: Request, db=Depends(get_db), status: Optional[str]
     
     return {"connections": result_connections}
 
+def _reject_existing_edge(existing_connection, user_id):
+    if existing_connection is not None and existing_connection.status == "accepted":
+        raise HTTPException(status_code=400, detail="Already connected")
+    elif existing_connection is not None and existing_connection.requester_id != user_id:
+        raise HTTPException(status_code=400, detail="Connection request already received")
+    raise HTTPException(status_code=400, detail="Connection request already sent")
+
 @app.post("/api/connections")
+@app.post("/api/connections/send")
 def send_connection_request(request: Request, payload: ConnectionPayload, db=Depends(get_db)):
     user = current_user(request, db)
     if not user:
@@ -1313,21 +1423,16 @@ def send_connection_request(request: Request, payload: ConnectionPayload, db=Dep
     if payload.receiver_id == user.id:
         raise HTTPException(status_code=400, detail="Cannot connect to yourself")
     
-    # Check if connection already exists
-    existing_connection = db.query(Connection).filter(
-        (Connection.requester_id == user.id) & (Connection.receiver_id == payload.receiver_id)
-    ).first()
-    
-    if existing_connection:
-        raise HTTPException(status_code=400, detail="Connection request already sent")
+    # Check if receiver exists
+    receiver = db.get(User, payload.receiver_id)
+    if not receiver:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Check if reverse connection exists
-    reverse_connection = db.query(Connection).filter(
-        (Connection.requester_id == payload.receiver_id) & (Connection.receiver_id == user.id)
-    ).first()
+    # At most one edge per pair, whichever side created it
+    existing_connection = graph.edge(db, user.id, payload.receiver_id)
     
-    if reverse_connection:
-        raise HTTPException(status_code=400, detail="Connection request already exists")
+    if existing_connection:
+        _reject_existing_edge(existing_connection, user.id)
     
     connection = Connection(
         requester_id=user.id,
@@ -1336,10 +1441,18 @@ def send_connection_request(request: Request, payload: ConnectionPayload, db=Dep
     )
     
     db.add(connection)
+    try:
+        db.flush()  # a concurrent send for the same pair passes the check above and loses on ux_connections_pair here
+    except IntegrityError:
+        db.rollback()
+        _reject_existing_edge(graph.edge(db, user.id, payload.receiver_id), user.id)
+    badges.adjust(db, payload.receiver_id, pending=1)
+    rollups.record(db, "connections", user.role)
+    _publish_edge(db, user.id, payload.receiver_id)
     db.commit()
-    db.refresh(connection)
+    graph.edge_changed(user.id, payload.receiver_id)
     
-    return {"ok": True, "connection_id": connection.id}
+    return {"ok": True, "message": "Connection request sent", "connection_id": connection.id}
 
 @app.put("/api/connections/{connection_id}")
 def update_connection_status(connection_id: int, request: Request, status: str, db=Depends(get_db)):
@@ -1358,8 +1471,19 @@ def update_connection_status(connection_id: int, request: Request, status: str,
     if status not in ["accepted", "declined", "blocked"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
+    was_accepted = connection.status == "accepted"
+    if connection.status == "pending":
+        badges.adjust(db, user.id, pending=-1)
     connection.status = status
+    if status == "accepted" and not was_accepted:
+        on_connection_accepted(db, connection.requester_id, connection.receiver_id)
+        queue_suggestion_refresh(db, connection.requester_id, connection.receiver_id)
+    elif status != "accepted" and was_accepted:
+        on_connection_removed(db, connection.requester_id, connection.receiver_id)
+        queue_suggestion_refresh(db, connection.requester_id, connection.receiver_id)
+    _publish_edge(db, connection.requester_id, connection.receiver_id)
     db.commit()
+    graph.edge_changed(connection.requester_id, connection.receiver_id)
 
     return {"ok": True}
 
@@ -1380,26 +1504,18 @@ def search_users(request: Request, db=Depends(get_db), q: Optional[str] = None,
         query = query.filter(User.role == role)
     
     users = query.limit(20).all()
+    statuses = graph.batch_statuses(db, user.id, [u.id for u in users])
     
-    # Get connection status for each user
     result_users = []
     for u in users:
-        # Check connection status
-        connection = db.query(Connection).filter(
-            ((Connection.requester_id == user.id) & (Connection.receiver_id == u.id)) |
-            ((Connection.requester_id == u.id) & (Connection.receiver_id == user.id))
-        ).first()
-        
-        connection_status = None
-        if connection:
-            connection_status = connection.status
-        
+        connection_status, connection_id = statuses[u.id]
         result_users.append({
             "id": u.id,
             "name": u.name,
             "email": u.email,
             "role": u.role,
-            "connection_status": connection_status
+            "connection_status": connection_status,
+            "connection_id": connection_id
         })
     
     return {"users": result_users}
@@ -1411,22 +1527,25 @@ def get_admin_stats(request: Request, db=Depends(get_db)):
     if not user or user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    total_users = db.query(User).count()
-    total_requirements = db.query(Requirement).count()
-    total_messages = db.query(Message).count()
-    total_businesses = db.query(Business).count()
+    # Running totals maintained by app/rollups.py instead of COUNT(*) over each table
+    totals = rollups.totals(db)
     
-    recent_users = db.query(User).order_by(User.created_at.desc()).limit(5).all()
-    recent_requirements = db.query(Requirement).order_by(Requirement.created_at.desc()).limit(5).all()
-    recent_messages = db.query(Message).order_by(Message.created_at.desc()).limit(5).all()
+    # Newest rows by primary key: a short index walk rather than a sort on created_at
+    recent_users = db.query(User).order_by(User.id.desc()).limit(5).all()
+    recent_requirements = db.query(Requirement).order_by(Requirement.id.desc()).limit(5).all()
+    recent_messages = db.query(Message).order_by(Message.id.desc()).limit(5).all()
     
     return {
         "stats": {
-            "total_users": total_users,
-            "total_requirements": total_requirements,
-            "total_messages": total_messages,
-            "total_businesses": total_businesses
+            "total_users": totals["signups"]["total"],
+            "total_requirements": totals["requirements"]["total"],
+            "total_messages": totals["messages"]["total"],
+            "total_businesses": totals["businesses"]["total"],
+            "total_posts": totals["posts"]["total"],
+            "total_reactions": totals["reactions"]["total"],
+            "total_connections": totals["connections"]["total"]
         },
+        "by_role": {metric: entry["by_role"] for metric, entry in totals.items()},
         "recent_users": [
             {
                 "id": u.id,
@@ -1459,96 +1578,43 @@ def get_admin_stats(request: Request, db=Depends(get_db)):
         ]
     }
 
-# ---------- Seed demo (optional) ----------
-# ---------- Seed demo (optional) ----------@app.post("/api/seed")def seed(db=Depends(get_db)):    try:        if db.query(User).count() > 0:            return {"skipped": True}        # Users        biz_user = User(            name="HAE's Bakery",            email="hae@bakery.example",            password_hash=pwd_context.hash("demo1234"),            role="business"        )        inv_user = User(            name="BluePeak Investments",            email="partner@bluepeak.example",            password_hash=pwd_context.hash("demo1234"),            role="investor"        )        admin_user = User(            name="Admin User",            email="admin@globridge.com",            password_hash=pwd_context.hash("admin123"),            role="admin"        )        db.add_all([biz_user, inv_user, admin_user])        db.commit()        db.refresh(biz_user)        db.refresh(inv_user)        db.refresh(admin_user)                return {"ok": True}    except Exception as e:        print(f"Seed error: {e}")        return {"error": f"Seed failed: {str(e)}"}
-# ---------- Connection Management API Endpoints ----------
-
-@app.get("/api/users/search")
-def search_users(request: Request, db=Depends(get_db), q: str = "", role: str = ""):
+@app.get("/api/admin/trends")
+def get_admin_trends(request: Request, db=Depends(get_db), days: int = 30):
     user = current_user(request, db)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Build query
-    query = db.query(User).filter(User.id != user.id)  # Exclude current user
-    
-    if q:
-        query = query.filter(
-            (User.name.ilike(f"%{q}%")) |
-            (User.email.ilike(f"%{q}%"))
-        )
-    
-    if role:
-        query = query.filter(User.role == role)
-    
-    users = query.limit(20).all()
-    
-    # Get connection status for each user
-    result_users = []
-    for u in users:
-        # Check if there's a connection between current user and this user
-        connection = db.query(Connection).filter(
-            ((Connection.requester_id == user.id) & (Connection.receiver_id == u.id)) |
-            ((Connection.requester_id == u.id) & (Connection.receiver_id == user.id))
-        ).first()
-        
-        connection_status = "none"
-        if connection:
-            if connection.status == "accepted":
-                connection_status = "connected"
-            elif connection.requester_id == user.id:
-                connection_status = "sent"
-            else:
-                connection_status = "received"
-        
-        result_users.append({
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "role": u.role,
-            "connection_status": connection_status
-        })
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    return {"users": result_users}
+    return rollups.daily_series(db, max(1, min(days, 365)))
 
-@app.post("/api/connections/send")
-def send_connection_request(request: Request, payload: ConnectionPayload, db=Depends(get_db)):
+# ---------- Exports ----------
+
+@app.get("/api/export/{dataset}")
+def export_dataset(dataset: str, request: Request, format: str = "csv", sector: Optional[str] = None,
+                   country: Optional[str] = None, q: Optional[str] = None, partnership_type: Optional[str] = None,
+                   amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+                   status: Optional[str] = None, db=Depends(get_db)):
     user = current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    if payload.receiver_id == user.id:
-        raise HTTPException(status_code=400, detail="Cannot connect to yourself")
-    
-    # Check if receiver exists
-    receiver = db.query(User).get(payload.receiver_id)
-    if not receiver:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if connection already exists
-    existing_connection = db.query(Connection).filter(
-        ((Connection.requester_id == user.id) & (Connection.receiver_id == payload.receiver_id)) |
-        ((Connection.requester_id == payload.receiver_id) & (Connection.receiver_id == user.id))
-    ).first()
-    
-    if existing_connection:
-        if existing_connection.status == "accepted":
-            raise HTTPException(status_code=400, detail="Already connected")
-        elif existing_connection.requester_id == user.id:
-            raise HTTPException(status_code=400, detail="Connection request already sent")
-        else:
-            raise HTTPException(status_code=400, detail="Connection request already received")
-    
-    # Create new connection request
-    connection = Connection(
-        requester_id=user.id,
-        receiver_id=payload.receiver_id,
-        status="pending"
-    )
-    db.add(connection)
-    db.commit()
-    
-    return {"message": "Connection request sent", "connection_id": connection.id}
+    if dataset not in exports.DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    _check_amount_range(amount_min, amount_max)
+    statements = exports.queries(dataset, user, sector=sector, country=country, q=q,
+                                 partnership_type=partnership_type, amount_min=amount_min,
+                                 amount_max=amount_max, status=status)
+    # The body streams after this handler's session is closed, so it reads on its own connection
+    compress = "gzip" in assets.accepted_encodings(request.headers.get("accept-encoding", ""))
+    headers = {"Content-Disposition": f'attachment; filename="{dataset}.{format}"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(exports.stream(read_engine, statements, format, compress),
+                             media_type=exports.FORMATS[format], headers=headers)
+
+# ---------- Seed demo (optional) ----------
+# ---------- Seed demo (optional) ----------@app.post("/api/seed")def seed(db=Depends(get_db)):    try:        if db.query(User).count() > 0:            return {"skipped": True}        # Users        biz_user = User(            name="HAE's Bakery",            email="hae@bakery.example",            password_hash=pwd_context.hash("demo1234"),            role="business"        )        inv_user = User(            name="BluePeak Investments",            email="partner@bluepeak.example",            password_hash=pwd_context.hash("demo1234"),            role="investor"        )        admin_user = User(            name="Admin User",            email="admin@globridge.com",            password_hash=pwd_context.hash("admin123"),            role="admin"        )        db.add_all([biz_user, inv_user, admin_user])        db.commit()        db.refresh(biz_user)        db.refresh(inv_user)        db.refresh(admin_user)                return {"ok": True}    except Exception as e:        print(f"Seed error: {e}")        return {"error": f"Seed failed: {str(e)}"}
+# ---------- Connection Management API Endpoints ----------
 
 @app.post("/api/connections/respond")
 def respond_to_connection_request(request: Request, connection_id: int, action: str, db=Depends(get_db)):
@@ -1566,17 +1632,61 @@ def respond_to_connection_request(request: Request, connection_id: int, action:
     if connection.status != "pending":
         raise HTTPException(status_code=400, detail="Connection request already processed")
     
+    pair = (connection.requester_id, connection.receiver_id)
     if action == "accept":
         connection.status = "accepted"
+        on_connection_accepted(db, connection.requester_id, connection.receiver_id)
+        queue_suggestion_refresh(db, *pair)
+        badges.adjust(db, user.id, pending=-1)
+        _publish_edge(db, *pair)
         db.commit()
+        graph.edge_changed(*pair)
         return {"message": "Connection request accepted"}
     elif action == "decline":
         db.delete(connection)
+        badges.adjust(db, user.id, pending=-1)
+        requester = db.get(User, connection.requester_id)
+        rollups.record(db, "connections", requester.role if requester else None, -1, connection.created_at)
+        _publish_edge(db, *pair)
         db.commit()
+        graph.edge_changed(*pair)
         return {"message": "Connection request declined"}
     else:
         raise HTTPException(status_code=400, detail="Invalid action. Use 'accept' or 'decline'")
 
+@app.get("/api/connections/suggestions")
+def get_connection_suggestions(request: Request, db=Depends(get_db), limit: int = 10):
+    user = current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    limit = max(1, min(limit, SUGGESTIONS_K))
+    
+    # Precomputed by `python -m app.suggestions`; requests sent since then are filtered out here
+    rows = db.execute(
+        select(UserSuggestion, User)
+        .join(User, User.id == UserSuggestion.suggested_id)
+        .where(UserSuggestion.user_id == user.id)
+        .order_by(UserSuggestion.score.desc(), UserSuggestion.suggested_id)
+    ).all()
+    statuses = graph.batch_statuses(db, user.id, [u.id for _, u in rows])
+    
+    return {
+        "suggestions": [
+            {
+                "user": {
+                    "id": u.id,
+                    "name": u.name,
+                    "email": u.email,
+                    "role": u.role
+                },
+                "mutual_connections": s.mutual_count,
+                "score": round(s.score, 3)
+            }
+            for s, u in rows if statuses[u.id][0] == "none"
+        ][:limit]
+    }
+
 @app.get("/api/connections/requests")
 def get_connection_requests(request: Request, db=Depends(get_db)):
     user = current_user(request, db)
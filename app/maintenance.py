@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Purge and storage maintenance
+
+Deleting a post, comment or message only sets `is_deleted`, so every hot query
+filters the row out but it stays in the table and its indexes. `run()` is the
+periodic clean-up. Each step works in short write transactions with a pause
+between them, and the whole run stops at BUDGET_SECONDS:
+
+1. stamp `deleted_at` on flagged rows that lack it, PURGE_BATCH ids per
+   transaction; this starts the retention clock, so rows flagged by older code
+   or by hand get a full window too
+2. hard-delete rows flagged for longer than PURGE_AFTER_DAYS, PURGE_BATCH per
+   transaction. A post takes its reactions, comments, trending score and
+   timeline entries with it. A comment takes its replies. Rollups are
+   decremented in the same transaction, and upload files that no remaining
+   row references are removed once the rows are gone
+3. archive old read messages (app/archive.py), within the same budget
+4. return free pages to the filesystem with `PRAGMA incremental_vacuum`,
+   VACUUM_PAGES at a time. This needs auto_vacuum=INCREMENTAL, which an
+   existing database only gets from one full VACUUM; `--enable-incremental-vacuum`
+   does that, ideally in a quiet window
+5. `ANALYZE` one table per statement under `PRAGMA analysis_limit`
+
+Every worker runs a scheduler thread that checks every CHECK_INTERVAL seconds
+whether a run is due (GLOBRIDGE_MAINTENANCE_INTERVAL, 0 = off). The run takes a
+lease in the single `maintenance_state` row first, so one worker runs it at a
+time. The CLI takes the same lease but ignores the interval.
+
+Usage:
+    python -m app.maintenance                 # run every step now
+    python -m app.maintenance --purge-after-days 7 --budget 600
+    python -m app.maintenance --enable-incremental-vacuum
+"""
+
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import select, update, delete, func, and_, or_, literal_column
+
+from app.db import BASE_DIR, engine as default_engine, Base
+from app.models import (
+    User, Message, ArchivedMessage, Post, PostReaction, PostComment, PostTrendingScore, MaintenanceState,
+)
+from app.migrations import migrate
+from app import archive, rollups, timeline
+
+PURGE_AFTER_DAYS = int(os.getenv("GLOBRIDGE_PURGE_AFTER_DAYS", "30"))
+INTERVAL = float(os.getenv("GLOBRIDGE_MAINTENANCE_INTERVAL", "21600"))  # seconds between runs
+BUDGET_SECONDS = float(os.getenv("GLOBRIDGE_MAINTENANCE_BUDGET", "60"))
+UPLOAD_DIR = os.getenv("GLOBRIDGE_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))  # as in app.main
+CHECK_INTERVAL = 300.0
+LEASE_SECONDS = 900
+PURGE_BATCH = 500
+VACUUM_PAGES = 256
+ANALYSIS_LIMIT = 1000
+PAUSE = 0.05  # between write transactions, so request handlers get the lock
+
+
+def _flagged(model):
+    # Literal 1 so SQLite can match the partial deleted_at indexes
+    return model.is_deleted == literal_column("1")
+
+
+class _Run:
+    def __init__(self, bind, budget):
+        self.bind = bind
+        self.deadline = time.monotonic() + budget
+        self.report = {}
+
+    def out_of_time(self):
+        return time.monotonic() >= self.deadline
+
+    def count(self, key, n):
+        self.report[key] = self.report.get(key, 0) + n
+
+
+# ---------- Purge ----------
+
+def stamp(run):
+    now = datetime.datetime.utcnow()
+    for model in (Post, PostComment, Message):
+        unstamped = and_(_flagged(model), model.deleted_at.is_(None))
+        start = 0
+        # Primary-key ranges from the next unstamped id, one transaction each, like the purge batches
+        while not run.out_of_time():
+            with run.bind.begin() as conn:
+                start = conn.execute(select(func.min(model.id)).where(unstamped, model.id >= start)).scalar()
+                if start is None:
+                    break
+                n = conn.execute(update(model).where(unstamped, model.id >= start, model.id < start + PURGE_BATCH)
+                                 .values(deleted_at=now)).rowcount
+            run.count("stamped", n)
+            start += PURGE_BATCH
+            time.sleep(PAUSE)
+
+
+def _batches(run, model, cutoff, *columns):
+    """Yield (conn, rows) for flagged rows past the cutoff, one transaction per batch"""
+    while not run.out_of_time():
+        with run.bind.begin() as conn:
+            rows = conn.execute(
+                select(model.id, *columns).where(_flagged(model), model.deleted_at < cutoff).limit(PURGE_BATCH)
+            ).all()
+            if rows:
+                yield conn, rows
+        if len(rows) < PURGE_BATCH:
+            return
+        time.sleep(PAUSE)
+
+
+def purge_posts(run, cutoff, files):
+    for conn, rows in _batches(run, Post, cutoff, Post.user_id, Post.media_url, Post.media_thumbnail):
+        ids = [r.id for r in rows]
+        reactions = conn.execute(
+            select(User.role, PostReaction.created_at)
+            .outerjoin(User, User.id == PostReaction.user_id).where(PostReaction.post_id.in_(ids))
+        ).all()
+        posts = conn.execute(
+            select(User.role, Post.created_at).outerjoin(User, User.id == Post.user_id).where(Post.id.in_(ids))
+        ).all()
+        rollups.forget(conn, "reactions", reactions)
+        rollups.forget(conn, "posts", posts)
+        conn.execute(delete(PostReaction).where(PostReaction.post_id.in_(ids)))
+        comments = conn.execute(delete(PostComment).where(PostComment.post_id.in_(ids))).rowcount
+        conn.execute(delete(PostTrendingScore).where(PostTrendingScore.post_id.in_(ids)))
+        timeline.remove_posts(conn, [(r.id, r.user_id) for r in rows])
+        conn.execute(delete(Post).where(Post.id.in_(ids)))
+        files.update(u for r in rows for u in (r.media_url, r.media_thumbnail) if u)
+        run.count("posts", len(ids))
+        run.count("reactions", len(reactions))
+        run.count("comments", comments)
+
+
+def purge_comments(run, cutoff):
+    for conn, rows in _batches(run, PostComment, cutoff):
+        ids = [r.id for r in rows]
+        n = conn.execute(delete(PostComment).where(
+            or_(PostComment.id.in_(ids), PostComment.parent_comment_id.in_(ids))
+        )).rowcount
+        run.count("comments", n)
+
+
+def purge_messages(run, cutoff, files):
+    for conn, rows in _batches(run, Message, cutoff, Message.attachment_url):
+        ids = [r.id for r in rows]
+        roles = conn.execute(
+            select(User.role, Message.created_at)
+            .outerjoin(User, User.id == Message.sender_id).where(Message.id.in_(ids))
+        ).all()
+        rollups.forget(conn, "messages", roles)
+        conn.execute(delete(Message).where(Message.id.in_(ids)))
+        files.update(r.attachment_url for r in rows if r.attachment_url)
+        run.count("messages", len(ids))
+
+
+def _upload_path(url, upload_dir):
+    """The file behind an /uploads/ URL, or None if the URL points anywhere else"""
+    if not url.startswith("/uploads/"):
+        return None
+    root = os.path.realpath(upload_dir)
+    path = os.path.realpath(os.path.join(root, url[len("/uploads/"):]))
+    return path if path.startswith(root + os.sep) else None
+
+
+def remove_files(run, files, upload_dir=UPLOAD_DIR):
+    """Delete upload files no remaining post or message refers to"""
+    files = sorted(files)
+    referenced = set()
+    with run.bind.connect() as conn:
+        for i in range(0, len(files), PURGE_BATCH):
+            chunk = files[i:i + PURGE_BATCH]
+            for column in (Post.media_url, Post.media_thumbnail, Message.attachment_url,
+                           ArchivedMessage.attachment_url):
+                referenced.update(conn.execute(select(column).where(column.in_(chunk)).distinct()).scalars())
+    for url in files:
+        path = _upload_path(url, upload_dir)
+        if url in referenced or path is None:
+            continue
+        try:
+            os.remove(path)
+            run.count("files", 1)
+        except FileNotFoundError:
+            pass
+
+
+def purge(run, older_than_days=PURGE_AFTER_DAYS, upload_dir=UPLOAD_DIR):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    files = set()
+    stamp(run)
+    purge_posts(run, cutoff, files)
+    purge_comments(run, cutoff)
+    purge_messages(run, cutoff, files)
+    if files:
+        remove_files(run, files, upload_dir)
+
+
+# ---------- Storage ----------
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def incremental_vacuum(run, pages=VACUUM_PAGES):
+    with run.bind.connect() as conn:
+        run.report["auto_vacuum"] = {0: "none", 1: "full", 2: "incremental"}.get(_pragma(conn, "auto_vacuum"))
+        free = _pragma(conn, "freelist_count")
+        while run.report["auto_vacuum"] == "incremental" and free and not run.out_of_time():
+            # execute() steps a statement without result columns once, which frees one page;
+            # executescript() steps it to completion
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+            conn.commit()
+            now_free = _pragma(conn, "freelist_count")
+            run.count("vacuumed_pages", free - now_free)
+            free = now_free
+            time.sleep(PAUSE)
+        run.report["free_pages"] = free
+
+
+def enable_incremental_vacuum(bind=None):
+    """Switch the file to auto_vacuum=INCREMENTAL; the VACUUM rewrites the whole file under an exclusive lock"""
+    bind = bind or default_engine
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        return _pragma(conn, "auto_vacuum")
+
+
+def analyze(run, limit=ANALYSIS_LIMIT):
+    with run.bind.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA analysis_limit={limit}")
+        for table in Base.metadata.sorted_tables:
+            if run.out_of_time():
+                break
+            conn.exec_driver_sql(f'ANALYZE "{table.name}"')
+            conn.commit()
+            run.count("analyzed", 1)
+
+
+# ---------- Runs ----------
+
+def run(bind=None, budget=BUDGET_SECONDS, purge_after_days=PURGE_AFTER_DAYS, upload_dir=UPLOAD_DIR):
+    """Every step in order within the time budget; returns the report"""
+    job = _Run(bind or default_engine, budget)
+    t0 = time.perf_counter()
+    purge(job, purge_after_days, upload_dir)
+    if not job.out_of_time():
+        job.report["archived"] = archive.archive(job.bind, deadline=job.deadline)
+    if job.bind.dialect.name == "sqlite":
+        if not job.out_of_time():
+            incremental_vacuum(job)
+        analyze(job)
+    job.report["seconds"] = round(time.perf_counter() - t0, 2)
+    job.report["finished"] = not job.out_of_time()
+    return job.report
+
+
+def _acquire(bind, due_before=None):
+    """Take the run lease; with due_before, only if the last run finished before it"""
+    now = datetime.datetime.utcnow()
+    criteria = [MaintenanceState.id == 1,
+                or_(MaintenanceState.lease_until.is_(None), MaintenanceState.lease_until < now)]
+    if due_before is not None:
+        criteria.append(or_(MaintenanceState.finished_at.is_(None), MaintenanceState.finished_at < due_before))
+    with bind.begin() as conn:
+        return conn.execute(update(MaintenanceState).where(and_(*criteria)).values(
+            lease_until=now + datetime.timedelta(seconds=LEASE_SECONDS),
+        )).rowcount == 1
+
+
+def _release(bind, report):
+    values = {"lease_until": None}
+    if report is not None:
+        values.update(finished_at=datetime.datetime.utcnow(), report=json.dumps(report))
+    with bind.begin() as conn:
+        conn.execute(update(MaintenanceState).where(MaintenanceState.id == 1).values(**values))
+
+
+def run_leased(bind=None, due_before=None, **options):
+    """run() under the lease; None if another worker holds it or no run is due"""
+    bind = bind or default_engine
+    if not _acquire(bind, due_before):
+        return None
+    report = None
+    try:
+        report = run(bind, **options)
+    finally:
+        _release(bind, report)
+    return report
+
+
+class Scheduler:
+    def __init__(self, engine=default_engine, interval=INTERVAL, check_interval=CHECK_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.check_interval = check_interval
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.checks = self.runs = self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        if self._thread is not None or not self.enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        # Wait first: a restart storm must not turn into a maintenance storm
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:  # locked or not yet migrated; try again next check
+                self.errors += 1
+                print(f"maintenance run failed: {e}")
+
+    def check(self):
+        self.checks += 1
+        with self.engine.connect() as conn:
+            finished_at = conn.execute(select(MaintenanceState.finished_at).where(MaintenanceState.id == 1)).scalar()
+        due_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.interval)
+        if finished_at is not None and finished_at >= due_before:
+            return
+        report = run_leased(self.engine, due_before)
+        if report is not None:
+            self.runs += 1
+            self.last_report = report
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "interval": self.interval,
+            "checks": self.checks,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_report": self.last_report,
+        }
+
+
+scheduler = Scheduler()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge soft-deleted rows and reclaim database space")
+    parser.add_argument("--purge-after-days", type=int, default=PURGE_AFTER_DAYS)
+    parser.add_argument("--budget", type=float, default=BUDGET_SECONDS, help="seconds before remaining steps stop")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="switch the database to auto_vacuum=INCREMENTAL with one full VACUUM, then exit")
+    args = parser.parse_args()
+    migrate()
+    t0 = time.perf_counter()
+    if args.enable_incremental_vacuum:
+        mode = enable_incremental_vacuum()
+        print(f"auto_vacuum={mode} after VACUUM in {time.perf_counter() - t0:.1f}s")
+    else:
+        report = run_leased(budget=args.budget, purge_after_days=args.purge_after_days)
+        if report is None:
+            print("Another worker holds the maintenance lease; try again later")
+        else:
+            print(json.dumps(report, indent=2))
@@ -0,0 +1,175 @@
+"""
+Byte-range serving for uploaded videos
+
+Video players seek by issuing Range requests, often open-ended ("bytes=N-"),
+and abandon most of them after a few hundred kilobytes. `MediaFiles` is the
+StaticFiles mount for uploads/videos. Its responses honour single and
+multiple byte ranges (multipart/byteranges), If-Range, ETag and Last-Modified
+validators, and stop reading as soon as the client disconnects. The body is
+streamed in CHUNK_SIZE reads, so each connection buffers at most one chunk
+plus the server's transport high-water mark, whatever the file size. When the
+server offers the ASGI `http.response.zerocopysend` extension, ranges are
+handed to it as (file, offset, count) and the kernel copies them with
+sendfile. Otherwise they are read in chunks off the event loop.
+
+Uploads get a fresh UUID name and are never rewritten, so they are cached as
+immutable.
+"""
+
+import os
+import secrets
+from functools import partial
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+
+CHUNK_SIZE = 64 * 1024
+# More ranges than this (after merging overlaps) is treated as abuse and answered with the whole file
+MAX_RANGES = int(os.getenv("GLOBRIDGE_MEDIA_MAX_RANGES", "16"))
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+ZEROCOPY = "http.response.zerocopysend"
+
+
+def parse_range(header, size):
+    """[(start, end inclusive)] for a bytes Range header; [] if unsatisfiable, None if it should be ignored"""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last):
+            return None
+        try:
+            if not first:
+                length = int(last)
+                if length < 0:
+                    return None
+                if length == 0 or size == 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if start < 0 or (last and end < start):
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+    if not ranges:
+        return []
+    ranges.sort()
+    merged = [list(ranges[0])]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if len(merged) > MAX_RANGES:
+        return None
+    return [tuple(r) for r in merged]
+
+
+class MediaResponse(FileResponse):
+    """A FileResponse that answers Range requests; `segments` is [(preamble, offset, count)] plus a trailer"""
+
+    def __init__(self, path, stat_result, request_headers):
+        super().__init__(path, stat_result=stat_result)
+        size = stat_result.st_size
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["cache-control"] = CACHE_CONTROL
+        self.segments = [(b"", 0, size)]
+        self.trailer = b""
+
+        ranges = None
+        if "range" in request_headers and self._if_range_holds(request_headers.get("if-range")):
+            ranges = parse_range(request_headers["range"], size)
+        if ranges is None:
+            return
+        if not ranges:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            self.segments = []
+            return
+
+        self.status_code = 206
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+            self.segments = [(b"", start, end - start + 1)]
+            return
+
+        boundary = secrets.token_hex(12)
+        part_type = self.media_type or "application/octet-stream"
+        self.segments = []
+        for i, (start, end) in enumerate(ranges):
+            preamble = (("\r\n" if i else "") + f"--{boundary}\r\nContent-Type: {part_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n")
+            self.segments.append((preamble.encode("latin-1"), start, end - start + 1))
+        self.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(sum(len(p) + n for p, _, n in self.segments) + len(self.trailer))
+
+    def _if_range_holds(self, if_range):
+        # A stale If-Range validator means the client's partial copy is outdated, so send the whole file
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            return if_range == self.headers.get("etag")  # weak validators never match
+        return if_range == self.headers.get("last-modified")
+
+    async def __call__(self, scope, receive, send):
+        async with anyio.create_task_group() as task_group:
+            async def run_then_cancel(fn):
+                await fn()
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(run_then_cancel, partial(self._send_body, scope, send))
+            await run_then_cancel(partial(self._wait_for_disconnect, receive))
+
+    async def _wait_for_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _send_body(self, scope, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or not self.segments:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        zerocopy = ZEROCOPY in scope.get("extensions", {})
+        async with await anyio.open_file(self.path, "rb") as f:
+            for preamble, offset, count in self.segments:
+                if preamble:
+                    await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                if zerocopy:
+                    await send({"type": ZEROCOPY, "file": f.wrapped, "offset": offset, "count": count,
+                                "more_body": True})
+                    continue
+                await f.seek(offset)
+                while count > 0:
+                    chunk = await f.read(min(CHUNK_SIZE, count))
+                    if not chunk:
+                        break
+                    count -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+
+
+class MediaFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        response = MediaResponse(full_path, stat_result, request_headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
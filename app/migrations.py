@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations
+The applied version is tracked in SQLite's `PRAGMA user_version`, so checking
+an up-to-date database costs a single pragma read instead of reflecting every
+table the way `Base.metadata.create_all` does. Pending steps and the version
+bump run in one `BEGIN IMMEDIATE` transaction: a failed step leaves nothing
+behind, and concurrent callers (one per worker) apply each step once.
+
+Usage:
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations --status   # print current / latest version
+"""
+
+import argparse
+
+from sqlalchemy import select, update, bindparam
+
+from app.db import engine
+from app import models
+
+
+def _create_tables(conn, *tables):
+    for table in tables:
+        table.create(conn, checkfirst=True)
+
+
+def _create_indexes(conn, *names):
+    # By name: a step must keep creating only the indexes it shipped with, not every index its
+    # tables declare today (later ones may cover columns that a later step adds)
+    indexes = {index.name: index for table in models.Base.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _0001_baseline(conn):
+    # Databases created by the old import-time create_all already have these tables
+    _create_tables(
+        conn,
+        models.User.__table__, models.SessionToken.__table__, models.Business.__table__,
+        models.Requirement.__table__, models.Message.__table__, models.Post.__table__,
+        models.PostReaction.__table__, models.PostComment.__table__, models.Connection.__table__,
+    )
+
+
+def _0002_timelines(conn):
+    _create_tables(conn, models.TimelineEntry.__table__, models.TimelinePullAuthor.__table__)
+    _create_indexes(conn, "ix_posts_user_id_id", "ix_connections_requester_status", "ix_connections_receiver_status")
+
+
+def _0003_feed_counter_indexes(conn):
+    # The non-unique index this step shipped with; 0012 replaces it once duplicates are gone
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_post_reactions_post_user ON post_reactions (post_id, user_id)")
+    _create_indexes(conn, "ix_post_comments_post_id")
+
+
+def _0004_probe_indexes(conn):
+    _create_indexes(conn, "ix_posts_is_deleted_id", "ix_messages_receiver_deleted_id")
+
+
+def _0005_badge_counters(conn):
+    _create_tables(conn, models.UserBadgeCounter.__table__)
+
+
+def _0006_connection_pairs(conn):
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(connections)")}
+    for name in ("user_low_id", "user_high_id"):
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE connections ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0")
+    conn.exec_driver_sql(
+        "UPDATE connections SET user_low_id = min(requester_id, receiver_id), "
+        "user_high_id = max(requester_id, receiver_id)"
+    )
+    # Keep one edge per pair before the unique index goes on: accepted beats pending beats the rest,
+    # then the oldest row wins
+    removed = conn.exec_driver_sql("""
+        DELETE FROM connections WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_low_id, user_high_id
+                    ORDER BY CASE status WHEN 'accepted' THEN 0 WHEN 'pending' THEN 1 ELSE 2 END, id
+                ) AS rank FROM connections
+            ) WHERE rank = 1
+        )
+    """).rowcount
+    if removed:
+        # Pending-request badges are recounted from the source tables on next read
+        conn.exec_driver_sql("DELETE FROM user_badge_counters")
+    _create_indexes(conn, "ux_connections_pair", "ix_connections_pair_reverse")
+
+
+def _0007_suggestions(conn):
+    _create_tables(conn, models.UserSuggestion.__table__, models.SuggestionRefresh.__table__)
+
+
+def _0008_trending(conn):
+    _create_tables(conn, models.PostTrendingScore.__table__, models.TrendingState.__table__)
+    for index in models.PostTrendingScore.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _0009_rollups(conn):
+    from app.rollups import rebuild
+    _create_tables(conn, models.RollupTotal.__table__, models.RollupDaily.__table__)
+    rebuild(conn)
+
+
+def _0010_facet_keys(conn):
+    for table in (models.Business.__table__, models.Requirement.__table__):
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        for name in ("sector_key", "country_key"):
+            if name not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {name} VARCHAR(100)")
+        rows = conn.execute(select(table.c.id, table.c.sector, table.c.country)).all()
+        if rows:
+            conn.execute(
+                update(table).where(table.c.id == bindparam("row_id"))
+                .values(sector_key=bindparam("sk"), country_key=bindparam("ck")),
+                [{"row_id": r.id, "sk": models.normalize_key(r.sector), "ck": models.normalize_key(r.country)}
+                 for r in rows],
+            )
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _0011_amount_ranges(conn):
+    from app.ranges import create
+    create(conn)
+
+
+def _0012_reaction_uniqueness(conn):
+    # Keep each user's latest reaction per post; decayed trending scores absorb the difference on their own
+    removed = conn.exec_driver_sql("""
+        DELETE FROM post_reactions WHERE id NOT IN (
+            SELECT max(id) FROM post_reactions GROUP BY post_id, user_id
+        )
+    """).rowcount
+    if removed:
+        from app.rollups import rebuild
+        rebuild(conn)
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_post_reactions_post_user")
+    _create_indexes(conn, "ux_post_reactions_post_user")
+
+
+def _0013_cache_events(conn):
+    _create_tables(conn, models.CacheEvent.__table__)
+
+
+def _0014_message_archive(conn):
+    _create_tables(conn, models.ArchivedMessage.__table__)
+    for index in models.ArchivedMessage.__table__.indexes | models.Message.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _0015_purge_clock(conn):
+    for table in ("posts", "post_comments", "messages"):
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if "deleted_at" not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN deleted_at DATETIME")
+        # Partial: only flagged rows, so the purge job's lookups stay tiny. Not declared on the models,
+        # because earlier steps create every declared index before this column exists.
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_deleted_at ON {table} (deleted_at) WHERE is_deleted = 1"
+        )
+    _create_tables(conn, models.MaintenanceState.__table__)
+    conn.exec_driver_sql("INSERT OR IGNORE INTO maintenance_state (id) VALUES (1)")
+
+
+# Append new steps here; never edit or reorder a step that has shipped.
+MIGRATIONS = [
+    _0001_baseline,
+    _0002_timelines,
+    _0003_feed_counter_indexes,
+    _0004_probe_indexes,
+    _0005_badge_counters,
+    _0006_connection_pairs,
+    _0007_suggestions,
+    _0008_trending,
+    _0009_rollups,
+    _0010_facet_keys,
+    _0011_amount_ranges,
+    _0012_reaction_uniqueness,
+    _0013_cache_events,
+    _0014_message_archive,
+    _0015_purge_clock,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+LOCK_TIMEOUT_MS = 600_000  # how long a worker waits for another one's migration to finish
+
+
+def current_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+
+def migrate(bind=None):
+    """Apply pending migrations in order, all in one transaction that holds the write lock"""
+    bind = bind or engine
+    applied = []
+    with bind.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # pysqlite sends no BEGIN before DDL, so without this each statement commits on its own.
+            # IMMEDIATE also takes the write lock before the version is read: every worker migrates at
+            # startup, and the others wait here, then find nothing left to apply
+            timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {LOCK_TIMEOUT_MS}")
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            finally:
+                conn.exec_driver_sql(f"PRAGMA busy_timeout = {timeout}")
+        version = current_version(conn)
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+            applied.append(number)
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply Globridge schema migrations")
+    parser.add_argument("--status", action="store_true", help="show versions without migrating")
+    args = parser.parse_args()
+    if args.status:
+        with engine.connect() as conn:
+            print(f"Schema version {current_version(conn)} (latest {LATEST_VERSION})")
+    else:
+        applied = migrate()
+        print(f"Applied migrations: {applied}" if applied else f"Schema is up to date (version {LATEST_VERSION})")
@@ -0,0 +1,289 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, Index
+from sqlalchemy.orm import relationship
+import datetime
+
+from app.db import Base
+
+def normalize_key(value):
+    """Facet key for free-text sector/country values: trimmed, whitespace-collapsed, casefolded"""
+    if value is None:
+        return None
+    return " ".join(value.split()).casefold() or None
+
+
+def _key_default(column):
+    def default(context):
+        return normalize_key(context.get_current_parameters().get(column))
+    return default
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(120), nullable=False)
+    email = Column(String(255), unique=True, nullable=False)
+    password_hash = Column(String(255), nullable=False)
+    role = Column(String(20), nullable=False)  # 'business' or 'investor'
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    business = relationship("Business", back_populates="owner", uselist=False)
+
+class SessionToken(Base):
+    __tablename__ = "sessions"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    token = Column(String(255), unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+class Business(Base):
+    __tablename__ = "businesses"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(200), nullable=False)
+    sector = Column(String(100), nullable=True)
+    brand_story = Column(Text, nullable=True)
+    investment_needs_min = Column(Float, nullable=True)
+    investment_needs_max = Column(Float, nullable=True)
+    expansion_potential = Column(Text, nullable=True)
+    country = Column(String(100), nullable=True)
+    city = Column(String(100), nullable=True)
+    # Normalized facet keys, filled on insert; updates must set them alongside sector/country
+    sector_key = Column(String(100), nullable=True, default=_key_default("sector"))
+    country_key = Column(String(100), nullable=True, default=_key_default("country"))
+
+    owner = relationship("User", back_populates="business")
+
+class Requirement(Base):
+    __tablename__ = "requirements"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String(200), nullable=False)
+    sector = Column(String(100), nullable=True)
+    main_brand = Column(String(200), nullable=True)
+    sub_brand = Column(String(200), nullable=True)
+    description = Column(Text, nullable=True)
+    country = Column(String(100), nullable=True)
+    city = Column(String(100), nullable=True)
+    partnership_type = Column(String(50), nullable=True)  # seek_local_partner | seek_investor | offer_franchise
+    budget_min = Column(Float, nullable=True)
+    budget_max = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sector_key = Column(String(100), nullable=True, default=_key_default("sector"))
+    country_key = Column(String(100), nullable=True, default=_key_default("country"))
+
+    owner = relationship("User")
+
+class Message(Base):
+    __tablename__ = "messages"
+    id = Column(Integer, primary_key=True)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    body = Column(Text, nullable=False)
+    message_type = Column(String, default="text")  # text, image, file, system
+    attachment_url = Column(String, nullable=True)
+    attachment_name = Column(String, nullable=True)
+    attachment_size = Column(Integer, nullable=True)
+    is_read = Column(Integer, default=0)  # 0 = unread, 1 = read
+    read_at = Column(DateTime, nullable=True)
+    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
+    deleted_at = Column(DateTime, nullable=True)  # starts the purge retention clock; see app/maintenance.py
+    reply_to_id = Column(Integer, ForeignKey("messages.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Post(Base):
+    __tablename__ = "posts"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    post_type = Column(String, default="text")  # text, image, video, article
+    media_url = Column(String, nullable=True)
+    media_thumbnail = Column(String, nullable=True)
+    article_title = Column(String, nullable=True)
+    article_summary = Column(Text, nullable=True)
+    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
+    deleted_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class PostReaction(Base):
+    __tablename__ = "post_reactions"
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    reaction_type = Column(String, default="like")  # like, love, celebrate, support, funny, insightful
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class PostComment(Base):
+    __tablename__ = "post_comments"
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    parent_comment_id = Column(Integer, ForeignKey("post_comments.id"), nullable=True)
+    is_deleted = Column(Integer, default=0)  # 0 = active, 1 = deleted
+    deleted_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+def _pair_low(context):
+    params = context.get_current_parameters()
+    return min(params["requester_id"], params["receiver_id"])
+
+
+def _pair_high(context):
+    params = context.get_current_parameters()
+    return max(params["requester_id"], params["receiver_id"])
+
+
+class Connection(Base):
+    __tablename__ = "connections"
+    id = Column(Integer, primary_key=True)
+    requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Canonical (min, max) endpoints, filled in on insert: one edge per pair of users
+    user_low_id = Column(Integer, nullable=False, default=_pair_low)
+    user_high_id = Column(Integer, nullable=False, default=_pair_high)
+    status = Column(String, default="pending")  # pending, accepted, declined, blocked
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class TimelineEntry(Base):
+    """One row per (viewer, post) in a viewer's network feed, written when the post is created"""
+    __tablename__ = "timeline_entries"
+    # Clustered on (user_id, post_id): a feed page is a single range scan of the primary key
+    __table_args__ = {"sqlite_with_rowid": False}
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)  # viewer
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+class TimelinePullAuthor(Base):
+    """Authors with too many connections to fan out; their posts are merged in at read time"""
+    __tablename__ = "timeline_pull_authors"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    degree = Column(Integer, nullable=False, default=0)
+    marked_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Read-time merge of pull authors scans each author's posts newest first
+Index("ix_posts_user_id_id", Post.user_id, Post.id)
+# Accepted-connection lookups from either side
+Index("ix_connections_requester_status", Connection.requester_id, Connection.status)
+Index("ix_connections_receiver_status", Connection.receiver_id, Connection.status)
+# One edge per unordered pair; the reverse index serves batched status lookups from the high side
+Index("ux_connections_pair", Connection.user_low_id, Connection.user_high_id, unique=True)
+Index("ix_connections_pair_reverse", Connection.user_high_id, Connection.user_low_id)
+# One reaction per user per post (the upsert's conflict target); also serves per-post counters and the
+# per-viewer user_reaction overlay on feed pages
+Index("ux_post_reactions_post_user", PostReaction.post_id, PostReaction.user_id, unique=True)
+Index("ix_post_comments_post_id", PostComment.post_id)
+# Cursor probes: newest live posts and a user's incoming live messages, both index-only
+Index("ix_posts_is_deleted_id", Post.is_deleted, Post.id)
+Index("ix_messages_receiver_deleted_id", Message.receiver_id, Message.is_deleted, Message.id)
+# Conversation pages: one range per direction, newest first
+Index("ix_messages_sender_receiver_id", Message.sender_id, Message.receiver_id, Message.id)
+# Facet filters are equality lookups on the normalized keys
+Index("ix_businesses_sector_key", Business.sector_key)
+Index("ix_businesses_country_key", Business.country_key)
+Index("ix_requirements_sector_key", Requirement.sector_key)
+Index("ix_requirements_country_key", Requirement.country_key)
+Index("ix_requirements_partnership_type", Requirement.partnership_type)
+
+class UserBadgeCounter(Base):
+    """Per-user badge counters, adjusted in the same transaction as the writes that change them"""
+    __tablename__ = "user_badge_counters"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_messages = Column(Integer, nullable=False, default=0)
+    pending_requests = Column(Integer, nullable=False, default=0)
+    feed_seen_post_id = Column(Integer, nullable=False, default=0)  # newest post shown on the feed's first page
+
+class UserSuggestion(Base):
+    """Precomputed "people you may know" rows, top-k per user, written by app/suggestions.py"""
+    __tablename__ = "user_suggestions"
+    __table_args__ = {"sqlite_with_rowid": False}
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    suggested_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+    mutual_count = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SuggestionRefresh(Base):
+    """Users whose accepted connections changed since their suggestions were computed"""
+    __tablename__ = "suggestion_refresh_queue"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    queued_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+class PostTrendingScore(Base):
+    """Forward-decayed engagement score per post; see app/trending.py"""
+    __tablename__ = "post_trending_scores"
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+
+class TrendingState(Base):
+    """Single row holding the time origin that trending scores are scaled against"""
+    __tablename__ = "trending_state"
+    id = Column(Integer, primary_key=True)
+    epoch = Column(Float, nullable=False)  # unix seconds
+
+# Top-N trending posts is a backwards walk of this index
+Index("ix_post_trending_scores_score", PostTrendingScore.score)
+
+class RollupTotal(Base):
+    """Running row count per (metric, role); see app/rollups.py"""
+    __tablename__ = "rollup_totals"
+    metric = Column(String(32), primary_key=True)
+    role = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class RollupDaily(Base):
+    """Rows created per (day, metric, role), keyed by day so a trend window is one range scan"""
+    __tablename__ = "rollup_daily"
+    __table_args__ = {"sqlite_with_rowid": False}
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD, UTC
+    metric = Column(String(32), primary_key=True)
+    role = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class CacheEvent(Base):
+    """Cache invalidations for other workers to replay; see app/cache_bus.py"""
+    __tablename__ = "cache_events"
+    __table_args__ = {"sqlite_autoincrement": True}  # ids are never reused after pruning
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(32), nullable=False)
+    key = Column(String(64), nullable=False)
+    origin = Column(String(32), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+class ArchivedMessage(Base):
+    """Read, live messages moved out of `messages` once old enough; see app/archive.py"""
+    __tablename__ = "messages_archive"
+    id = Column(Integer, primary_key=True)  # the id it had in messages
+    user_low_id = Column(Integer, nullable=False)
+    user_high_id = Column(Integer, nullable=False)
+    sender_id = Column(Integer, nullable=False)
+    body = Column(Text, nullable=False)
+    message_type = Column(String, default="text")
+    attachment_url = Column(String, nullable=True)
+    attachment_name = Column(String, nullable=True)
+    attachment_size = Column(Integer, nullable=True)
+    read_at = Column(DateTime, nullable=True)
+    reply_to_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+    # Only read, live messages are archived, so these read like a Message's
+    is_read = 1
+    is_deleted = 0
+
+    @property
+    def receiver_id(self):
+        return self.user_high_id if self.sender_id == self.user_low_id else self.user_low_id
+
+# Conversation pages from the low side's pair prefix; the reverse index finds a user's conversations from the high side
+Index("ix_messages_archive_pair_id", ArchivedMessage.user_low_id, ArchivedMessage.user_high_id, ArchivedMessage.id)
+Index("ix_messages_archive_pair_reverse", ArchivedMessage.user_high_id, ArchivedMessage.user_low_id, ArchivedMessage.id)
+
+class MaintenanceState(Base):
+    """Single row: the maintenance run lease and the last run's report; see app/maintenance.py"""
+    __tablename__ = "maintenance_state"
+    id = Column(Integer, primary_key=True)
+    lease_until = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    report = Column(Text, nullable=True)  # JSON
@@ -0,0 +1,81 @@
+"""
+"Anything new since my cursor?" probe for polling clients
+
+Answers from index-only lookups and an in-process high-water mark for the
+newest post id, so a poll that finds nothing new never reads post bodies.
+"""
+
+import threading
+import time
+
+from sqlalchemy import select, func
+
+from app.models import Post, Message, Connection
+
+PROBE_ID_LIMIT = 50  # new ids returned per category; counts are capped at this too
+HWM_TTL = 2.0  # seconds before the post high-water mark is re-read (other workers may have posted)
+
+
+class PostHighWaterMark:
+    """Newest post id, advanced in-process by create_post and re-read from the PK index on expiry"""
+
+    def __init__(self, ttl=HWM_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = 0.0
+
+    def advance(self, post_id):
+        with self._lock:
+            if self._value is None or post_id > self._value:
+                self._value = post_id
+
+    def get(self, db):
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now - self._checked_at < self.ttl:
+                return self._value
+        latest = db.execute(select(func.max(Post.id))).scalar() or 0
+        with self._lock:
+            self._value = max(latest, self._value or 0)
+            self._checked_at = now
+            return self._value
+
+
+post_hwm = PostHighWaterMark()
+
+
+def _newer(db, id_column, since, *criteria):
+    ids = db.execute(
+        select(id_column).where(id_column > since, *criteria)
+        .order_by(id_column.desc()).limit(PROBE_ID_LIMIT)
+    ).scalars().all()
+    return ids
+
+
+def probe(db, user_id, since_post_id=None, since_message_id=None, since_connection_id=None):
+    """Counts and ids newer than each cursor; a missing cursor just reports the current watermark"""
+    latest_post = post_hwm.get(db)
+    posts = {"latest_id": latest_post, "new_count": 0, "new_ids": []}
+    if since_post_id is not None and since_post_id < latest_post:
+        # Covered by ix_posts_is_deleted_id: no table rows are read
+        ids = _newer(db, Post.id, since_post_id, Post.is_deleted == 0)
+        posts.update(new_count=len(ids), new_ids=ids)
+
+    incoming = (Message.receiver_id == user_id, Message.is_deleted == 0)
+    if since_message_id is None:
+        latest_message = db.execute(select(func.max(Message.id)).where(*incoming)).scalar() or 0
+        messages = {"latest_id": latest_message, "new_count": 0, "new_ids": []}
+    else:
+        ids = _newer(db, Message.id, since_message_id, *incoming)
+        messages = {"latest_id": ids[0] if ids else since_message_id, "new_count": len(ids), "new_ids": ids}
+
+    pending = (Connection.receiver_id == user_id, Connection.status == "pending")
+    if since_connection_id is None:
+        latest_request = db.execute(select(func.max(Connection.id)).where(*pending)).scalar() or 0
+        requests = {"latest_id": latest_request, "new_count": 0, "new_ids": []}
+    else:
+        ids = _newer(db, Connection.id, since_connection_id, *pending)
+        requests = {"latest_id": ids[0] if ids else since_connection_id, "new_count": len(ids), "new_ids": ids}
+
+    return {"posts": posts, "messages": messages, "connection_requests": requests}
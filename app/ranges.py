@@ -0,0 +1,119 @@
+"""
+Range-overlap filters for investment needs and budgets
+
+Each business's investment_needs_min/max and each requirement's
+budget_min/max is mirrored into a one-dimensional SQLite R*Tree. Triggers on
+the base tables keep the mirror in sync, so ORM writes, Core bulk inserts and
+deletes all maintain it. An "overlaps [lo, hi]" filter is answered by an
+R*Tree search, which descends only into nodes whose bounding intervals
+intersect the query instead of scanning every row.
+
+The R*Tree stores 32-bit floats rounded outward, so its hits are candidates
+and the exact predicate is re-checked against the base row. A missing bound
+is open-ended. A row with neither bound has no range and never matches. If
+SQLite was built without the R*Tree module, the exact predicate runs alone as
+a scan.
+"""
+
+import sqlite3
+
+from sqlalchemy import select, table, column, func, and_, or_
+
+from app.models import Business, Requirement
+
+OPEN_LOW = -1e38
+OPEN_HIGH = 1e38
+
+
+def _rtree_compiled():
+    conn = sqlite3.connect(":memory:")
+    try:
+        return any(row[0] == "ENABLE_RTREE" for row in conn.execute("PRAGMA compile_options"))
+    finally:
+        conn.close()
+
+
+RTREE = _rtree_compiled()
+
+# kind -> (model, low column, high column, R*Tree name)
+RANGES = {
+    "businesses": (Business, Business.investment_needs_min, Business.investment_needs_max,
+                   "business_investment_rtree"),
+    "requirements": (Requirement, Requirement.budget_min, Requirement.budget_max,
+                     "requirement_budget_rtree"),
+}
+
+
+def _bounds(lo, hi, row="NEW"):
+    # Missing bounds are open-ended, and swapped bounds are reordered because an R*Tree rejects lo > hi
+    lo = f"coalesce({row}.{lo}, {OPEN_LOW})"
+    hi = f"coalesce({row}.{hi}, {OPEN_HIGH})"
+    return f"min({lo}, {hi}), max({lo}, {hi})"
+
+
+def create(conn):
+    """Create the R*Trees and their sync triggers and load existing rows (migration 0011)"""
+    if not RTREE:
+        return
+    for model, lo, hi, name in RANGES.values():
+        base = model.__tablename__
+        has_range = f"NEW.{lo.name} IS NOT NULL OR NEW.{hi.name} IS NOT NULL"
+        conn.exec_driver_sql(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING rtree(id, lo, hi)")
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {base}
+            WHEN {has_range}
+            BEGIN
+                INSERT INTO {name} VALUES (NEW.id, {_bounds(lo.name, hi.name)});
+            END
+        """)
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {lo.name}, {hi.name} ON {base}
+            BEGIN
+                DELETE FROM {name} WHERE id = OLD.id;
+                INSERT INTO {name} SELECT NEW.id, {_bounds(lo.name, hi.name)} WHERE {has_range};
+            END
+        """)
+        conn.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {base}
+            BEGIN
+                DELETE FROM {name} WHERE id = OLD.id;
+            END
+        """)
+        conn.exec_driver_sql(f"DELETE FROM {name}")
+        conn.exec_driver_sql(f"""
+            INSERT INTO {name}
+            SELECT id, {_bounds(lo.name, hi.name, base)} FROM {base}
+            WHERE {base}.{lo.name} IS NOT NULL OR {base}.{hi.name} IS NOT NULL
+        """)
+
+
+def overlaps(kind, lo=None, hi=None):
+    """WHERE clause for rows of `kind` whose range intersects [lo, hi]; either bound may be None"""
+    model, low, high, name = RANGES[kind]
+    lo = OPEN_LOW if lo is None else lo
+    hi = OPEN_HIGH if hi is None else hi
+    row_lo = func.coalesce(low, OPEN_LOW)
+    row_hi = func.coalesce(high, OPEN_HIGH)
+    exact = and_(
+        or_(low.isnot(None), high.isnot(None)),
+        func.min(row_lo, row_hi) <= hi,
+        func.max(row_lo, row_hi) >= lo,
+    )
+    if not RTREE:
+        return exact
+    rtree = table(name, column("id"), column("lo"), column("hi"))
+    candidates = select(rtree.c.id).where(rtree.c.lo <= hi, rtree.c.hi >= lo)
+    return and_(model.id.in_(candidates), exact)
+
+
+def overlap_fraction(row_lo, row_hi, lo=None, hi=None):
+    """Share of the row's range that falls inside [lo, hi], in 0..1 (1 for a point range inside it)"""
+    if row_lo is None and row_hi is None:
+        return 0.0
+    a, b = sorted((OPEN_LOW if row_lo is None else row_lo, OPEN_HIGH if row_hi is None else row_hi))
+    lo = OPEN_LOW if lo is None else lo
+    hi = OPEN_HIGH if hi is None else hi
+    inside = min(b, hi) - max(a, lo)
+    if inside < 0:
+        return 0.0
+    return 1.0 if b == a else inside / (b - a)
@@ -0,0 +1,78 @@
+"""
+Reaction writes
+
+A reaction change is at most two statements, and neither reads first.
+Clicking the reaction you already have deletes it (DELETE ... RETURNING).
+Anything else is a single INSERT ... ON CONFLICT (post_id, user_id) DO UPDATE
+against the unique index. Both statements are conditioned on the post being
+live, so there is no separate existence query and no read-then-write window
+for a concurrent double click to slip through. SQLite serializes the two
+clicks, and the second sees the first's row and toggles it off.
+
+The upsert returns the row's created_at. It equals the timestamp we passed
+only when a row was inserted, which tells new reactions (counted in trending
+and rollups) from type changes (not counted).
+"""
+
+import datetime
+
+from sqlalchemy import select, delete, exists, literal, and_, DateTime
+from sqlalchemy.dialects.sqlite import insert
+
+from app import trending, rollups
+from app.models import Post, PostReaction
+
+MAX_BATCH = 100
+
+
+def _live(post_id):
+    return exists().where(Post.id == post_id, Post.is_deleted == 0)
+
+
+def _delete(*criteria):
+    # No ORM objects to keep in step, and session sync would rewrite the RETURNING clause
+    return (
+        delete(PostReaction).where(*criteria).returning(PostReaction.created_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _counted(db, post_id, role, delta, at):
+    trending.record(db, post_id, delta * trending.REACTION_WEIGHT, at)
+    rollups.record(db, "reactions", role, delta, at)
+
+
+def apply(db, post_id, user, reaction_type):
+    """Set, switch or toggle off `user`'s reaction (caller commits).
+
+    An empty reaction_type removes the reaction. Returns (post found, resulting reaction type or None).
+    """
+    mine = and_(PostReaction.post_id == post_id, PostReaction.user_id == user.id, _live(post_id))
+    if not reaction_type:
+        removed = db.execute(_delete(mine)).first()
+        if removed is None:
+            return db.execute(select(_live(post_id))).scalar(), None
+        _counted(db, post_id, user.role, -1, removed.created_at)
+        return True, None
+
+    removed = db.execute(_delete(mine, PostReaction.reaction_type == reaction_type)).first()
+    if removed is not None:
+        _counted(db, post_id, user.role, -1, removed.created_at)
+        return True, None
+
+    now = datetime.datetime.utcnow()
+    stmt = insert(PostReaction).from_select(
+        ["post_id", "user_id", "reaction_type", "created_at"],
+        select(literal(post_id), literal(user.id), literal(reaction_type), literal(now, DateTime))
+        .where(_live(post_id)),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PostReaction.post_id, PostReaction.user_id],
+        set_={"reaction_type": stmt.excluded.reaction_type},
+    ).returning(PostReaction.created_at)
+    row = db.execute(stmt).first()
+    if row is None:
+        return False, None
+    if row.created_at == now:
+        _counted(db, post_id, user.role, 1, now)
+    return True, reaction_type
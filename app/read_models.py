@@ -0,0 +1,138 @@
+"""
+Lean read models for list endpoints
+
+List endpoints only copy a few columns into JSON, so they select exactly those
+columns through Core, with the owner joined in, into namedtuple records.
+Nothing enters the session's identity map, no per-row `owner` lazy loads are
+issued, and each record is a plain tuple instead of an ORM instance with
+attribute instrumentation and load state.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import select, func, or_
+
+from app.models import User, Business, Requirement, Post, PostReaction, PostComment, Connection, normalize_key
+from app.ranges import overlaps
+
+BusinessRow = namedtuple("BusinessRow", [
+    "id", "name", "sector", "country", "city", "investment_needs_min", "investment_needs_max",
+    "expansion_potential", "owner_id", "owner_name", "owner_email",
+])
+RequirementRow = namedtuple("RequirementRow", [
+    "id", "title", "sector", "main_brand", "sub_brand", "country", "city", "budget_min", "budget_max",
+    "partnership_type", "owner_id", "owner_name",
+])
+InvestorRow = namedtuple("InvestorRow", ["id", "name", "email"])
+PostSummaryRow = namedtuple("PostSummaryRow", ["id", "content", "post_type", "media_url", "created_at"])
+
+
+def _fetch(db, record, query):
+    return [record._make(row) for row in db.execute(query)]
+
+
+# ---------- Businesses ----------
+
+def business_filters(sector=None, country=None, q=None, amount_min=None, amount_max=None):
+    """{facet dimension: WHERE clause}; sector and country match the normalized keys exactly,
+    and amount_min/amount_max keep businesses whose investment needs overlap that range"""
+    criteria = {}
+    if sector: criteria["sector"] = Business.sector_key == normalize_key(sector)
+    if country: criteria["country"] = Business.country_key == normalize_key(country)
+    if q:
+        like = f"%{q}%"
+        criteria["q"] = or_(Business.name.ilike(like), Business.brand_story.ilike(like),
+                            Business.expansion_potential.ilike(like))
+    if amount_min is not None or amount_max is not None:
+        criteria["amount"] = overlaps("businesses", amount_min, amount_max)
+    return criteria
+
+
+def business_rows(db, sector=None, country=None, q=None, amount_min=None, amount_max=None):
+    query = (
+        select(
+            Business.id, Business.name, Business.sector, Business.country, Business.city,
+            Business.investment_needs_min, Business.investment_needs_max, Business.expansion_potential,
+            User.id, User.name, User.email,
+        )
+        .join(User, Business.owner_id == User.id)
+        .where(*business_filters(sector, country, q, amount_min, amount_max).values())
+    )
+    return _fetch(db, BusinessRow, query.order_by(Business.id.desc()))
+
+
+# ---------- Requirements ----------
+
+def requirement_filters(sector=None, country=None, q=None, partnership_type=None, amount_min=None, amount_max=None):
+    criteria = {}
+    if sector: criteria["sector"] = Requirement.sector_key == normalize_key(sector)
+    if country: criteria["country"] = Requirement.country_key == normalize_key(country)
+    if partnership_type: criteria["partnership_type"] = Requirement.partnership_type == partnership_type
+    if q:
+        like = f"%{q}%"
+        criteria["q"] = or_(Requirement.title.ilike(like), Requirement.description.ilike(like),
+                            Requirement.main_brand.ilike(like), Requirement.sub_brand.ilike(like))
+    if amount_min is not None or amount_max is not None:
+        criteria["amount"] = overlaps("requirements", amount_min, amount_max)
+    return criteria
+
+
+def requirement_rows(db, sector=None, country=None, q=None, partnership_type=None,
+                     amount_min=None, amount_max=None):
+    query = (
+        select(
+            Requirement.id, Requirement.title, Requirement.sector, Requirement.main_brand,
+            Requirement.sub_brand, Requirement.country, Requirement.city, Requirement.budget_min,
+            Requirement.budget_max, Requirement.partnership_type, User.id, User.name,
+        )
+        .join(User, Requirement.owner_id == User.id)
+        .where(*requirement_filters(sector, country, q, partnership_type, amount_min, amount_max).values())
+    )
+    return _fetch(db, RequirementRow, query.order_by(Requirement.id.desc()))
+
+
+# ---------- Matches ----------
+
+def investor_rows(db):
+    return _fetch(db, InvestorRow, select(User.id, User.name, User.email).where(User.role == "investor"))
+
+
+def owns_business(db, user_id):
+    return db.execute(select(Business.id).where(Business.owner_id == user_id).limit(1)).first() is not None
+
+
+# ---------- Dashboard ----------
+
+def dashboard_counts(db, user_id):
+    """Post, follower, following, reaction and comment totals for one user in a single round trip"""
+    own_posts = select(Post.id).where(Post.user_id == user_id, Post.is_deleted == 0)
+    accepted = Connection.status == "accepted"
+    row = db.execute(select(
+        select(func.count()).select_from(own_posts.subquery()).scalar_subquery(),
+        select(func.count()).select_from(Connection).where(Connection.receiver_id == user_id, accepted)
+        .scalar_subquery(),
+        select(func.count()).select_from(Connection).where(Connection.requester_id == user_id, accepted)
+        .scalar_subquery(),
+        select(func.count()).select_from(PostReaction).where(PostReaction.post_id.in_(own_posts))
+        .scalar_subquery(),
+        select(func.count()).select_from(PostComment).where(PostComment.post_id.in_(own_posts))
+        .scalar_subquery(),
+    )).one()
+    return dict(zip(("posts_count", "followers_count", "following_count", "total_likes", "total_comments"), row))
+
+
+def recent_post_rows(db, user_id, limit=5):
+    """The user's newest live posts with per-post like and comment counts"""
+    posts = _fetch(db, PostSummaryRow, (
+        select(Post.id, Post.content, Post.post_type, Post.media_url, Post.created_at)
+        .where(Post.user_id == user_id, Post.is_deleted == 0)
+        .order_by(Post.id.desc()).limit(limit)
+    ))
+    ids = [p.id for p in posts]
+    likes = dict(db.execute(
+        select(PostReaction.post_id, func.count()).where(PostReaction.post_id.in_(ids)).group_by(PostReaction.post_id)
+    ).all()) if ids else {}
+    comments = dict(db.execute(
+        select(PostComment.post_id, func.count()).where(PostComment.post_id.in_(ids)).group_by(PostComment.post_id)
+    ).all()) if ids else {}
+    return [(p, likes.get(p.id, 0), comments.get(p.id, 0)) for p in posts]
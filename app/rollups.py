@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Admin analytics rollups
+
+Running totals and per-day buckets for signups, posts, messages, reactions,
+connections, requirements and businesses, split by the acting user's role.
+Endpoints that create or delete those rows call `record()` before
+committing, so the rollups change in the same transaction as the rows they
+count. The purge job (app/maintenance.py) subtracts hard-deleted rows with
+`forget()`. `rebuild()` recomputes both tables from the source tables. It
+runs in migration 0009, after bulk loads, and whenever drift needs repairing.
+
+Usage:
+    python -m app.rollups --rebuild
+"""
+
+import argparse
+import datetime
+import time
+from collections import Counter
+
+from sqlalchemy import select, delete, func, literal, union_all, inspect
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db import engine
+from app.models import (
+    User, Business, Requirement, Message, ArchivedMessage, Post, PostReaction, Connection, RollupTotal, RollupDaily,
+)
+
+# Messages live in two tables once old ones are archived (app/archive.py)
+_all_messages = union_all(
+    select(Message.sender_id, Message.created_at),
+    select(ArchivedMessage.sender_id, ArchivedMessage.created_at),
+).subquery("all_messages")
+
+# metric -> (counted table, column holding the acting user, creation timestamp or None)
+METRICS = {
+    "signups": (User, User.id, User.created_at),
+    "posts": (Post, Post.user_id, Post.created_at),
+    "messages": (_all_messages, _all_messages.c.sender_id, _all_messages.c.created_at),
+    "reactions": (PostReaction, PostReaction.user_id, PostReaction.created_at),
+    "connections": (Connection, Connection.requester_id, Connection.created_at),
+    "requirements": (Requirement, Requirement.owner_id, Requirement.created_at),
+    "businesses": (Business, Business.owner_id, None),  # no timestamp: totals only
+}
+UNKNOWN_ROLE = "unknown"
+
+
+def _upsert(model, delta, **keys):
+    stmt = insert(model).values(**keys, count=delta)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys), set_={"count": model.count + stmt.excluded.count},
+    )
+
+
+def record(db, metric, role, delta=1, at=None):
+    """Count rows created (or, with a negative delta, deleted) at `at` (caller commits)"""
+    db.execute(_upsert(RollupTotal, delta, metric=metric, role=role or UNKNOWN_ROLE))
+    if METRICS[metric][2] is not None:
+        day = (at or datetime.datetime.utcnow()).date().isoformat()
+        db.execute(_upsert(RollupDaily, delta, day=day, metric=metric, role=role or UNKNOWN_ROLE))
+
+
+def forget(db, metric, rows):
+    """Subtract purged rows, given as (role, created_at) pairs, from both rollup tables (caller commits)"""
+    by_role, by_day = Counter(), Counter()
+    for role, created_at in rows:
+        by_role[role or UNKNOWN_ROLE] += 1
+        if created_at is not None and METRICS[metric][2] is not None:
+            by_day[created_at.date().isoformat(), role or UNKNOWN_ROLE] += 1
+    for role, n in by_role.items():
+        db.execute(_upsert(RollupTotal, -n, metric=metric, role=role))
+    for (day, role), n in by_day.items():
+        db.execute(_upsert(RollupDaily, -n, day=day, metric=metric, role=role))
+
+
+def _grouped(model, actor, *columns):
+    q = select(*columns).select_from(model)
+    if model is not User:
+        q = q.outerjoin(User, User.id == actor)
+    return q
+
+
+def _sources(conn):
+    # Migration steps before 0014 rebuild before messages_archive exists
+    if inspect(conn).has_table(ArchivedMessage.__tablename__):
+        return METRICS
+    return {**METRICS, "messages": (Message, Message.sender_id, Message.created_at)}
+
+
+def rebuild(conn):
+    """Replace both rollup tables with counts grouped from the source tables"""
+    conn.execute(delete(RollupTotal))
+    conn.execute(delete(RollupDaily))
+    role = func.coalesce(User.role, UNKNOWN_ROLE)
+    for metric, (model, actor, created_at) in _sources(conn).items():
+        totals = _grouped(model, actor, literal(metric), role, func.count()).group_by(role)
+        conn.execute(insert(RollupTotal).from_select(["metric", "role", "count"], totals))
+        if created_at is None:
+            continue
+        day = func.date(created_at)
+        daily = (
+            _grouped(model, actor, day, literal(metric), role, func.count())
+            .where(created_at.isnot(None)).group_by(day, role)
+        )
+        conn.execute(insert(RollupDaily).from_select(["day", "metric", "role", "count"], daily))
+
+
+# ---------- Reads ----------
+
+def totals(db):
+    """{metric: {"total": n, "by_role": {role: n}}} from the handful of running-total rows"""
+    result = {metric: {"total": 0, "by_role": {}} for metric in METRICS}
+    for metric, role, count in db.execute(select(RollupTotal.metric, RollupTotal.role, RollupTotal.count)):
+        if metric in result and count:
+            result[metric]["total"] += count
+            result[metric]["by_role"][role] = count
+    return result
+
+
+def daily_series(db, days):
+    """Per-day counts for the last `days` days, zero-filled, as chart-ready lists"""
+    today = datetime.datetime.utcnow().date()
+    labels = [(today - datetime.timedelta(days=n)).isoformat() for n in range(days - 1, -1, -1)]
+    position = {day: i for i, day in enumerate(labels)}
+    series = {metric: {"total": [0] * days, "by_role": {}} for metric, spec in METRICS.items() if spec[2] is not None}
+    for day, metric, role, count in db.execute(
+        select(RollupDaily.day, RollupDaily.metric, RollupDaily.role, RollupDaily.count)
+        .where(RollupDaily.day >= labels[0])
+    ):
+        if metric not in series or day not in position:
+            continue
+        series[metric]["total"][position[day]] += count
+        series[metric]["by_role"].setdefault(role, [0] * days)[position[day]] += count
+    return {"days": labels, "metrics": series}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain admin analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from the source tables")
+    args = parser.parse_args()
+    if args.rebuild:
+        from app.migrations import migrate
+        migrate()
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild(conn)
+        print(f"Rebuilt rollups in {time.perf_counter() - t0:.1f}s")
+    else:
+        parser.print_help()
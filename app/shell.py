@@ -0,0 +1,70 @@
+"""
+Pre-rendered app shell
+
+index.html does not depend on the request. It is rendered once into bytes,
+with gzip (and, if the optional `brotli` package is installed, brotli)
+variants and an ETag derived from the content. The render is redone only when
+the asset manifest changes, because that is the only input that varies within
+a deploy. `respond()` answers If-None-Match with 304 and otherwise returns the
+smallest variant the client accepts.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import namedtuple
+
+from starlette.responses import Response
+
+from app import assets
+
+Shell = namedtuple("Shell", ["manifest", "etag", "variants"])  # variants: {content-encoding or "": body}
+
+# The shell changes with every deploy, so browsers keep it but revalidate each time
+CACHE_CONTROL = "no-cache"
+
+_lock = threading.Lock()
+_shell = None
+
+
+def _render(files, render_template):
+    body = render_template().encode("utf-8")
+    variants = {"": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants["br"] = brotli.compress(body, quality=11)
+    except ImportError:
+        pass
+    return Shell(dict(files), f'"{hashlib.sha256(body).hexdigest()[:32]}"', variants)
+
+
+def current(render_template):
+    """The cached shell, re-rendered with `render_template()` if the asset manifest changed"""
+    global _shell
+    files = assets.manifest()
+    shell = _shell
+    if shell is None or shell.manifest != files:
+        with _lock:
+            if _shell is None or _shell.manifest != files:
+                _shell = _render(files, render_template)
+            shell = _shell
+    return shell
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def respond(request, render_template):
+    shell = current(render_template)
+    headers = {"ETag": shell.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match", ""), shell.etag):
+        return Response(status_code=304, headers=headers)
+    accepted = assets.accepted_encodings(request.headers.get("accept-encoding", ""))
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in shell.variants:
+            headers["Content-Encoding"] = encoding
+            return Response(shell.variants[encoding], media_type="text/html", headers=headers)
+    return Response(shell.variants[""], media_type="text/html", headers=headers)
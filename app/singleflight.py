@@ -0,0 +1,88 @@
+"""
+Single-flight coalescing for identical concurrent reads
+
+When a burst of identical requests arrives together, the first one (the
+leader) computes the response and the rest wait for it and share its result
+instead of each querying the database. Nothing is kept after the leader
+finishes. This collapses a thundering herd without serving stale data, which
+makes it a complement to caches rather than one.
+
+Keys come from `request_key()`: the route, the visibility scope (who may see
+the result; results must not contain per-viewer fields) and the normalized
+query parameters. Sync endpoints run in the threadpool, so waiting is a plain
+threading.Event.
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def request_key(route, scope, **params):
+    """Normalize a read into a coalescing key; unset parameters and surrounding whitespace don't count"""
+    normalized = []
+    for name, value in sorted(params.items()):
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        normalized.append((name, value))
+    return (route, scope, tuple(normalized))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._routes = {}  # route -> [executions, shared]
+
+    def do(self, key, fn):
+        """Return fn()'s result, sharing one execution among concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._routes.setdefault(key[0], [0, 0])[0 if leader else 1] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            executions = sum(r[0] for r in self._routes.values())
+            shared = sum(r[1] for r in self._routes.values())
+            requests = executions + shared
+            return {
+                "in_flight": len(self._calls),
+                "requests": requests,
+                "executions": executions,
+                "shared": shared,
+                "dedup_ratio": round(shared / requests, 4) if requests else 0.0,
+                "routes": {
+                    route: {"executions": e, "shared": s, "dedup_ratio": round(s / (e + s), 4) if e + s else 0.0}
+                    for route, (e, s) in self._routes.items()
+                },
+            }
+
+
+flights = SingleFlight()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+"People you may know" suggestions
+
+A batch job ranks each user's second-degree connections by mutual-connection
+count, i.e. the user's row of A·A for the accepted-connection adjacency matrix
+A. A candidate's count is boosted when the two roles complement each other
+(business and investor) and again when they share a business or requirement
+sector. The top SUGGESTIONS_K per user are stored in `user_suggestions`, so
+the endpoint reads them with one primary-key range scan.
+
+Accepting or removing a connection queues both users. `--refresh` recomputes
+the queued users and their neighbours, because the edge changed their mutual
+counts too. SciPy does the matrix products when it is installed; otherwise the
+same counts come from adjacency sets in pure Python.
+
+Usage:
+    python -m app.suggestions --full       # recompute every user
+    python -m app.suggestions --refresh    # recompute queued users only
+"""
+
+import argparse
+import datetime
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import select, insert, delete, union_all
+
+from app.db import engine
+from app.models import User, Business, Requirement, Connection, UserSuggestion, SuggestionRefresh
+from app.migrations import migrate
+
+SUGGESTIONS_K = 20
+ROW_BLOCK = 2000  # users ranked per transaction; also bounds the A·A slice held in memory
+ROLE_BOOST = {frozenset(("business", "investor")): 1.5}
+SECTOR_BOOST = 1.25
+
+
+def mark_dirty(db, *user_ids):
+    """Queue users whose accepted connections changed (caller commits)"""
+    now = datetime.datetime.utcnow()
+    db.execute(insert(SuggestionRefresh).prefix_with("OR REPLACE"),
+               [{"user_id": user_id, "queued_at": now} for user_id in user_ids])
+
+
+# ---------- Graph snapshot ----------
+
+def load_graph(conn):
+    """Accepted adjacency sets, roles and normalized sectors for every user"""
+    adjacency = defaultdict(set)
+    for low, high in conn.execute(
+        select(Connection.user_low_id, Connection.user_high_id).where(Connection.status == "accepted")
+    ):
+        adjacency[low].add(high)
+        adjacency[high].add(low)
+    roles = dict(conn.execute(select(User.id, User.role)).all())
+    sectors = defaultdict(set)
+    for owner_id, sector in conn.execute(union_all(
+        select(Business.owner_id, Business.sector).where(Business.sector.isnot(None)),
+        select(Requirement.owner_id, Requirement.sector).where(Requirement.sector.isnot(None)),
+    )):
+        sectors[owner_id].add(sector.strip().lower())
+    return adjacency, roles, sectors
+
+
+def _affinity(roles, sectors, a, b):
+    boost = ROLE_BOOST.get(frozenset((roles.get(a), roles.get(b))), 1.0)
+    if sectors.get(a) and not sectors[a].isdisjoint(sectors.get(b, ())):
+        boost *= SECTOR_BOOST
+    return boost
+
+
+# ---------- Ranking ----------
+
+def _rank_python(graph, user_ids, k):
+    adjacency, roles, sectors = graph
+    for user_id in user_ids:
+        neighbours = adjacency.get(user_id, ())
+        mutual = Counter()
+        for n in neighbours:
+            mutual.update(adjacency[n])
+        mutual.pop(user_id, None)
+        for n in neighbours:
+            mutual.pop(n, None)
+        scored = sorted(
+            ((count * _affinity(roles, sectors, user_id, other), other, count) for other, count in mutual.items()),
+            key=lambda t: (-t[0], t[1]),
+        )
+        yield user_id, [(other, score, count) for score, other, count in scored[:k]]
+
+
+def _rank_scipy(graph, user_ids, k):
+    import numpy as np
+    from scipy import sparse
+
+    adjacency, roles, sectors = graph
+    ids = np.array(sorted(set(roles) | set(adjacency)), dtype=np.int64)
+    index = {int(user_id): i for i, user_id in enumerate(ids)}
+    n = len(ids)
+
+    src = [index[a] for a, others in adjacency.items() for _ in others]
+    dst = [index[b] for others in adjacency.values() for b in others]
+    A = sparse.csr_matrix((np.ones(len(src), dtype=np.int32), (src, dst)), shape=(n, n))
+
+    role_codes = {}
+    role_of = np.array([role_codes.setdefault(roles.get(int(u)), len(role_codes)) for u in ids])
+    role_boost = np.ones((len(role_codes), len(role_codes)))
+    for a, i in role_codes.items():
+        for b, j in role_codes.items():
+            role_boost[i, j] = ROLE_BOOST.get(frozenset((a, b)), 1.0)
+
+    sector_codes = {}
+    s_rows, s_cols = [], []
+    for user_id, names in sectors.items():
+        if user_id in index:
+            for name in names:
+                s_rows.append(index[user_id])
+                s_cols.append(sector_codes.setdefault(name, len(sector_codes)))
+    S = sparse.csr_matrix((np.ones(len(s_rows), dtype=np.int32), (s_rows, s_cols)),
+                          shape=(n, max(len(sector_codes), 1)))
+
+    for start in range(0, len(user_ids), ROW_BLOCK):
+        block_ids = user_ids[start:start + ROW_BLOCK]
+        rows = np.array([index.get(u, -1) for u in block_ids])
+        known = rows >= 0
+        ranked = {u: [] for u in block_ids}
+        if known.any():
+            block = A[rows[known]]
+            mutual = block @ A
+            mutual = (mutual - mutual.multiply(block)).tocoo()  # drop direct neighbours
+            row = rows[known][mutual.row]
+            keep = (mutual.data > 0) & (mutual.col != row)  # and the user themself
+            row, col, count = row[keep], mutual.col[keep], mutual.data[keep]
+            shared = np.asarray(S[row].multiply(S[col]).sum(axis=1)).ravel() > 0
+            score = count * role_boost[role_of[row], role_of[col]] * np.where(shared, SECTOR_BOOST, 1.0)
+
+            # Highest score first within each user, ties by lower user id, then keep k per user
+            order = np.lexsort((ids[col], -score, row))
+            row, col, count, score = row[order], col[order], count[order], score[order]
+            first = np.searchsorted(row, row, side="left")
+            top = (np.arange(len(row)) - first) < k
+            for r, c, m, s in zip(row[top], col[top], count[top], score[top]):
+                ranked[int(ids[r])].append((int(ids[c]), float(s), int(m)))
+        yield from ranked.items()
+
+
+def rank(graph, user_ids, k=SUGGESTIONS_K):
+    """Yield (user id, [(suggested id, score, mutual count), ...]) for each user"""
+    try:
+        import scipy  # noqa: F401
+    except ImportError:
+        return _rank_python(graph, user_ids, k)
+    return _rank_scipy(graph, user_ids, k)
+
+
+# ---------- Storage ----------
+
+def _store(bind, ranked):
+    computed_at = datetime.datetime.utcnow()
+    done = 0
+    batch = []
+
+    def flush():
+        user_ids = [user_id for user_id, _ in batch]
+        rows = [
+            {"user_id": user_id, "suggested_id": other, "score": score,
+             "mutual_count": count, "computed_at": computed_at}
+            for user_id, suggestions in batch for other, score, count in suggestions
+        ]
+        with bind.begin() as conn:
+            conn.execute(delete(UserSuggestion).where(UserSuggestion.user_id.in_(user_ids)))
+            if rows:
+                conn.execute(insert(UserSuggestion), rows)
+
+    for item in ranked:
+        batch.append(item)
+        if len(batch) >= ROW_BLOCK:
+            flush()
+            done += len(batch)
+            batch = []
+    if batch:
+        flush()
+        done += len(batch)
+    return done
+
+
+def compute_all(bind=None):
+    """Rank every user; each block of users is replaced in its own transaction"""
+    bind = bind or engine
+    with bind.connect() as conn:
+        graph = load_graph(conn)
+        user_ids = conn.execute(select(User.id).order_by(User.id)).scalars().all()
+    return _store(bind, rank(graph, user_ids))
+
+
+def refresh_dirty(bind=None):
+    """Re-rank queued users and their neighbours; returns the number of users re-ranked"""
+    bind = bind or engine
+    started = datetime.datetime.utcnow()
+    with bind.connect() as conn:
+        queued = conn.execute(select(SuggestionRefresh.user_id)).scalars().all()
+        if not queued:
+            return 0
+        graph = load_graph(conn)
+    adjacency = graph[0]
+    affected = set(queued)
+    for user_id in queued:
+        affected.update(adjacency.get(user_id, ()))
+    done = _store(bind, rank(graph, sorted(affected)))
+    with bind.begin() as conn:
+        # Users queued again while we ran keep their newer entry
+        conn.execute(delete(SuggestionRefresh).where(
+            SuggestionRefresh.user_id.in_(queued), SuggestionRefresh.queued_at <= started))
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute 'people you may know' suggestions")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--full", action="store_true", help="recompute suggestions for every user")
+    group.add_argument("--refresh", action="store_true", help="recompute queued users and their neighbours")
+    args = parser.parse_args()
+    migrate()
+    t0 = time.perf_counter()
+    count = compute_all() if args.full else refresh_dirty()
+    print(f"Ranked {count} users in {time.perf_counter() - t0:.1f}s")
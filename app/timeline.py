@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Fan-out-on-write timelines for the connection-scoped home feed
+
+`create_post` pushes each new post into the timeline of the author and every
+accepted connection, so reading a network feed page is one range scan of
+`timeline_entries`. Authors with more than FANOUT_LIMIT connections are not
+fanned out; their posts are merged in at read time instead (fan-out-on-read).
+
+Usage:
+    python -m app.timeline --backfill     # build timelines for existing posts
+"""
+
+import argparse
+import os
+import time
+
+from sqlalchemy import select, insert, delete, union_all, func, and_, or_, literal
+
+from app.db import engine
+from app.models import Post, Connection, TimelineEntry, TimelinePullAuthor
+from app.migrations import migrate
+
+FANOUT_LIMIT = int(os.getenv("GLOBRIDGE_FANOUT_LIMIT", "1000"))
+ACCEPT_BACKFILL = 100  # recent posts copied each way when two users connect
+BACKFILL_CHUNK = 50000  # post ids per backfill transaction
+
+TIMELINE_COLUMNS = ["user_id", "post_id", "author_id"]
+
+
+def _insert_ignore():
+    return insert(TimelineEntry).prefix_with("OR IGNORE")
+
+
+def connection_ids_query(user_id):
+    return union_all(
+        select(Connection.receiver_id).where(Connection.requester_id == user_id, Connection.status == "accepted"),
+        select(Connection.requester_id).where(Connection.receiver_id == user_id, Connection.status == "accepted"),
+    )
+
+
+def accepted_connection_ids(db, user_id):
+    return [row[0] for row in db.execute(connection_ids_query(user_id))]
+
+
+# ---------- Write path ----------
+
+def fan_out_post(db, post):
+    """Push a new post into the author's and their connections' timelines (caller commits)"""
+    rows = [{"user_id": post.user_id, "post_id": post.id, "author_id": post.user_id}]
+    if db.get(TimelinePullAuthor, post.user_id) is None:
+        connection_ids = accepted_connection_ids(db, post.user_id)
+        if len(connection_ids) > FANOUT_LIMIT:
+            db.add(TimelinePullAuthor(user_id=post.user_id, degree=len(connection_ids)))
+        else:
+            rows.extend({"user_id": uid, "post_id": post.id, "author_id": post.user_id} for uid in connection_ids)
+    db.execute(_insert_ignore(), rows)
+
+
+def on_connection_accepted(db, user_a, user_b):
+    """Copy each side's recent posts into the other's timeline (caller commits)"""
+    for viewer, author in ((user_a, user_b), (user_b, user_a)):
+        if db.get(TimelinePullAuthor, author) is not None:
+            continue
+        recent = (
+            select(literal(viewer), Post.id, Post.user_id)
+            .where(Post.user_id == author, Post.is_deleted == 0)
+            .order_by(Post.id.desc()).limit(ACCEPT_BACKFILL)
+        )
+        db.execute(_insert_ignore().from_select(TIMELINE_COLUMNS, recent))
+
+
+def on_connection_removed(db, user_a, user_b):
+    """Drop each side's posts from the other's timeline (caller commits)"""
+    db.execute(delete(TimelineEntry).where(or_(
+        and_(TimelineEntry.user_id == user_a, TimelineEntry.author_id == user_b),
+        and_(TimelineEntry.user_id == user_b, TimelineEntry.author_id == user_a),
+    )))
+
+
+def remove_posts(db, posts):
+    """Drop purged (post id, author id) pairs from every timeline they were pushed to (caller commits)"""
+    for post_id, author_id in posts:
+        # Primary-key probes: the author's own timeline plus each current connection's
+        db.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id, or_(
+            TimelineEntry.user_id == author_id, TimelineEntry.user_id.in_(connection_ids_query(author_id)),
+        )))
+
+
+# ---------- Read path ----------
+
+def timeline_post_ids(db, viewer_id, limit, offset=0, before_id=None):
+    """Newest-first post ids for the viewer's network feed"""
+    want = limit + offset
+    q = select(TimelineEntry.post_id).where(TimelineEntry.user_id == viewer_id)
+    if before_id:
+        q = q.where(TimelineEntry.post_id < before_id)
+    post_ids = db.execute(q.order_by(TimelineEntry.post_id.desc()).limit(want)).scalars().all()
+
+    # Fan-out-on-read for high-degree connections; the pull table is normally tiny or empty
+    pull_authors = db.execute(select(TimelinePullAuthor.user_id)).scalars().all()
+    if pull_authors:
+        pulled_from = db.execute(select(Connection.requester_id, Connection.receiver_id).where(
+            Connection.status == "accepted",
+            or_(
+                and_(Connection.requester_id == viewer_id, Connection.receiver_id.in_(pull_authors)),
+                and_(Connection.receiver_id == viewer_id, Connection.requester_id.in_(pull_authors)),
+            ),
+        )).all()
+        authors = {a if a != viewer_id else b for a, b in pulled_from}
+        if authors:
+            pq = select(Post.id).where(Post.user_id.in_(authors), Post.is_deleted == 0)
+            if before_id:
+                pq = pq.where(Post.id < before_id)
+            pulled = db.execute(pq.order_by(Post.id.desc()).limit(want)).scalars().all()
+            post_ids = sorted(set(post_ids).union(pulled), reverse=True)
+
+    return post_ids[offset:offset + limit]
+
+
+# ---------- Backfill ----------
+
+def mark_pull_authors(conn):
+    """Record every author whose accepted-connection count exceeds FANOUT_LIMIT"""
+    edges = union_all(
+        select(Connection.requester_id.label("user_id")).where(Connection.status == "accepted"),
+        select(Connection.receiver_id.label("user_id")).where(Connection.status == "accepted"),
+    ).subquery()
+    degrees = (
+        select(edges.c.user_id, func.count().label("degree"))
+        .group_by(edges.c.user_id).having(func.count() > FANOUT_LIMIT)
+    )
+    conn.execute(insert(TimelinePullAuthor).prefix_with("OR IGNORE").from_select(["user_id", "degree"], degrees))
+
+
+def backfill(bind=None, chunk=BACKFILL_CHUNK):
+    """Build timelines for all existing posts, one bounded transaction per post-id range"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        mark_pull_authors(conn)
+        max_id = conn.execute(select(func.max(Post.id))).scalar() or 0
+
+    pushed = ~Post.user_id.in_(select(TimelinePullAuthor.user_id))
+    started = time.perf_counter()
+    for low in range(0, max_id + 1, chunk):
+        live = (Post.id >= low, Post.id < low + chunk, Post.is_deleted == 0)
+        with bind.begin() as conn:
+            own = select(Post.user_id, Post.id, Post.user_id).where(*live)
+            to_receivers = (
+                select(Connection.receiver_id, Post.id, Post.user_id)
+                .join(Connection, and_(Connection.requester_id == Post.user_id, Connection.status == "accepted"))
+                .where(*live, pushed)
+            )
+            to_requesters = (
+                select(Connection.requester_id, Post.id, Post.user_id)
+                .join(Connection, and_(Connection.receiver_id == Post.user_id, Connection.status == "accepted"))
+                .where(*live, pushed)
+            )
+            for q in (own, to_receivers, to_requesters):
+                conn.execute(_insert_ignore().from_select(TIMELINE_COLUMNS, q))
+        print(f"  backfilled posts {low}..{min(low + chunk, max_id + 1) - 1} "
+              f"({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain network feed timelines")
+    parser.add_argument("--backfill", action="store_true", help="fan out all existing posts")
+    parser.add_argument("--chunk", type=int, default=BACKFILL_CHUNK)
+    args = parser.parse_args()
+    if args.backfill:
+        migrate()
+        backfill(chunk=args.chunk)
+    else:
+        parser.print_help()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Time-decayed trending posts
+
+Each reaction or comment is worth `weight * 2 ** ((t - epoch) / HALF_LIFE)`,
+added to the post's row in `post_trending_scores`. Scaling by event time
+rather than decaying every stored score keeps the relative order exactly that
+of a score decaying with the given half-life, so an engagement event is one
+upsert and the top-N is a walk of the score index. Removing a reaction
+subtracts its weight at the reaction's own time.
+
+The weights grow with time, so once `now` is REBASE_AFTER half-lives past the
+epoch the next write rescales every row and moves the epoch forward. This
+happens roughly monthly at the default half-life.
+
+Usage:
+    python -m app.trending --rebuild     # recompute scores from existing reactions and comments
+"""
+
+import argparse
+import datetime
+import os
+import time
+from collections import defaultdict
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db import engine
+from app.models import Post, PostReaction, PostComment, PostTrendingScore, TrendingState
+from app.migrations import migrate
+
+HALF_LIFE = float(os.getenv("GLOBRIDGE_TRENDING_HALF_LIFE_HOURS", "6")) * 3600
+REACTION_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+REBASE_AFTER = 120  # half-lives; 2 ** 120 stays far inside float range
+PRUNE_BELOW = 2 ** -20  # after a rebase, rows this small no longer affect any ranking
+
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _seconds(at):
+    return (at - _UNIX_EPOCH).total_seconds()
+
+
+def _weight(weight, at, epoch):
+    return weight * 2 ** ((at - epoch) / HALF_LIFE)
+
+
+def _rebase(db, epoch, now):
+    factor = 2 ** (-(now - epoch) / HALF_LIFE)
+    db.execute(update(PostTrendingScore).values(score=PostTrendingScore.score * factor))
+    db.execute(delete(PostTrendingScore).where(PostTrendingScore.score < PRUNE_BELOW))
+    db.execute(update(TrendingState).where(TrendingState.id == 1).values(epoch=now))
+    return now
+
+
+def _epoch(db, now):
+    # Read inside the writer's transaction, so a concurrent rebase cannot slip in between
+    epoch = db.execute(select(TrendingState.epoch).where(TrendingState.id == 1)).scalar()
+    if epoch is None:
+        db.execute(insert(TrendingState).prefix_with("OR IGNORE").values(id=1, epoch=now))
+        return db.execute(select(TrendingState.epoch).where(TrendingState.id == 1)).scalar()
+    if now - epoch > REBASE_AFTER * HALF_LIFE:
+        return _rebase(db, epoch, now)
+    return epoch
+
+
+def record(db, post_id, weight, at=None):
+    """Add one engagement event to a post's score (caller commits); negative weight retracts one"""
+    now = _seconds(datetime.datetime.utcnow())
+    at = _seconds(at) if at is not None else now
+    value = _weight(weight, at, _epoch(db, now))
+    stmt = insert(PostTrendingScore).values(post_id=post_id, score=value)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[PostTrendingScore.post_id],
+        set_={"score": PostTrendingScore.score + stmt.excluded.score},
+    ))
+
+
+def top_posts(db, limit, offset=0):
+    """[(post id, current decayed score)] highest first, read from the score index"""
+    epoch = db.execute(select(TrendingState.epoch).where(TrendingState.id == 1)).scalar()
+    if epoch is None:
+        return []
+    rows = db.execute(
+        select(PostTrendingScore.post_id, PostTrendingScore.score)
+        .join(Post, Post.id == PostTrendingScore.post_id)
+        .where(Post.is_deleted == 0, PostTrendingScore.score > 0)
+        .order_by(PostTrendingScore.score.desc()).offset(offset).limit(limit)
+    ).all()
+    scale = 2 ** (-(_seconds(datetime.datetime.utcnow()) - epoch) / HALF_LIFE)
+    return [(post_id, score * scale) for post_id, score in rows]
+
+
+def rebuild(bind=None):
+    """Recompute every score from the engagement tables against a fresh epoch"""
+    bind = bind or engine
+    now = _seconds(datetime.datetime.utcnow())
+    scores = defaultdict(float)
+    with bind.connect() as conn:
+        for weight, query in (
+            (REACTION_WEIGHT, select(PostReaction.post_id, PostReaction.created_at)),
+            (COMMENT_WEIGHT, select(PostComment.post_id, PostComment.created_at).where(PostComment.is_deleted == 0)),
+        ):
+            for post_id, created_at in conn.execute(query.execution_options(yield_per=10000)):
+                if created_at is not None:
+                    scores[post_id] += _weight(weight, _seconds(created_at), now)
+    with bind.begin() as conn:
+        conn.execute(delete(PostTrendingScore))
+        conn.execute(delete(TrendingState))
+        conn.execute(insert(TrendingState).values(id=1, epoch=now))
+        rows = [{"post_id": post_id, "score": score} for post_id, score in scores.items() if score >= PRUNE_BELOW]
+        if rows:
+            conn.execute(insert(PostTrendingScore), rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain trending post scores")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all scores from scratch")
+    args = parser.parse_args()
+    if args.rebuild:
+        migrate()
+        t0 = time.perf_counter()
+        count = rebuild()
+        print(f"Scored {count} posts in {time.perf_counter() - t0:.1f}s")
+    else:
+        parser.print_help()
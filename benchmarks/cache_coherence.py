@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Cross-worker cache staleness check
+Starts two uvicorn processes, A and B, on one scratch database, exactly as two
+workers would share it. Each round warms B's cached feed page, then writes
+through A (a new post, then a reaction on it) and polls B until the change
+shows up. It prints how long B served the stale page. With the cache bus on,
+every change must reach B within --timeout seconds or the check exits
+non-zero. --no-bus runs both processes with GLOBRIDGE_CACHE_BUS=0 to show the
+staleness the bus removes.
+
+Usage:
+    python -m benchmarks.cache_coherence
+    python -m benchmarks.cache_coherence --no-bus --rounds 3
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.media import ROOT, _free_port, _wait_ready, _percentile
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    if cookie:
+        headers["Cookie"] = cookie
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} -> {response.status} {data[:200]!r}")
+    cookie = response.getheader("set-cookie")
+    return json.loads(data or b"null"), cookie.split(";", 1)[0] if cookie else None
+
+
+def wait_for(port, cookie, predicate, timeout):
+    """Seconds until B's first feed page satisfies predicate, or None on timeout"""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        posts = request(port, "GET", "/api/feed", cookie=cookie)[0]["posts"]
+        if predicate(posts):
+            return time.perf_counter() - t0
+        time.sleep(0.01)
+    return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Time until one worker's write is visible in another worker's caches")
+    p.add_argument("--rounds", type=int, default=10)
+    p.add_argument("--timeout", type=float, default=5.0)
+    p.add_argument("--no-bus", action="store_true", help="run both workers with the cache bus off")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'coherence.db')}"
+        env["GLOBRIDGE_UPLOAD_DIR"] = os.path.join(scratch, "uploads")
+        env["GLOBRIDGE_RATE_LIMITS"] = "0"
+        env["GLOBRIDGE_BUILD_ASSETS"] = "0"
+        env["GLOBRIDGE_CACHE_BUS"] = "0" if args.no_bus else "1"
+        ports = [_free_port(), _free_port()]
+        servers = []
+        try:
+            for port in ports:
+                servers.append(subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                    cwd=ROOT, env=env,
+                ))
+                _wait_ready(port)  # one at a time so the second start finds the schema migrated
+            a, b = ports
+            account = {"name": "Coherence", "email": "coherence@bench.example", "password": "bench1234",
+                       "role": "investor"}
+            request(a, "POST", "/api/register", account)
+            _, cookie = request(a, "POST", "/api/login", {"email": account["email"], "password": "bench1234"})
+
+            lags = {"post": [], "reaction": []}
+            stale = 0
+            for i in range(args.rounds):
+                request(b, "GET", "/api/feed", cookie=cookie)  # B caches the current first page
+                post_id = request(a, "POST", "/api/posts", {"content": f"round {i}"}, cookie)[0]["post_id"]
+                lag = wait_for(b, cookie, lambda posts: posts and posts[0]["id"] == post_id, args.timeout)
+                if lag is None:
+                    stale += 1
+                    continue
+                lags["post"].append(lag)
+                request(a, "POST", f"/api/posts/{post_id}/reactions", {"reaction_type": "like"}, cookie)
+                lag = wait_for(b, cookie, lambda posts: posts[0]["reactions"].get("like") == 1, args.timeout)
+                if lag is None:
+                    stale += 1
+                else:
+                    lags["reaction"].append(lag)
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+    print(f"cache bus {'off' if args.no_bus else 'on'}, {args.rounds} rounds")
+    print(f"{'change seen by B':<20}{'p50 ms':>9}{'max ms':>9}{'seen':>6}")
+    for label, values in lags.items():
+        print(f"{label:<20}{_percentile(values, 0.5):>9.1f}{max(values, default=0) * 1000:>9.1f}{len(values):>6}")
+    print(f"still stale after {args.timeout:g}s: {stale}")
+    if args.no_bus:
+        return 0
+    print("OK" if not stale else "FAIL")
+    return 1 if stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite
+Drives the ASGI app in-process against a generated dataset (see app/datagen.py)
+and reports latency percentiles, throughput and queries per request
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m app.datagen --scale 0.01 --wipe
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.endpoints run --out benchmarks/results/latest.json
+    python -m benchmarks.endpoints compare benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.harness import (
+    ASGIClient, Lifespan, QueryCounter, compare, environment_info, summarize, write_json,
+)
+
+# The suite replays one user's traffic as fast as it can, which is exactly what the limiter exists to stop
+os.environ.setdefault("GLOBRIDGE_RATE_LIMITS", "0")
+os.environ.setdefault("GLOBRIDGE_LOAD_SHEDDING", "0")
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+
+# 1x1 transparent PNG
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000100ffff03000006000557bfabd40000000049454e44ae426082"
+)
+
+
+def _multipart(field, filename, content_type, data):
+    boundary = "benchboundary7MA4YWxkTrZu0gW"
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def load_context(m, email=None):
+    """Pick benchmark subjects (viewer, conversation partner, busy post) from the dataset"""
+    with m.engine.connect() as conn:
+        if email:
+            viewer = conn.execute(select(m.User.id, m.User.email).where(m.User.email == email)).first()
+        else:
+            # The investor with the most messages sees the heaviest conversation list and match list
+            viewer = conn.execute(
+                select(m.User.id, m.User.email)
+                .join(m.Message, m.Message.receiver_id == m.User.id)
+                .where(m.User.role == "investor")
+                .group_by(m.User.id).order_by(func.count().desc()).limit(1)
+            ).first()
+        if not viewer:
+            raise SystemExit("No benchmark user found; generate a dataset with `python -m app.datagen` first.")
+        partner = conn.execute(
+            select(m.Message.sender_id).where(m.Message.receiver_id == viewer.id).limit(1)
+        ).scalar()
+        busy_post = conn.execute(
+            select(m.PostComment.post_id).group_by(m.PostComment.post_id)
+            .order_by(func.count().desc()).limit(1)
+        ).scalar()
+        counts = {
+            model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar()
+            for model in (m.User, m.Business, m.Requirement, m.Connection, m.Post,
+                          m.PostReaction, m.PostComment, m.Message)
+        }
+        sample_posts = conn.execute(select(m.Post.id).order_by(m.Post.id.desc()).limit(500)).scalars().all()
+    return {
+        "viewer_id": viewer.id,
+        "email": viewer.email,
+        "partner_id": partner or viewer.id,
+        "busy_post_id": busy_post or (sample_posts[0] if sample_posts else 1),
+        "sample_posts": sample_posts or [1],
+        "counts": counts,
+    }
+
+
+def build_scenarios(ctx, password):
+    rng = random.Random(7)
+    uploaded = ctx.setdefault("uploaded", [])
+
+    async def login(c):
+        return await ASGIClient(c.app).request(
+            "POST", "/api/login", json_body={"email": ctx["email"], "password": password})
+
+    async def upload(c):
+        body, headers = _multipart("file", "bench.png", "image/png", TINY_PNG)
+        r = await c.request("POST", "/api/upload", params={"file_type": "image"}, body=body, headers=headers)
+        if r.status == 200:
+            uploaded.append(r.json()["file_url"])
+        return r
+
+    # name -> (request factory, iteration multiplier)
+    return {
+        "feed_first_page": (lambda c: c.request("GET", "/api/feed", params={"offset": 0, "limit": 20}), 1.0),
+        "feed_deep_page": (lambda c: c.request(
+            "GET", "/api/feed", params={"offset": rng.randint(1, 50) * 20, "limit": 20}), 1.0),
+        "feed_network": (lambda c: c.request(
+            "GET", "/api/feed", params={"scope": "network", "offset": 0, "limit": 20}), 1.0),
+        "feed_trending": (lambda c: c.request("GET", "/api/feed/trending", params={"limit": 20}), 1.0),
+        "feed_probe": (lambda c: c.request("GET", "/api/feed/probe", params={
+            "since_post_id": ctx["sample_posts"][0], "since_message_id": 0, "since_connection_id": 0}), 1.0),
+        "conversations": (lambda c: c.request("GET", "/api/conversations"), 1.0),
+        "conversation_thread": (lambda c: c.request(
+            "GET", f"/api/messages/conversation/{ctx['partner_id']}"), 1.0),
+        "unread_count": (lambda c: c.request("GET", "/api/messages/unread-count"), 1.0),
+        "badges": (lambda c: c.request("GET", "/api/badges"), 1.0),
+        "post_comments": (lambda c: c.request("GET", f"/api/posts/{ctx['busy_post_id']}/comments"), 1.0),
+        "user_search": (lambda c: c.request(
+            "GET", "/api/users/search", params={"q": rng.choice(["ana", "kim", "patel", "lo"])}), 1.0),
+        "connection_requests": (lambda c: c.request("GET", "/api/connections/requests"), 1.0),
+        "suggestions": (lambda c: c.request("GET", "/api/connections/suggestions"), 1.0),
+        "matches": (lambda c: c.request("GET", "/api/matches"), 0.25),
+        "businesses": (lambda c: c.request("GET", "/api/businesses", params={"sector": "Technology"}), 0.25),
+        "business_facets": (lambda c: c.request("GET", "/api/businesses/facets", params={"country": "India"}), 1.0),
+        "requirements": (lambda c: c.request("GET", "/api/requirements", params={"country": "India"}), 0.25),
+        "countries": (lambda c: c.request("GET", "/api/countries"), 1.0),
+        "costs": (lambda c: c.request("POST", "/api/costs", json_body={
+            "countries": ["USA", "India", "Germany", "Vietnam", "Brazil"]}), 1.0),
+        "dashboard_stats": (lambda c: c.request("GET", "/api/dashboard/stats"), 0.5),
+        "react_toggle": (lambda c: c.request(
+            "POST", f"/api/posts/{rng.choice(ctx['sample_posts'])}/reactions",
+            json_body={"reaction_type": "like"}), 1.0),
+        "upload_image": (upload, 0.5),
+        "login": (login, 0.1),
+    }
+
+
+async def run_scenario(client, factory, iterations, concurrency, warmup, engines):
+    for _ in range(warmup):
+        await factory(client)
+    latencies = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            r = await factory(client)
+            latencies.append(time.perf_counter() - t0)
+            if r.status >= 400:
+                errors += 1
+
+    # GETs run on the read engine and everything else on the writer, so count both
+    with contextlib.ExitStack() as stack:
+        counters = [stack.enter_context(QueryCounter(engine)) for engine in engines]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(iterations)))
+        wall = time.perf_counter() - t0
+    return summarize(latencies, wall, errors, sum(qc.count for qc in counters))
+
+
+async def run(args):
+    import app.main as m
+
+    ctx = load_context(m, args.email)
+    scenarios = build_scenarios(ctx, args.password)
+    if args.only:
+        wanted = set(args.only.split(","))
+        unknown = wanted - set(scenarios)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {k: v for k, v in scenarios.items() if k in wanted}
+
+    results = {}
+    async with Lifespan(m.app):
+        client = ASGIClient(m.app)
+        r = await client.request("POST", "/api/login", json_body={"email": ctx["email"], "password": args.password})
+        if r.status != 200:
+            raise SystemExit(f"Login as {ctx['email']} failed ({r.status}); pass --email/--password.")
+        print(f"Benchmarking as {ctx['email']} (user {ctx['viewer_id']}), "
+              f"{args.iterations} iterations, concurrency {args.concurrency}")
+        print(f"{'scenario':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'q/req':>7}{'err':>5}")
+        for name, (factory, weight) in scenarios.items():
+            iterations = max(5, int(args.iterations * weight))
+            res = await run_scenario(client, factory, iterations, args.concurrency, args.warmup,
+                                     (m.engine, m.read_engine))
+            results[name] = res
+            print(f"{name:<22}{res['p50_ms']:>9.2f}{res['p95_ms']:>9.2f}{res['p99_ms']:>9.2f}"
+                  f"{res['throughput_rps']:>9.1f}{res['queries_per_request']:>7.1f}{res['errors']:>5}")
+
+    for url in ctx.get("uploaded", []):
+        try:
+            os.remove(os.path.join(m.BASE_DIR, url.lstrip("/")))
+        except OSError:
+            pass
+
+    meta = environment_info()
+    meta.update({"iterations": args.iterations, "concurrency": args.concurrency,
+                 "warmup": args.warmup, "dataset": ctx["counts"]})
+    return {"meta": meta, "results": results}
+
+
+def report_comparison(baseline, current, threshold):
+    regressions, improvements = compare(baseline, current, threshold=threshold)
+    for line in improvements:
+        print(f"  improved   {line}")
+    for line in regressions:
+        print(f"  REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Globridge endpoint benchmarks")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="run the benchmark suite and write results JSON")
+    r.add_argument("--iterations", type=int, default=200)
+    r.add_argument("--concurrency", type=int, default=1)
+    r.add_argument("--warmup", type=int, default=3)
+    r.add_argument("--only", help="comma-separated scenario names")
+    r.add_argument("--email", help="benchmark as this user (default: busiest investor)")
+    r.add_argument("--password", default="bench1234")
+    r.add_argument("--out", default=DEFAULT_OUT)
+    r.add_argument("--baseline", help="compare against this results file after running")
+    r.add_argument("--threshold", type=float, default=0.10)
+
+    c = sub.add_parser("compare", help="compare two results files and flag regressions")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.10)
+
+    args = p.parse_args(argv)
+    if args.command == "run":
+        current = asyncio.run(run(args))
+        write_json(args.out, current)
+        print(f"Results written to {args.out}")
+        if args.baseline:
+            with open(args.baseline) as f:
+                return report_comparison(json.load(f), current, args.threshold)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return report_comparison(baseline, current, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
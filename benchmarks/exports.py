@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Streaming export memory check
+Builds two scratch databases, one with --rows businesses and one ten times
+larger, and streams the businesses export from each as CSV, NDJSON and
+gzip-compressed CSV (app/exports.py), discarding the bytes. The in-memory list
+path (`_list_businesses` plus json.dumps) runs as a reference. Each variant
+runs in a fresh interpreter, so peak RSS is its own. An export's peak must not
+grow with the row count: the check fails if the larger database raises it by
+more than --slack-mb.
+
+Usage:
+    python -m benchmarks.exports                  # 20k and 200k rows
+    python -m benchmarks.exports --rows 5000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.read_models import ROOT, _peak_rss_mb, build
+
+VARIANTS = {
+    "export_csv": ("csv", False),
+    "export_ndjson": ("ndjson", False),
+    "export_csv_gzip": ("csv", True),
+    "list_json": None,
+}
+
+
+def run_variant(name):
+    from app import exports
+    from app.db import engine, SessionLocal
+    from app.main import _list_businesses  # imported here so its cost stays out of the measurement
+
+    baseline = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if VARIANTS[name] is None:
+        with SessionLocal() as db:
+            size = len(json.dumps(_list_businesses(db, None, None, None)).encode())
+    else:
+        fmt, compress = VARIANTS[name]
+        size = sum(len(chunk) for chunk in exports.stream(engine, exports.queries("businesses", None), fmt, compress))
+    return {"bytes": size, "ms": (time.perf_counter() - t0) * 1000, "peak_rss_growth_mb": _peak_rss_mb() - baseline}
+
+
+# ---------- Driver ----------
+
+def _child(database, *args):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{database}"
+    out = subprocess.run([sys.executable, "-m", "benchmarks.exports", *args], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1]) if out.stdout.strip() else None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Check that streaming exports use constant memory")
+    p.add_argument("--rows", type=int, default=20_000)
+    p.add_argument("--slack-mb", type=float, default=5.0)
+    p.add_argument("--child", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child == "build":
+        build(args.rows)
+        return 0
+    if args.child:
+        print(json.dumps(run_variant(args.child)))
+        return 0
+
+    sizes = [args.rows, args.rows * 10]
+    peaks = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        print(f"{'variant':<18}{'rows':>10}{'MB out':>9}{'ms':>9}{'peak RSS +MB':>14}")
+        for rows in sizes:
+            database = os.path.join(scratch, f"exports_{rows}.db")
+            _child(database, "--child", "build", "--rows", str(rows))
+            for name in VARIANTS:
+                r = _child(database, "--child", name)
+                peaks.setdefault(name, []).append(r["peak_rss_growth_mb"])
+                print(f"{name:<18}{rows:>10,}{r['bytes'] / 2**20:>9.1f}{r['ms']:>9.0f}{r['peak_rss_growth_mb']:>14.1f}")
+
+    growing = [name for name, (small, large) in peaks.items()
+               if VARIANTS[name] is not None and large - small > args.slack_mb]
+    print("OK" if not growing else f"FAIL: memory grows with rows for {', '.join(growing)}")
+    return 1 if growing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
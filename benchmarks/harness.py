@@ -0,0 +1,217 @@
+"""
+Shared benchmark helpers: an in-process ASGI client, a SQL query counter,
+latency statistics and baseline comparison
+"""
+
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+
+
+class ASGIResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def header(self, name):
+        name = name.lower().encode()
+        for k, v in self.headers:
+            if k.lower() == name:
+                return v.decode("latin-1")
+        return None
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client that calls the ASGI app directly (no sockets)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookies = {}
+
+    async def request(self, method, path, params=None, json_body=None, body=b"", headers=None):
+        req_headers = [(b"host", b"bench")]
+        for k, v in (headers or {}).items():
+            req_headers.append((k.lower().encode(), v.encode("latin-1")))
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            req_headers.append((b"content-type", b"application/json"))
+        if self.cookies:
+            cookie = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+            req_headers.append((b"cookie", cookie.encode()))
+        req_headers.append((b"content-length", str(len(body)).encode()))
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(), "root_path": "",
+            "headers": req_headers, "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        }
+        sent = False
+        status = 500
+        resp_headers = []
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status, resp_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                resp_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        response = ASGIResponse(status, resp_headers, b"".join(chunks))
+        for k, v in resp_headers:
+            if k.lower() == b"set-cookie":
+                jar = SimpleCookie()
+                jar.load(v.decode("latin-1"))
+                for name, morsel in jar.items():
+                    self.cookies[name] = morsel.value
+        return response
+
+
+class Lifespan:
+    """Runs the app's ASGI lifespan startup/shutdown around a benchmark"""
+
+    def __init__(self, app):
+        self.app = app
+        self._queue = asyncio.Queue()
+        self._started = asyncio.Event()
+        self._task = None
+
+    async def _receive(self):
+        return await self._queue.get()
+
+    async def _send(self, message):
+        if message["type"] in ("lifespan.startup.complete", "lifespan.startup.failed"):
+            self._started.set()
+            if message["type"] == "lifespan.startup.failed":
+                raise RuntimeError(message.get("message", "lifespan startup failed"))
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._task = asyncio.ensure_future(self.app(scope, self._receive, self._send))
+        await self._queue.put({"type": "lifespan.startup"})
+        await self._started.wait()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._queue.put({"type": "lifespan.shutdown"})
+        try:
+            await asyncio.wait_for(self._task, timeout=10)
+        except Exception:
+            pass
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_s, wall_s, errors, queries):
+    ms = sorted(x * 1000.0 for x in latencies_s)
+    n = len(ms)
+    return {
+        "requests": n,
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / n, 3) if n else 0.0,
+        "max_ms": round(ms[-1], 3) if n else 0.0,
+        "throughput_rps": round(n / wall_s, 1) if wall_s > 0 else 0.0,
+        "queries_per_request": round(queries / n, 2) if n else 0.0,
+    }
+
+
+def environment_info():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def compare(baseline, current, threshold=0.10, noise_floor_ms=1.0):
+    """Return (regressions, improvements) comparing two result documents.
+
+    A scenario regresses when its p95 or p99 grows by more than `threshold`
+    (and by more than `noise_floor_ms`), when throughput drops by more than
+    `threshold`, or when it issues more queries per request.
+    """
+    regressions, improvements = [], []
+    base_results = baseline.get("results", {})
+    for name, cur in current.get("results", {}).items():
+        base = base_results.get(name)
+        if not base:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            b, c = base[key], cur[key]
+            if c - b > noise_floor_ms and b > 0 and (c - b) / b > threshold:
+                regressions.append(f"{name}: {key} {b:.2f} -> {c:.2f} (+{(c - b) / b:.0%})")
+            elif b - c > noise_floor_ms and b > 0 and (b - c) / b > threshold:
+                improvements.append(f"{name}: {key} {b:.2f} -> {c:.2f} (-{(b - c) / b:.0%})")
+        b, c = base["throughput_rps"], cur["throughput_rps"]
+        if b > 0 and (b - c) / b > threshold:
+            regressions.append(f"{name}: throughput {b:.1f} -> {c:.1f} rps")
+        b, c = base["queries_per_request"], cur["queries_per_request"]
+        if c > b + 0.5:
+            regressions.append(f"{name}: queries/request {b:.2f} -> {c:.2f}")
+        elif c < b - 0.5:
+            improvements.append(f"{name}: queries/request {b:.2f} -> {c:.2f}")
+        if cur.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return regressions, improvements
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for app.main
+Imports the app in a fresh interpreter (best of several runs) and fails when
+the import exceeds the budget, touches the filesystem, or pulls in modules
+that should only load on first use.
+
+Usage:
+    python -m benchmarks.import_budget                 # default 1500 ms budget
+    python -m benchmarks.import_budget --budget-ms 800 --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy or side-effecting modules that must stay out of the import path
+LAZY_MODULES = ["passlib", "bcrypt", "smtplib", "jinja2"]
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def probe_once(scratch):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'probe.db')}"
+    env["GLOBRIDGE_UPLOAD_DIR"] = os.path.join(scratch, "uploads")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Check that importing app.main is fast and side-effect free")
+    p.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    p.add_argument("--runs", type=int, default=3)
+    args = p.parse_args(argv)
+
+    failures = []
+    timings = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(args.runs):
+            result = probe_once(scratch)
+            timings.append(result["ms"])
+            if result["loaded"]:
+                failures.append(f"eagerly imported: {', '.join(result['loaded'])}")
+        leftovers = sorted(os.listdir(scratch))
+        if leftovers:
+            failures.append(f"import created files: {', '.join(leftovers)}")
+
+    best = min(timings)
+    print(f"import app.main: best {best:.0f} ms, worst {max(timings):.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if best > args.budget_ms:
+        failures.append(f"import took {best:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    for f in sorted(set(failures)):
+        print(f"FAIL {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
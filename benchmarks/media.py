@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Seek-heavy video playback benchmark
+Starts one uvicorn worker on a scratch database and upload directory holding a
+--size-mb video. It first measures API latency on its own, then again while
+--players threads seek around the video. Each seek is an open-ended Range
+request ("bytes=N-") that reads --read-kb and hangs up, the way browsers do.
+With --mode full every seek instead downloads the whole file, which is what
+a server without Range support forces on players.
+
+Usage:
+    python -m benchmarks.media                      # 16 players, 50MB video, 15s
+    python -m benchmarks.media --mode full --players 4
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIDEO = "/uploads/videos/bench.mp4"
+API_PATHS = ("/healthz", "/api/businesses")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+
+def measure_api(port, seconds):
+    latencies = []
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        conn.request("GET", API_PATHS[i % len(API_PATHS)])
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    conn.close()
+    return latencies
+
+
+def player(port, size, mode, read_bytes, stop, totals, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        headers = {} if mode == "full" else {"Range": f"bytes={rng.randrange(size)}-"}
+        conn.request("GET", VIDEO, headers=headers)
+        response = conn.getresponse()
+        want = size if mode == "full" else read_bytes
+        got = 0
+        while got < want and not stop.is_set():
+            chunk = response.read(min(65536, want - got))
+            if not chunk:
+                break
+            got += len(chunk)
+        conn.close()  # hang up mid-stream like a player that seeks again
+        with totals["lock"]:
+            totals["seeks"] += 1
+            totals["bytes"] += got
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="API latency under concurrent seek-heavy video playback")
+    p.add_argument("--players", type=int, default=16)
+    p.add_argument("--size-mb", type=int, default=50)
+    p.add_argument("--read-kb", type=int, default=512, help="bytes read per seek before hanging up")
+    p.add_argument("--seconds", type=float, default=15.0)
+    p.add_argument("--mode", choices=("range", "full"), default="range")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        uploads = os.path.join(scratch, "uploads")
+        os.makedirs(os.path.join(uploads, "videos"))
+        size = args.size_mb * 1024 * 1024
+        with open(os.path.join(uploads, "videos", "bench.mp4"), "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+        port = _free_port()
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'media.db')}"
+        env["GLOBRIDGE_UPLOAD_DIR"] = uploads
+        env.setdefault("GLOBRIDGE_RATE_LIMITS", "0")  # the latency probe would trip the search limit
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            _wait_ready(port)
+            idle = measure_api(port, args.seconds / 3)
+
+            stop = threading.Event()
+            totals = {"lock": threading.Lock(), "seeks": 0, "bytes": 0}
+            threads = [threading.Thread(target=player, args=(port, size, args.mode, args.read_kb * 1024,
+                                                             stop, totals, n), daemon=True)
+                       for n in range(args.players)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            busy = measure_api(port, args.seconds)
+            stop.set()
+            elapsed = time.perf_counter() - t0
+            for t in threads:
+                t.join(timeout=10)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"mode={args.mode} players={args.players} video={args.size_mb}MB seconds={args.seconds:g}")
+    print(f"{'API latency':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'requests':>10}")
+    for label, values in (("idle", idle), ("during playback", busy)):
+        print(f"{label:<22}{_percentile(values, 0.5):>9.1f}{_percentile(values, 0.95):>9.1f}"
+              f"{_percentile(values, 0.99):>9.1f}{len(values):>10}")
+    print(f"seeks/s {totals['seeks'] / elapsed:.1f}   video MB/s {totals['bytes'] / elapsed / 1e6:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Concurrent reaction toggling check
+Builds a scratch database, then has --threads threads, each with its own
+session, toggle the same users' reactions on the same posts as fast as they
+can through app.reactions.apply (the path the endpoints use). Afterwards it
+checks that:
+
+- no (post, user) pair has more than one row,
+- every pair ended in the state its toggle count implies (toggling the same
+  type an odd number of times leaves a reaction, an even number leaves none),
+- the reactions rollup still equals COUNT(*).
+
+Exits non-zero on any violation.
+
+Usage:
+    python -m benchmarks.reaction_race
+    python -m benchmarks.reaction_race --threads 16 --toggles 200
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Toggle reactions from many threads and check for duplicates")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--toggles", type=int, default=100, help="toggles per thread")
+    p.add_argument("--users", type=int, default=3)
+    p.add_argument("--posts", type=int, default=3)
+    args = p.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'race.db')}"
+    from sqlalchemy import select, func, insert
+    from sqlalchemy.exc import OperationalError
+    from app.db import engine, SessionLocal
+    from app.migrations import migrate
+    from app.models import User, Post, PostReaction, RollupTotal
+    from app import reactions
+
+    migrate(engine)
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "name": f"User {i}", "email": f"u{i}@race.example", "password_hash": "x",
+             "role": "investor", "created_at": now} for i in range(1, args.users + 1)
+        ])
+        conn.execute(insert(Post), [
+            {"id": i, "user_id": 1, "content": "post", "created_at": now} for i in range(1, args.posts + 1)
+        ])
+    users = {u.id: u for u in SessionLocal().execute(select(User)).scalars()}
+    pairs = [(post_id, user_id) for post_id in range(1, args.posts + 1) for user_id in users]
+
+    toggles = Counter()
+    lock = threading.Lock()
+    errors = []
+    start = threading.Barrier(args.threads)
+
+    def worker(n):
+        db = SessionLocal.session_factory()
+        start.wait()
+        for i in range(args.toggles):
+            post_id, user_id = pairs[(n + i) % len(pairs)]
+            for attempt in range(20):
+                try:
+                    reactions.apply(db, post_id, users[user_id], "like")
+                    db.commit()
+                    break
+                except OperationalError:  # database is locked: back off like a retrying client
+                    db.rollback()
+                    time.sleep(0.005 * (attempt + 1))
+                except Exception as e:
+                    db.rollback()  # never leave a write lock behind for the other threads
+                    errors.append(f"toggling {post_id}/{user_id} raised {e!r}")
+                    break
+            else:
+                errors.append(f"gave up toggling {post_id}/{user_id}")
+                continue
+            with lock:
+                toggles[(post_id, user_id)] += 1
+        db.close()
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        rows = Counter(conn.execute(select(PostReaction.post_id, PostReaction.user_id)).all())
+        total = conn.execute(select(func.count()).select_from(PostReaction)).scalar()
+        rollup = conn.execute(
+            select(func.coalesce(func.sum(RollupTotal.count), 0)).where(RollupTotal.metric == "reactions")
+        ).scalar()
+
+    problems = list(errors)
+    problems += [f"duplicate rows for {pair}: {n}" for pair, n in rows.items() if n > 1]
+    problems += [f"{pair} toggled {toggles[pair]} times but has {rows.get(pair, 0)} rows"
+                 for pair in pairs if rows.get(pair, 0) != toggles[pair] % 2]
+    if rollup != total:
+        problems.append(f"reactions rollup {rollup} != COUNT(*) {total}")
+
+    done = sum(toggles.values())
+    print(f"{done} toggles from {args.threads} threads in {elapsed:.2f}s ({done / elapsed:.0f}/s), "
+          f"{total} reactions left")
+    for problem in problems:
+        print("FAIL", problem)
+    print("OK" if not problems else f"{len(problems)} problem(s)")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
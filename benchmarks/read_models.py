@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Lean read-model benchmark
+Builds a scratch database with --rows businesses and requirements, then serializes
+the full lists the old way (ORM entities plus lazy `owner` loads) and through
+app.read_models. Each variant runs in a fresh interpreter so peak RSS is its own.
+
+Usage:
+    python -m benchmarks.read_models                  # 100k rows
+    python -m benchmarks.read_models --rows 20000 --repeat 5
+"""
+
+import argparse
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK = 10000
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ---------- Child processes ----------
+
+def build(rows):
+    import datetime
+    from sqlalchemy import insert
+    from app.db import engine
+    from app.migrations import migrate
+    from app.models import User, Business, Requirement
+
+    migrate(engine)
+    owners = max(1, rows // 4)
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, owners, CHUNK):
+            conn.execute(insert(User), [
+                {"id": i + 1, "name": f"Owner {i}", "email": f"owner{i}@bench.example",
+                 "password_hash": "x", "role": "business", "created_at": now}
+                for i in range(start, min(start + CHUNK, owners))
+            ])
+        for start in range(0, rows, CHUNK):
+            span = range(start, min(start + CHUNK, rows))
+            conn.execute(insert(Business), [
+                {"id": i + 1, "owner_id": i % owners + 1, "name": f"Business {i}", "sector": "Food",
+                 "brand_story": "Family recipes since 1998. " * 4, "investment_needs_min": 50000.0,
+                 "investment_needs_max": 250000.0, "expansion_potential": "Regional franchise",
+                 "country": "Vietnam", "city": "Hanoi"}
+                for i in span
+            ])
+            conn.execute(insert(Requirement), [
+                {"id": i + 1, "owner_id": i % owners + 1, "title": f"Requirement {i}", "sector": "Retail",
+                 "main_brand": "Brand", "sub_brand": "Sub", "description": "Looking for a local partner. " * 4,
+                 "country": "India", "city": "Pune", "partnership_type": "seek_investor",
+                 "budget_min": 10000.0, "budget_max": 90000.0, "created_at": now}
+                for i in span
+            ])
+
+
+def orm_businesses(db):
+    from app.models import Business, User
+    rows = db.query(Business).join(User, Business.owner_id == User.id).order_by(Business.id.desc()).all()
+    return [{
+        "id": b.id, "name": b.name, "sector": b.sector, "country": b.country, "city": b.city,
+        "owner": {"id": b.owner.id, "name": b.owner.name, "email": b.owner.email},
+        "investment_needs": [b.investment_needs_min, b.investment_needs_max],
+        "expansion_potential": b.expansion_potential,
+    } for b in rows]
+
+
+def orm_requirements(db):
+    from app.models import Requirement, User
+    rows = db.query(Requirement).join(User, Requirement.owner_id == User.id).order_by(Requirement.id.desc()).all()
+    return [{
+        "id": r.id, "title": r.title, "sector": r.sector, "main_brand": r.main_brand,
+        "sub_brand": r.sub_brand, "country": r.country, "city": r.city,
+        "budget": [r.budget_min, r.budget_max], "partnership_type": r.partnership_type,
+        "owner": {"id": r.owner.id, "name": r.owner.name},
+    } for r in rows]
+
+
+def lean_businesses(db):
+    from app.main import _list_businesses
+    return _list_businesses(db, None, None, None)["items"]
+
+
+def lean_requirements(db):
+    from app.main import _list_requirements
+    return _list_requirements(db, None, None, None, None)["items"]
+
+
+VARIANTS = {f.__name__: f for f in (orm_businesses, lean_businesses, orm_requirements, lean_requirements)}
+
+
+def run_variant(name, repeat):
+    importlib.import_module("app.main")  # import cost stays out of the measurement
+    from app.db import SessionLocal
+
+    fn = VARIANTS[name]
+    baseline = _peak_rss_mb()
+    latencies = []
+    count = 0
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            count = len(fn(db))
+            latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return {
+        "rows": count,
+        "best_ms": latencies[0] * 1000,
+        "median_ms": latencies[len(latencies) // 2] * 1000,
+        "peak_rss_growth_mb": _peak_rss_mb() - baseline,
+    }
+
+
+# ---------- Driver ----------
+
+def _child(scratch, *args):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'read_models.db')}"
+    env["GLOBRIDGE_UPLOAD_DIR"] = os.path.join(scratch, "uploads")
+    out = subprocess.run([sys.executable, "-m", "benchmarks.read_models", *args], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1]) if out.stdout.strip() else None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Compare ORM-entity and lean read paths for list endpoints")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--child", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child == "build":
+        build(args.rows)
+        return 0
+    if args.child:
+        print(json.dumps(run_variant(args.child, args.repeat)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as scratch:
+        t0 = time.perf_counter()
+        _child(scratch, "--child", "build", "--rows", str(args.rows))
+        print(f"Built {args.rows:,} businesses and requirements in {time.perf_counter() - t0:.1f}s")
+        print(f"{'variant':<20}{'rows':>9}{'best ms':>10}{'median ms':>11}{'peak RSS +MB':>14}")
+        for name in VARIANTS:
+            r = _child(scratch, "--child", name, "--repeat", str(args.repeat))
+            print(f"{name:<20}{r['rows']:>9,}{r['best_ms']:>10.0f}{r['median_ms']:>11.0f}{r['peak_rss_growth_mb']:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -442,14 +442,30 @@ function showNotification(message, type = 'info') {
 
 // Load unread count and update badge
 async function loadUnreadCount() {
+  await loadBadges();
+}
+
+// One request for every badge; the browser revalidates it with If-None-Match
+async function loadBadges() {
   try {
-    const res = await API('/api/messages/unread-count');
-    if (res.unread_count !== undefined) {
-      unreadCount = res.unread_count;
-      updateUnreadBadge();
-    }
+    const res = await API('/api/badges');
+    unreadCount = res.unread_messages;
+    updateUnreadBadge();
+    setCountBadge('#connection-requests-badge', res.pending_connection_requests);
+    setCountBadge('#feed-badge', res.new_feed_items, 99);
   } catch (error) {
-    console.error('Failed to load unread count:', error);
+    console.error('Failed to load badges:', error);
+  }
+}
+
+function setCountBadge(selector, count, cap) {
+  const badge = $(selector);
+  if (!badge) return;
+  if (count > 0) {
+    badge.textContent = cap && count >= cap ? `${cap}+` : count;
+    badge.classList.remove('hidden');
+  } else {
+    badge.classList.add('hidden');
   }
 }
 
@@ -502,12 +518,12 @@ async function reloadCurrentConversation() {
   }
 }
 
-// Display conversation messages
-function displayConversationMessages(data) {
-  $('#conversation-title').textContent = `Conversation with ${data.partner_name}`;
-  
-  if (data.messages && data.messages.length > 0) {
-    $('#thread').innerHTML = data.messages.map(msg => `
+// Older pages of the open conversation load when the thread is scrolled to the top
+let conversationBeforeId = null;
+let loadingOlderMessages = false;
+
+function renderMessageRow(msg) {
+  return `
       <div class="message-row ${msg.is_from_me ? 'message-from-me' : 'message-from-other'}">
         <div class="message-content">${msg.content}</div>
         <div class="message-time">
@@ -515,7 +531,16 @@ function displayConversationMessages(data) {
           ${msg.is_from_me ? `<span class="message-status ${msg.is_read ? 'read' : 'delivered'}">${msg.is_read ? '✓✓' : '✓'}</span>` : ''}
         </div>
       </div>
-    `).join('');
+    `;
+}
+
+// Display conversation messages
+function displayConversationMessages(data) {
+  $('#conversation-title').textContent = `Conversation with ${data.partner_name}`;
+  conversationBeforeId = data.has_more ? data.next_before_id : null;
+  
+  if (data.messages && data.messages.length > 0) {
+    $('#thread').innerHTML = data.messages.map(renderMessageRow).join('');
   } else {
     $('#thread').innerHTML = `
       <div class="thread-empty">
@@ -538,6 +563,27 @@ function displayConversationMessages(data) {
   }, 100);
 }
 
+$('#thread').addEventListener('scroll', async () => {
+  const thread = $('#thread');
+  if (!currentConversationPartner || !conversationBeforeId || loadingOlderMessages || thread.scrollTop > 40) return;
+  
+  loadingOlderMessages = true;
+  const partnerId = currentConversationPartner;
+  try {
+    const data = await API(`/api/messages/conversation/${partnerId}?before_id=${conversationBeforeId}`);
+    if (partnerId !== currentConversationPartner) return;
+    // Keep the visible messages in place while the older page is inserted above them
+    const previousHeight = thread.scrollHeight;
+    thread.insertAdjacentHTML('afterbegin', data.messages.map(renderMessageRow).join(''));
+    thread.scrollTop += thread.scrollHeight - previousHeight;
+    conversationBeforeId = data.has_more ? data.next_before_id : null;
+  } catch (error) {
+    console.error('Failed to load older messages:', error);
+  } finally {
+    loadingOlderMessages = false;
+  }
+});
+
 // Open a specific conversation
 function openConversation(partnerId, event = null) {
   currentConversationPartner = partnerId;
@@ -811,12 +857,13 @@ function updateNavigation(user) {
   // Show universal search when authenticated
   if (user) {
     universalSearch.classList.remove('hidden');
-    // Load connection requests to show notification badge
-    loadConnectionRequests();
+    // Load unread, connection request and feed badges
+    loadBadges();
   } else {
     universalSearch.classList.add('hidden');
-    // Hide notification badge when not authenticated
+    // Hide notification badges when not authenticated
     $('#connection-requests-badge').classList.add('hidden');
+    $('#feed-badge').classList.add('hidden');
   }
 }
 
@@ -858,6 +905,8 @@ function loadView(viewId) {
 let currentPostType = 'text';
 let feedOffset = 0;
 let isLoadingFeed = false;
+// Watermarks for the cheap "anything new?" probe; message/connection stay null until the first probe reports them
+let feedWatermarks = {post: 0, message: null, connection: null};
 let uploadedFile = null;
 
 // Load feed posts
@@ -870,6 +919,8 @@ async function loadFeed() {
     if (res.posts) {
       displayFeedPosts(res.posts);
       feedOffset += res.posts.length;
+      res.posts.forEach(post => { if (post.id > feedWatermarks.post) feedWatermarks.post = post.id; });
+      if (feedOffset === res.posts.length) setCountBadge('#feed-badge', 0);
       
       // Set up auto-refresh for real-time updates (only on first load)
       if (feedOffset === res.posts.length && !window.feedRefreshInterval) {
@@ -887,6 +938,20 @@ async function loadFeed() {
 // Refresh feed to check for new posts
 async function refreshFeedForNewPosts() {
   try {
+    const params = new URLSearchParams({since_post_id: feedWatermarks.post});
+    if (feedWatermarks.message !== null) params.set('since_message_id', feedWatermarks.message);
+    if (feedWatermarks.connection !== null) params.set('since_connection_id', feedWatermarks.connection);
+    const probe = await API(`/api/feed/probe?${params}`);
+    feedWatermarks = {
+      post: probe.posts.latest_id,
+      message: probe.messages.latest_id,
+      connection: probe.connection_requests.latest_id
+    };
+    if (probe.messages.new_count > 0 || probe.connection_requests.new_count > 0) loadBadges();
+
+    // Only download post content when the probe says there is something to show
+    if (probe.posts.new_count === 0) return;
+
     const data = await API('/api/feed?limit=10&offset=0');
     if (data && data.posts && data.posts.length > 0) {
       const container = $('#feed-posts');
@@ -1805,7 +1870,7 @@ function getInlineConnectionButton(user) {
     case 'sent':
       return `<span class="search-connect-btn pending">Pending</span>`;
     case 'received':
-      return `<button class="search-connect-btn" onclick="respondToConnectionRequest(${user.id}, 'accept')">Accept</button>`;
+      return `<button class="search-connect-btn" onclick="respondToConnectionRequest(${user.connection_id}, 'accept')">Accept</button>`;
     default:
       return `<button class="search-connect-btn" onclick="sendConnectionRequest(${user.id})">${connectIcon} Connect</button>`;
   }